@@ -1,29 +1,43 @@
 import base64
 import json
+import math
 import os
 import time
 import traceback
 import uuid
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime, timezone
 from io import BytesIO
 
-import pandas as pd
-from flask import Flask, Response, jsonify, request
+from cache import (CACHEABLE_TERMINATIONS, canonical_key, canonicalize_solution,
+                   create_problem_cache, create_solution_cache,
+                   restore_solution)
+from events import create_event_bus
+from flask import Flask, Response, g, jsonify, request, send_file
 from flask_cors import CORS
-from helpers import (convert_to_json, generate_excel_from_conditions,
-                     validate_data)
-from model import create_model, solve_model
-from sqlalchemy import (JSON, Boolean, Column, DateTime, Integer, String, Text,
-                        create_engine)
-from sqlalchemy.orm import declarative_base, sessionmaker
+from helpers import ExcelValidationError, generate_excel, read_excel_problem
+from metrics import (Counter, Histogram, StageTimer, profile_report,
+                     render_gauge, utcnow)
+from model import solve_problem, solve_scenarios
+from modelfile import read_model_file
+from portfolio import AUTO, PORTFOLIO, choose_solver, problem_features
+from problem import apply_delta, from_conditions, pack_problem, unpack_problem
+from scheduler import QueueFullError, create_scheduler, in_solver_process
+from sensitivity import compact_solution, solution_page
+from sqlalchemy import (JSON, Boolean, Column, DateTime, Float, Integer,
+                        LargeBinary, String, Text, create_engine, event, update)
+from sqlalchemy.orm import declarative_base, defer, sessionmaker
+from taskqueue import DONE, QUEUE_CHANNEL, create_task_queue
 
 app = Flask(__name__)
 CORS(app)
 
+# Рабочие процессы планировщика (spawn) заново выполняют главный модуль: этот файл при
+# запуске python app.py или импорт app при python -m worker. Им нужен только model.solve_problem,
+# поэтому подключение к БД, планировщик, очередь задач и шина событий в них не создаются
+SOLVER_PROCESS = in_solver_process()
+
 # Настройка подключения к PostgreSQL
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+engine = None if SOLVER_PROCESS else create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
@@ -33,16 +47,121 @@ class Task(Base):
 
     id = Column(Integer, primary_key=True, index=True) # id записи
     task_id = Column(String, unique=True, index=True, nullable=False) # id задачи
-    conditions = Column(JSON, nullable=False)  # исходные условия задачи (JSON)
+    conditions = Column(JSON)  # исходные условия задачи (JSON), только у задач, созданных до conditions_data
+    conditions_data = Column(LargeBinary)  # условия задачи в сжатом разреженном виде (pack_problem)
     solution = Column(JSON)  # решение задачи (JSON), может быть пустым, если задача не решена
     solver = Column(String)  # решатель, который выбрал пользователь
-    conditions_excel = Column(Text)  # поле для хранения сгенерированного Excel файла в виде base64 строки
-    upload_time = Column(DateTime, default=datetime.now)  # время загрузки задачи
-    solve_time = Column(DateTime)  # время завершения решения задачи
+    backend = Column(String, default='pyomo')  # способ решения: pyomo или direct (LP файл без Pyomo)
+    time_limit = Column(Float)  # лимит времени решения в секундах
+    mip_gap = Column(Float)  # допустимый относительный разрыв для MIP
+    presolve = Column(Boolean, default=False)  # упрощение задачи перед передачей решателю
+    features = Column(JSON)  # признаки задачи (размеры, доля целочисленных переменных, плотность) для режима auto
+    solver_timings = Column(JSON)  # время и статус решения каждым решателем: {решатель: {"time": ..., "status": ...}}
+    stage_timings = Column(JSON)  # длительности этапов обработки задачи в секундах: {этап: длительность}
+    conditions_hash = Column(String, index=True)  # канонический хеш условий и решателя для кэша решений
+    parent_task_id = Column(String, index=True)  # задача, изменением которой получена эта задача
+    conditions_excel = Column(Text)  # Excel файл с условиями в виде base64 строки, только у старых задач
+    conditions_xlsx = Column(LargeBinary)  # Excel файл с условиями: загруженный пользователем или сгенерированный при первом скачивании
+    upload_time = Column(DateTime, default=utcnow)  # время загрузки задачи (UTC)
+    solve_time = Column(DateTime)  # время завершения решения задачи (UTC)
     canceled = Column(Boolean, default=False)  # отмена решения задачи пользователем
+    # Очередь задач в БД для отдельных рабочих узлов (TASK_QUEUE=database, см. taskqueue.py)
+    status = Column(String, index=True)  # состояние в очереди: queued, running, done
+    priority = Column(Float)  # приоритет в очереди: оценка размера задачи, меньшие решаются раньше
+    worker_id = Column(String)  # рабочий узел, который решает задачу
+    attempts = Column(Integer, default=0)  # сколько раз задача забиралась рабочими узлами
+    claim_time = Column(DateTime)  # время, когда рабочий узел забрал задачу (UTC)
+    heartbeat_time = Column(DateTime)  # последнее подтверждение рабочего узла, что задача решается (UTC)
+    warm_start = Column(JSON)  # начальное решение для повторного решения: {индекс переменной: значение}
+    profile = Column(Boolean, default=False)  # сохранить профиль cProfile решения задачи
+
+# Серия сценариев одной задачи: общие условия и настройки решения
+class Batch(Base):
+    __tablename__ = "batches"
+
+    id = Column(Integer, primary_key=True, index=True) # id записи
+    batch_id = Column(String, unique=True, index=True, nullable=False) # id серии
+    conditions_data = Column(LargeBinary, nullable=False)  # базовые условия задачи в сжатом разреженном виде
+    solver = Column(String)  # решатель, который выбрал пользователь
+    backend = Column(String, default='pyomo')  # способ решения: pyomo или direct
+    time_limit = Column(Float)  # лимит времени решения одного сценария в секундах
+    mip_gap = Column(Float)  # допустимый относительный разрыв для MIP
+    parallelism = Column(Integer)  # количество частей серии, решаемых параллельно
+    scenario_count = Column(Integer)  # количество сценариев
+    upload_time = Column(DateTime, default=utcnow)  # время загрузки серии (UTC)
+    solve_time = Column(DateTime)  # время завершения решения всех сценариев
+    canceled = Column(Boolean, default=False)  # отмена решения серии пользователем
+
+# Сценарий серии: изменения параметров базовой задачи и его решение
+class BatchScenario(Base):
+    __tablename__ = "batch_scenarios"
+
+    id = Column(Integer, primary_key=True, index=True) # id записи
+    batch_id = Column(String, index=True, nullable=False) # id серии
+    index = Column(Integer, nullable=False)  # номер сценария в серии (с нуля)
+    parameters = Column(JSON, nullable=False)  # правые части и коэффициенты целевой функции сценария
+    solution = Column(JSON)  # решение сценария (JSON)
+    error = Column(Text)  # ошибка решения сценария
+    solve_time = Column(DateTime)  # время завершения решения сценария
     
 # Создание таблицы, если она еще не создана
-Base.metadata.create_all(bind=engine)
+if not SOLVER_PROCESS:
+    Base.metadata.create_all(bind=engine)
+
+# Способы решения задачи
+BACKENDS = ('pyomo', 'direct')
+
+# Лимит времени решения по умолчанию в секундах (не задан - без ограничения)
+DEFAULT_TIME_LIMIT = os.getenv("SOLVER_TIME_LIMIT")
+# Количество последних решенных задач, по которым режим auto выбирает решатель
+AUTO_HISTORY_SIZE = int(os.getenv("AUTO_HISTORY_SIZE", 500))
+# Упрощение задачи (presolve) по умолчанию, если в запросе не указано
+DEFAULT_PRESOLVE = os.getenv("PRESOLVE", "0") == "1"
+
+if SOLVER_PROCESS:
+    scheduler = task_queue = event_bus = None
+else:
+    # Планировщик решения задач с пулом рабочих процессов
+    scheduler = create_scheduler()
+    # Очередь задач в БД (TASK_QUEUE=database): задачи решают рабочие узлы python -m worker,
+    # веб-приложение только ставит их в очередь. Без нее задачи решает scheduler
+    task_queue = create_task_queue(SessionLocal, Task)
+    # Шина событий задач для SSE потоков
+    event_bus = create_event_bus(engine)
+
+# Кэш решений по каноническому хешу условий задачи
+solution_cache = create_solution_cache()
+# Кэш разобранных задач для повторного решения с изменениями
+problem_cache = create_problem_cache()
+# Количество частей серии сценариев, решаемых параллельно, по умолчанию
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", scheduler.num_workers if scheduler else 1))
+# Интервалы SSE потока в секундах: комментарий для поддержания соединения и перечитывание задачи из БД
+KEEPALIVE_INTERVAL = 15
+RECHECK_INTERVAL = 30
+# Директория профилей cProfile задач, запрошенных с profile=true (не задана - профилирование выключено)
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+# Метрики для /metrics
+STAGE_SECONDS = Histogram('milp_stage_seconds', "Длительность этапов обработки задач", ('stage',))
+TASK_SECONDS = Histogram('milp_task_seconds', "Время от загрузки задачи до сохранения результата")
+REQUEST_SECONDS = Histogram('milp_http_request_seconds', "Время обработки HTTP запросов", ('endpoint',))
+TASKS_TOTAL = Counter('milp_tasks_total', "Завершенные задачи по статусу", ('status',))
+DB_CHECKOUTS = Counter('milp_db_checkouts_total', "Соединения с БД, выданные сессиям")
+DB_CHECKINS = Counter('milp_db_checkins_total', "Соединения с БД, возвращенные в пул")
+if engine is not None:
+    event.listen(engine, 'checkout', lambda *args: DB_CHECKOUTS.inc())
+    event.listen(engine, 'checkin', lambda *args: DB_CHECKINS.inc())
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    # SSE ответы учитываются по времени до начала потока
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, request.endpoint or 'unknown')
+    return response
 
 @app.errorhandler(Exception)
 def handle_exception(e):
@@ -57,60 +176,257 @@ def handle_exception(e):
 # Эндпоит загрузки задачи через инпуты
 @app.route('/task', methods=['POST'])
 def solve_milp_route():
-    data = request.json
+    timer = StageTimer()
+    with timer.stage('parse'):
+        data = request.json
     solver = data["solver"]
     data.pop('solver', None)
+    backend = data.pop('backend', None) or 'pyomo'
+    presolve = parse_presolve(data.pop('presolve', None))
+    profile = parse_flag(data.pop('profile', None))
+    try:
+        limits = parse_limits(data.pop('time_limit', None), data.pop('mip_gap', None))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
-        model = create_model(data)
+        with timer.stage('validate'):
+            problem = prepare_problem(data, backend)
     except Exception as e:
         return handle_exception(e)
 
-    task_id = str(uuid.uuid4())
-    conditions_excel = generate_excel_from_conditions(data)
-    db = SessionLocal()
-    # Создаем запись в БД (upload_time установится автоматически)
-    task_record = Task(task_id=task_id, conditions=data, conditions_excel=conditions_excel, solver=solver)
-    db.add(task_record)
-    db.commit()
-    db.close()
+    return submit_task(problem, solver, backend, limits, presolve=presolve, timer=timer, profile=profile)
 
-    # Запускаем фоновую задачу
-    executor = ThreadPoolExecutor(max_workers=1)
-    executor.submit(process_task, task_id, model, solver)
-    executor.shutdown(wait=False)  # не блокируем поток
-    return jsonify({'task_id': task_id}), 202
 
+# Лимиты решения: из запроса или, если не заданы, лимит времени по умолчанию из окружения.
+# Лимит времени - положительное число секунд, разрыв MIP - число от 0 (включительно) до 1
+def parse_limits(time_limit, mip_gap):
+    if time_limit in (None, ''):
+        time_limit = DEFAULT_TIME_LIMIT
+    time_limit = _parse_number(time_limit, "Лимит времени")
+    if time_limit is not None and not time_limit > 0:
+        raise ValueError("Лимит времени должен быть положительным числом секунд")
+    mip_gap = _parse_number(mip_gap, "Допустимый разрыв MIP")
+    if mip_gap is not None and not 0 <= mip_gap < 1:
+        raise ValueError("Допустимый разрыв MIP должен быть не меньше 0 и меньше 1")
+    return {'time_limit': time_limit, 'mip_gap': mip_gap}
 
-# Фоновая функция для решения задачи
-def process_task(task_id, model, solver):
+def _parse_number(value, name):
+    if value in (None, ''):
+        return None
     try:
-        # Используем ThreadPoolExecutor для решения.
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(solve_model, model, solver)
-            while not future.done():
-                db = SessionLocal()
-                task_record = db.query(Task).filter(Task.task_id == task_id).first()
-                db.close()
-                if task_record.canceled == True:
-                    return
-                time.sleep(1)
-            solution = future.result()
-
-        # Обновляем запись в БД – сохраняем решение и время завершения
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} должен быть числом")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} должен быть конечным числом")
+    return number
+
+
+# Флаг из JSON (bool) или поля формы ("true"/"false", "1"/"0")
+def parse_flag(value, default=False):
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+# Флаг упрощения задачи; если не задан - значение по умолчанию из окружения
+def parse_presolve(value, default=None):
+    return parse_flag(value, DEFAULT_PRESOLVE if default is None else default)
+
+
+# Подготовка разреженного представления задачи для выбранного способа решения
+def prepare_problem(data, backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный способ решения: {backend}")
+    return from_conditions(data)
+
+# Создание записи о задаче в БД и отправка ее на решение
+# timer - длительности этапов, замеренные в обработчике запроса (разбор и проверка условий);
+# profile - сохранить профиль cProfile решения задачи в PROFILE_DIR
+def submit_task(problem, solver, backend, limits, conditions_xlsx=None, parent_task_id=None, warm_start=None, presolve=False, timer=None, profile=False):
+    timer = timer or StageTimer()
+    task_record, row_order = new_task_record(problem, solver, backend, limits, conditions_xlsx, parent_task_id, warm_start, presolve, timer.stages, profile)
+    task_id, solver, key = task_record.task_id, task_record.solver, task_record.conditions_hash
+    with timer.stage('persist'):
         db = SessionLocal()
-        task_record = db.query(Task).filter(Task.task_id == task_id).first()
-        task_record.solution = solution
-        finish_time = datetime.now(timezone.utc)
-        task_record.solve_time = finish_time
+        db.add(task_record)
         db.commit()
         db.close()
-    except Exception as e:
+    problem_cache.put(task_id, problem)
+
+    try:
+        position = dispatch_task(task_id, problem, solver, backend, limits, key, row_order, warm_start, presolve, profile, timer.stages)
+    except QueueFullError as e:
+        # Очередь заполнена: удаляем запись о задаче и просим клиента повторить позже
         db = SessionLocal()
-        task_record = db.query(Task).filter(Task.task_id == task_id).first()
-        finish_time = datetime.now(timezone.utc)
-        task_record.solve_time = finish_time
+        db.query(Task).filter(Task.task_id == task_id).delete()
         db.commit()
         db.close()
+        return jsonify({'error': str(e)}), 429
+    return jsonify({'task_id': task_id, 'queue_position': position, 'solver': solver}), 202
+
+# Запись о новой задаче (upload_time установится при сохранении): выбор решателя для режима auto
+# и канонический ключ условий для кэша. Возвращает запись и порядок строк канонического вида
+def new_task_record(problem, solver, backend, limits, conditions_xlsx=None, parent_task_id=None, warm_start=None, presolve=False, stages=None, profile=False):
+    features = problem_features(problem)
+    if solver == AUTO:
+        solver = pick_solver(features)
+    key, row_order = canonical_key(problem, solver, limits['mip_gap'])
+    task_record = Task(task_id=str(uuid.uuid4()), conditions_data=pack_problem(problem), conditions_xlsx=conditions_xlsx, solver=solver, backend=backend, presolve=presolve, features=features, conditions_hash=key, parent_task_id=parent_task_id, stage_timings=stages, profile=profile, **limits)
+    if task_queue is not None:
+        # Рабочему узлу начальное решение передается через БД
+        task_record.warm_start = warm_start
+    return task_record, row_order
+
+# Выбор решателя для режима auto по времени решения похожих задач. Пока истории мало,
+# задача решается портфелем, и его результаты пополняют историю. В историю входят только
+# задачи, решенные портфелем: у них есть время всех решателей, а время единственного
+# решателя закрепило бы выбор за ним без сравнения с остальными
+def pick_solver(features):
+    db = SessionLocal()
+    history = (
+        db.query(Task.features, Task.solver_timings)
+        .filter(Task.solver == PORTFOLIO, Task.features.isnot(None), Task.solver_timings.isnot(None))
+        .order_by(Task.id.desc())
+        .limit(AUTO_HISTORY_SIZE)
+        .all()
+    )
+    db.close()
+    return choose_solver(features, [(row.features, row.solver_timings) for row in history]) or PORTFOLIO
+
+# Выдача решения из кэша, ожидание такой же уже решаемой задачи или постановка в очередь.
+# Возвращает позицию в очереди или None, если задача в очередь не ставилась
+# stages - этапы, замеренные при загрузке задачи; сохраняются вместе с этапами решения
+def dispatch_task(task_id, problem, solver, backend, limits, key, row_order, warm_start=None, presolve=False, profile=False, stages=None):
+    stages = stages or {}
+    cached = find_cached_solution(key)
+    if cached is not None:
+        process_task(task_id, restore_solution(cached, row_order), None, stages=stages)
+        return None
+
+    if task_queue is not None:
+        # Задачу решит рабочий узел: одинаковые задачи в очереди находят решение
+        # в кэше, когда узел их забирает
+        position = task_queue.enqueue(task_id, problem.size_estimate, stage_timings=stages)
+        event_bus.publish(QUEUE_CHANNEL, {"type": "queued"})
+        return position
+
+    resubmit = lambda: redispatch_task(task_id, problem, solver, backend, limits, key, row_order, warm_start, presolve, profile)
+    if not solution_cache.join(key, task_id, row_order, resubmit):
+        return None
+    try:
+        return scheduler.submit(
+            task_id,
+            solve_problem,
+            (problem, solver, backend, limits['time_limit'], limits['mip_gap'], warm_start, presolve),
+            priority=problem.size_estimate,
+            on_done=lambda solution, error, solve_stages: complete_task(task_id, solution, error, key, row_order, solver, dict(stages, **solve_stages)),
+            on_progress=lambda event: event_bus.publish(task_id, event),
+            time_limit=limits['time_limit'],
+            profile_path=profile_path(task_id) if profile and PROFILE_DIR else None,
+        )
+    except Exception:
+        # Задача не поставлена в очередь (очередь заполнена или ошибка планировщика):
+        # ожидавшие ее задачи отправляются на решение заново
+        for follower in solution_cache.abandon(key):
+            follower.resubmit()
+        raise
+
+# Повторная отправка ожидавшей задачи, если ведущая задача не была решена
+def redispatch_task(task_id, problem, solver, backend, limits, key, row_order, warm_start=None, presolve=False, profile=False):
+    try:
+        dispatch_task(task_id, problem, solver, backend, limits, key, row_order, warm_start, presolve, profile)
+    except QueueFullError as e:
+        process_task(task_id, None, str(e))
+
+# Поиск решения в кэше: сначала в памяти, затем среди решенных задач в БД
+def find_cached_solution(key):
+    solution = solution_cache.get(key)
+    if solution is not None:
+        return solution
+    db = SessionLocal()
+    task_record = (
+        db.query(Task)
+        .filter(Task.conditions_hash == key, Task.solution.isnot(None))
+        .order_by(Task.solve_time.desc())
+        .first()
+    )
+    db.close()
+    if task_record is None or task_record.solution.get('termination_condition') not in CACHEABLE_TERMINATIONS:
+        return None
+    _, row_order = canonical_key(task_problem(task_record), task_record.solver, task_record.mip_gap)
+    solution = canonicalize_solution(task_record.solution, row_order)
+    solution_cache.put(key, solution, from_db=True)
+    return solution
+
+# Завершение решения ведущей задачи: результат сохраняется ей и всем ожидавшим такую же задачу
+# Ключ снимается с учета решаемых на любом исходе, иначе одинаковые задачи ждали бы его вечно
+def complete_task(task_id, solution, error, key, row_order, solver=None, stages=None, worker_id=None):
+    try:
+        saved = process_task(task_id, solution, error, solver_timings(solution, solver), stages, worker_id)
+    except Exception:
+        saved = False
+        traceback.print_exc()
+    if not saved:
+        # Ведущая задача отменена или ее результат не сохранен, ожидавшие задачи отправляются на решение заново
+        for follower in solution_cache.abandon(key):
+            follower.resubmit()
+        return
+    canonical = canonicalize_solution(solution, row_order) if solution is not None else None
+    for follower in solution_cache.complete(key, canonical):
+        restored = restore_solution(canonical, follower.row_order) if canonical is not None else None
+        process_task(follower.task_id, restored, error)
+
+# Время решения каждым решателем для истории режима auto: из результата гонки портфеля
+# или время единственного решателя
+def solver_timings(solution, solver):
+    if solution is None:
+        return None
+    if 'portfolio' in solution:
+        return solution['portfolio']['timings']
+    if 'solver_time' in solution:
+        return {solver: {'time': solution['solver_time'], 'status': solution['termination_condition']}}
+    return None
+
+# Сохранение результата решения задачи. Возвращает False, если задача отменена или не найдена
+# stages - длительности этапов решения, добавляются к этапам, замеренным при загрузке задачи;
+# worker_id - рабочий узел, решавший задачу: результат не сохраняется, если задача уже передана другому узлу
+def process_task(task_id, solution, error, timings=None, stages=None, worker_id=None):
+    start = time.perf_counter()
+    db = SessionLocal()
+    task_record = db.query(Task).filter(Task.task_id == task_id).first()
+    if task_record is None or task_record.canceled or (worker_id is not None and task_record.worker_id != worker_id):
+        if task_record is not None and task_record.canceled and worker_id is not None:
+            task_record.status = DONE
+            db.commit()
+        db.close()
+        TASKS_TOTAL.inc('canceled')
+        return False
+    if timings is not None:
+        task_record.solver_timings = timings
+    if stages:
+        observe_stages(stages)
+        task_record.stage_timings = dict(task_record.stage_timings or {}, **stages)
+    if error is None:
+        task_record.solution = solution
+    else:
+        print("An error occurred:", error)
+    # Сохраняем время завершения, без решения задача считается завершенной с ошибкой
+    task_record.solve_time = utcnow()
+    if task_record.status is not None:
+        task_record.status = DONE
+    TASK_SECONDS.observe((task_record.solve_time - task_record.upload_time).total_seconds())
+    TASKS_TOTAL.inc(solution.get('termination_condition', 'unknown') if error is None and solution else 'error')
+    db.commit()
+    db.close()
+    STAGE_SECONDS.observe(time.perf_counter() - start, 'persist_result')
+    event_bus.publish(task_id, {"type": "done"})
+    return True
+
+def observe_stages(stages):
+    for name, seconds in stages.items():
+        STAGE_SECONDS.observe(seconds, name)
 
 # Эндпоинт для загрузки Excel и запуска фоновой задачи
 @app.route('/task/excel', methods=['POST'])
@@ -120,92 +436,427 @@ def upload_excel():
         return jsonify({'error': 'Вы не отправили файл'}), 400
 
     solver = request.form.get("solver")
+    backend = request.form.get("backend") or 'pyomo'
+    try:
+        limits = parse_limits(request.form.get("time_limit"), request.form.get("mip_gap"))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     file = request.files['file']
     if not file.filename.endswith('.xlsx'):
         return jsonify({'error': 'Файл не является Excel файлом. Загрузите файл с расширением .xlsx'}), 400
 
-    # Парсинг Excel файла
-    df = None
+    if backend not in BACKENDS:
+        return jsonify({'error': f"Неизвестный способ решения: {backend}"}), 400
+
+    # Чтение и проверка Excel файла сразу в разреженное представление,
+    # сам файл сохраняется для скачивания условий
+    timer = StageTimer()
+    with timer.stage('parse'):
+        excel_bytes = file.read()
     try:
-        df = pd.read_excel(file, engine='openpyxl')
-    except Exception as e:
-        return jsonify({'error': f'Ошибка в чтении Excel файла: {str(e)}'}), 500
-  
-    # Валидация данных
+        with timer.stage('validate'):
+            problem = read_excel_problem(BytesIO(excel_bytes))
+    except ExcelValidationError as e:
+        return jsonify({'error': str(e), 'errors': e.errors}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return submit_task(problem, solver, backend, limits, excel_bytes, presolve=parse_presolve(request.form.get("presolve")), timer=timer, profile=parse_flag(request.form.get("profile")))
+
+
+# Эндпоинт загрузки задачи в формате MPS или LP (в том числе сжатых gzip). Файл читается
+# построчно из потока запроса сразу в разреженное представление
+@app.route('/task/model_file', methods=['POST'])
+def upload_model_file():
+    if 'file' not in request.files:
+        return jsonify({'error': 'Вы не отправили файл'}), 400
+
+    solver = request.form.get("solver")
+    backend = request.form.get("backend") or 'pyomo'
+    if backend not in BACKENDS:
+        return jsonify({'error': f"Неизвестный способ решения: {backend}"}), 400
+    file = request.files['file']
+    timer = StageTimer()
     try:
-        validate_data(df)
-    except Exception as e:
+        limits = parse_limits(request.form.get("time_limit"), request.form.get("mip_gap"))
+        # Файл читается и проверяется одним проходом по потоку, поэтому разбор и проверка - один этап
+        with timer.stage('parse'):
+            problem = read_model_file(file.stream, file.filename, fixed=request.form.get("mps_format") == 'fixed')
+    except ValueError as e:
         return jsonify({'error': str(e)}), 400
 
-    # Конвертация в JSON структуру
+    return submit_task(problem, solver, backend, limits, presolve=parse_presolve(request.form.get("presolve")), timer=timer, profile=parse_flag(request.form.get("profile")))
+
+
+# Эндпоинт повторного решения задачи с изменениями: условия родительской задачи берутся
+# из кэша разобранных задач, а ее решение передается решателю как начальное
+@app.route('/task/<task_id>/resolve', methods=['POST'])
+def resolve_task(task_id):
+    parent = load_task(task_id)
+    if not parent:
+        return jsonify({"error": "Задача не найдена"}), 404
+
+    data = request.json or {}
+    solver = data.get("solver") or parent.solver
+    backend = data.get("backend") or parent.backend or 'pyomo'
+    timer = StageTimer()
     try:
-       data = convert_to_json(df)
-    except Exception as e:
-        return handle_exception(e)
+        limits = parse_limits(data.get('time_limit', parent.time_limit), data.get('mip_gap', parent.mip_gap))
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный способ решения: {backend}")
+        with timer.stage('parse'):
+            parent_problem = problem_cache.get(task_id) or task_problem(parent)
+        with timer.stage('validate'):
+            problem, column_map = apply_delta(parent_problem, data.get("delta") or {})
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    warm_start = None
+    values = (compact_solution(parent.solution) or {}).get('variable_values')
+    if values and data.get('warm_start', True):
+        warm_start = {
+            j: values[source]
+            for j, source in enumerate(column_map)
+            if source is not None and values[source] is not None
+        }
 
-    # Создание модели
+    presolve = parse_presolve(data.get('presolve'), parent.presolve)
+    return submit_task(problem, solver, backend, limits, None, task_id, warm_start, presolve, timer, parse_flag(data.get('profile')))
+
+
+# Эндпоинт серии сценариев: базовая задача и список изменений правых частей
+# и коэффициентов целевой функции. Сценарии делятся на части, каждая часть решается
+# одним заданием планировщика, модель в нем строится один раз
+@app.route('/batch', methods=['POST'])
+def submit_batch():
+    data = request.json
+    solver = data.pop('solver', None)
+    backend = data.pop('backend', None) or 'pyomo'
+    scenarios = data.pop('scenarios', None)
+    if not solver or not scenarios:
+        return jsonify({'error': 'Не заданы решатель или сценарии'}), 400
+    if solver in (PORTFOLIO, AUTO):
+        return jsonify({'error': f"Режим {solver} не поддерживается для серий сценариев"}), 400
     try:
-        model = create_model(data)
-    except Exception as e:
-        return handle_exception(e)
+        limits = parse_limits(data.pop('time_limit', None), data.pop('mip_gap', None))
+        parallelism = int(data.pop('parallelism', None) or BATCH_PARALLELISM)
+        if parallelism < 1:
+            raise ValueError("Количество параллельных частей должно быть положительным")
+        problem = prepare_problem(data, backend)
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Записываем DataFrame в Excel в памяти
+    batch_id = str(uuid.uuid4())
+    parallelism = min(parallelism, len(scenarios))
+    db = SessionLocal()
+    db.add(Batch(batch_id=batch_id, conditions_data=pack_problem(problem), solver=solver, backend=backend, parallelism=parallelism, scenario_count=len(scenarios), **limits))
+    db.add_all(BatchScenario(batch_id=batch_id, index=k, parameters=parameters) for k, parameters in enumerate(scenarios))
+    db.commit()
+    db.close()
+
+    indexed = list(enumerate(scenarios))
+    submitted = []
     try:
-        output = BytesIO()
-        df.to_excel(output, index=False)
-        excel_bytes = output.getvalue()
-        
-        # Кодируем в base64 и возвращаем строку
-        b64_excel = base64.b64encode(excel_bytes).decode('utf-8')
-    except Exception as e:
-        return handle_exception(e)
+        for part in range(parallelism):
+            # Сценарии распределяются по частям через один, чтобы части были близки по размеру
+            chunk = indexed[part::parallelism]
+            chunk_id = batch_chunk_id(batch_id, part)
+            scheduler.submit(
+                chunk_id,
+                solve_scenarios,
+                (problem, chunk, solver, backend, limits['time_limit'], limits['mip_gap']),
+                priority=problem.size_estimate * len(chunk),
+                on_done=lambda result, error, stages, chunk=chunk: complete_batch_chunk(batch_id, chunk, error, stages),
+                on_progress=lambda event: process_scenario(batch_id, event.get('index'), event.get('solution'), event.get('error')),
+                time_limit=limits['time_limit'] * len(chunk) if limits['time_limit'] else None,
+            )
+            submitted.append(chunk_id)
+    except QueueFullError as e:
+        # Очередь заполнена: снимаем уже поставленные части и удаляем серию
+        for chunk_id in submitted:
+            scheduler.cancel(chunk_id)
+        db = SessionLocal()
+        db.query(BatchScenario).filter(BatchScenario.batch_id == batch_id).delete()
+        db.query(Batch).filter(Batch.batch_id == batch_id).delete()
+        db.commit()
+        db.close()
+        return jsonify({'error': str(e)}), 429
+    return jsonify({'batch_id': batch_id, 'scenario_count': len(scenarios), 'parallelism': parallelism}), 202
+
+def batch_chunk_id(batch_id, part):
+    return f"{batch_id}/{part}"
 
-    task_id = str(uuid.uuid4())
+# Сохранение результата одного сценария серии
+def process_scenario(batch_id, index, solution, error):
     db = SessionLocal()
-    # Создаем запись в БД (upload_time установится автоматически)
-    task_record = Task(task_id=task_id, conditions=data, conditions_excel=b64_excel, solver=solver)
-    db.add(task_record)
+    scenario = (
+        db.query(BatchScenario)
+        .filter(BatchScenario.batch_id == batch_id, BatchScenario.index == index)
+        .first()
+    )
+    if scenario is None or scenario.solve_time is not None:
+        db.close()
+        return
+    if error is not None:
+        print("An error occurred:", error)
+    scenario.solution = solution
+    scenario.error = error
+    scenario.solve_time = utcnow()
     db.commit()
     db.close()
+    event_bus.publish(batch_id, {"type": "scenario", "index": index})
+
+# Завершение части серии: сценарии, оставшиеся без результата (отмена, сбой процесса),
+# получают ошибку части; когда решены все части, серия отмечается завершенной
+def complete_batch_chunk(batch_id, chunk, error, stages=None):
+    observe_stages(stages or {})
+    for index, _ in chunk:
+        process_scenario(batch_id, index, None, error or "Сценарий не решен")
+    db = SessionLocal()
+    remaining = (
+        db.query(BatchScenario)
+        .filter(BatchScenario.batch_id == batch_id, BatchScenario.solve_time.is_(None))
+        .count()
+    )
+    finished = 0
+    if remaining == 0:
+        # Условие на solve_time гарантирует, что серия завершается один раз
+        finished = db.execute(
+            update(Batch)
+            .where(Batch.batch_id == batch_id, Batch.solve_time.is_(None))
+            .values(solve_time=utcnow())
+        ).rowcount
+        db.commit()
+    db.close()
+    if finished:
+        event_bus.publish(batch_id, {"type": "done"})
+
+def scenario_payload(scenario):
+    return {
+        "index": scenario.index,
+        "parameters": scenario.parameters,
+        "solution": compact_solution(scenario.solution),
+        "error": scenario.error,
+    }
 
-    # Запускаем фоновую задачу
-    executor = ThreadPoolExecutor(max_workers=1)
-    executor.submit(process_task, task_id, model, solver)
-    executor.shutdown(wait=False)  # не блокируем поток
-    return jsonify({'task_id': task_id}), 202
+def batch_payload(batch_record, scenarios):
+    payload = {
+        "batch_id": batch_record.batch_id,
+        "solver": batch_record.solver,
+        "backend": batch_record.backend,
+        "scenario_count": batch_record.scenario_count,
+        "solved_count": sum(1 for scenario in scenarios if scenario.solve_time is not None),
+        "canceled": batch_record.canceled,
+    }
+    if batch_record.solve_time is not None:
+        payload["solve_duration"] = (batch_record.solve_time - batch_record.upload_time).total_seconds() * 1000
+    return payload
+
+def load_batch(batch_id):
+    session = SessionLocal()
+    batch_record = session.query(Batch).filter(Batch.batch_id == batch_id).first()
+    scenarios = []
+    if batch_record:
+        scenarios = (
+            session.query(BatchScenario)
+            .filter(BatchScenario.batch_id == batch_id)
+            .order_by(BatchScenario.index)
+            .all()
+        )
+    session.close()
+    return batch_record, scenarios
+
+# Эндпоинт получения серии вместе с результатами всех сценариев
+@app.route('/batch/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    batch_record, scenarios = load_batch(batch_id)
+    if not batch_record:
+        return jsonify({"error": "Серия не найдена"}), 404
+    payload = batch_payload(batch_record, scenarios)
+    payload["scenarios"] = [scenario_payload(scenario) for scenario in scenarios]
+    return jsonify(payload), 200
+
+# Эндпоинт SSE серии: каждый решенный сценарий отправляется событием scenario,
+# после решения всех сценариев - итог серии и [end]
+@app.route('/batch/<batch_id>/progress', methods=['GET'])
+def batch_progress(batch_id):
+    def event_stream():
+        subscription = event_bus.subscribe(batch_id)
+        try:
+            batch_record, scenarios = load_batch(batch_id)
+            if not batch_record:
+                yield "data: [error]\n\n"
+                return
+
+            sent = set()
+            waited = 0
+            while True:
+                for scenario in scenarios:
+                    if scenario.solve_time is not None and scenario.index not in sent:
+                        sent.add(scenario.index)
+                        yield "event: scenario\ndata: " + json.dumps(scenario_payload(scenario), ensure_ascii=False) + "\n\n"
+                if batch_record.solve_time is not None or batch_record.canceled:
+                    break
+
+                event = subscription.get(timeout=1)
+                waited += 1
+                if event is not None or waited % RECHECK_INTERVAL == 0:
+                    batch_record, scenarios = load_batch(batch_id)
+                elif waited % KEEPALIVE_INTERVAL == 0:
+                    yield ": keepalive\n\n"
+
+            yield "data: " + json.dumps(batch_payload(batch_record, scenarios), ensure_ascii=False) + "\n\n"
+            yield "data: [end]\n\n"
+        finally:
+            subscription.close()
+    return Response(event_stream(), mimetype="text/event-stream")
+
+# Эндпоинт отмены серии: части серии убираются из очереди или останавливаются
+@app.route('/batch/<batch_id>/cancel', methods=['POST'])
+def cancel_batch(batch_id):
+    session = SessionLocal()
+    batch_record = session.query(Batch).filter(Batch.batch_id == batch_id).first()
+    if not batch_record:
+        session.close()
+        return jsonify({"error": "Серия не найдена"}), 404
+    batch_record.canceled = True
+    session.commit()
+    for part in range(batch_record.parallelism):
+        scheduler.cancel(batch_chunk_id(batch_id, part))
+    session.close()
+    event_bus.publish(batch_id, {"type": "canceled"})
+    return jsonify({"message": "Серия отменена"}), 200
 
 
 # Эндпоинт SSE для получения обновлений по задаче
 @app.route('/task/task_progress/<task_id>', methods=['GET'])
 def task_progress(task_id):
     def event_stream():
-        # Отправляем данные до тех пор, пока задача не завершена
-        while True:
-            session = SessionLocal()
-            task_record = session.query(Task).filter(Task.task_id == task_id).first()
-            session.close()
+        # Подписываемся до чтения задачи из БД, чтобы не пропустить событие о завершении
+        subscription = event_bus.subscribe(task_id)
+        try:
+            task_record = load_task(task_id)
             if not task_record:
-                yield "data: [error]" + "\n\n"
-                break
-            if task_record.solve_time is None:
-                yield "data: Задача в процессе выполнения...\n\n"
-            else:
-                # Задача завершена: если решение есть, отправляем его как JSON; иначе — сообщение об ошибке
-                if task_record.solution:
-                    payload = {}
-                    payload["solution"] = task_record.solution
-                    payload["conditions_excel"] = task_record.conditions_excel
-                    payload["solver"] = task_record.solver
-                    payload["solve_duration"] = (task_record.solve_time - task_record.upload_time).total_seconds() * 1000
-                    
-                    yield "data: " + json.dumps(payload, ensure_ascii=False) + "\n\n"
-                else:
-                    yield "data: [error]" + "\n\n"
-                    break
-            time.sleep(1)
-        yield "data: [end]\n\n"
+                yield "data: [error]\n\n"
+                return
+
+            # Ждем события о завершении задачи, пока она решается. Статус в очереди
+            # берется из планировщика, БД перечитывается только изредка на случай потерянного события.
+            # В очереди БД позиция пересчитывается вместе с перечитыванием задачи
+            last_message = None
+            waited = 0
+            position = task_queue.position(task_id) if task_queue is not None else None
+            while task_record.solve_time is None and not task_record.canceled:
+                if task_queue is None:
+                    position = scheduler.position(task_id)
+                message = progress_message(position)
+                if message != last_message:
+                    yield f"data: {message}\n\n"
+                    last_message = message
+                elif waited % KEEPALIVE_INTERVAL == 0:
+                    yield ": keepalive\n\n"
+
+                event = subscription.get(timeout=1)
+                waited += 1
+                if event is not None and event.get("type") == "progress":
+                    # Ход решения передается отдельным типом события, чтобы не путать его с итоговым результатом
+                    yield "event: progress\ndata: " + json.dumps(event) + "\n\n"
+                elif event is not None or waited % RECHECK_INTERVAL == 0:
+                    task_record = load_task(task_id)
+                    if task_queue is not None:
+                        position = task_queue.position(task_id)
+
+            yield from final_messages(task_record)
+        finally:
+            subscription.close()
     return Response(event_stream(), mimetype="text/event-stream")
 
+# Сообщение SSE потока о состоянии нерешенной задачи
+def progress_message(position):
+    if position:
+        return f"Задача в очереди, позиция {position}"
+    return "Задача в процессе выполнения..."
+
+# Завершающие сообщения SSE потока: если решение есть, оно отправляется как JSON один раз;
+# иначе — сообщение об ошибке
+def final_messages(task_record):
+    if task_record.solution:
+        payload = {}
+        payload["solution"] = compact_solution(task_record.solution)
+        payload["solver"] = task_record.solver
+        payload["solve_duration"] = (task_record.solve_time - task_record.upload_time).total_seconds() * 1000
+        payload["stage_timings"] = task_record.stage_timings
+        yield "data: " + json.dumps(payload, ensure_ascii=False) + "\n\n"
+    elif not task_record.canceled:
+        yield "data: [error]\n\n"
+    yield "data: [end]\n\n"
+
+# Условия задачи в виде SparseProblem: из сжатого представления или, у старых задач, из JSON
+def task_problem(task_record):
+    if task_record.conditions_data is not None:
+        return unpack_problem(task_record.conditions_data)
+    return from_conditions(task_record.conditions)
+
+# Эндпоинт части решения задачи для интерфейса: переменные (part=variables) или
+# ограничения (part=constraints) постранично (offset, limit) или top штук
+# с наибольшим модулем поля by (например, top=20&by=dual)
+@app.route('/task/<task_id>/solution', methods=['GET'])
+def task_solution(task_id):
+    task_record = load_task(task_id)
+    if not task_record:
+        return jsonify({"error": "Задача не найдена"}), 404
+    if not task_record.solution:
+        return jsonify({"error": "Задача еще не решена"}), 404
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    top = request.args.get('top', type=int)
+    if offset < 0 or (limit is not None and limit < 0) or (top is not None and top < 0):
+        return jsonify({"error": "offset, limit и top должны быть неотрицательными"}), 400
+    try:
+        page = solution_page(task_record.solution, request.args.get('part', 'variables'), offset, limit, top, request.args.get('by'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page), 200
+
+# Эндпоинт скачивания условий задачи в Excel. Файл генерируется при первом запросе и сохраняется в БД
+@app.route('/task/conditions_excel/<task_id>', methods=['GET'])
+def download_conditions_excel(task_id):
+    session = SessionLocal()
+    task_record = session.query(Task).filter(Task.task_id == task_id).first()
+    if not task_record:
+        session.close()
+        return jsonify({"error": "Задача не найдена"}), 404
+    excel_bytes = task_record.conditions_xlsx
+    if excel_bytes is None and task_record.conditions_excel:
+        excel_bytes = base64.b64decode(task_record.conditions_excel)
+    if excel_bytes is None:
+        try:
+            excel_bytes = generate_excel(task_problem(task_record))
+        except ValueError as e:
+            session.close()
+            return jsonify({"error": str(e)}), 400
+        task_record.conditions_xlsx = excel_bytes
+        session.commit()
+    session.close()
+    return send_file(
+        BytesIO(excel_bytes),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name=f"conditions_{task_id}.xlsx",
+    )
+
+def load_task(task_id):
+    session = SessionLocal()
+    # Excel файл нужен только при скачивании, при чтении задачи он не загружается
+    task_record = (
+        session.query(Task)
+        .options(defer(Task.conditions_xlsx), defer(Task.conditions_excel))
+        .filter(Task.task_id == task_id)
+        .first()
+    )
+    session.close()
+    return task_record
+
 # Эндпоинт отмены решения задачи
 @app.route('/task/cancel_task/<task_id>', methods=['POST'])
 def cancel_task(task_id):
@@ -215,11 +866,59 @@ def cancel_task(task_id):
     if not task_record:
         session.close()
         return jsonify({"error": "Задача не найдена"}), 404
-    # Устанавливаем флаг отмены
+    # Устанавливаем флаг отмены и останавливаем решение: задача убирается из очереди,
+    # а если уже решается - рабочий процесс завершается вместе с решателем.
+    # Рабочий узел очереди БД узнает об отмене при следующем обновлении heartbeat_time
+    # Флаг сохраняется до остановки: результат отмененной задачи не записывается,
+    # а ожидавшие ее одинаковые задачи отправляются на решение заново
     task_record.canceled = True
     session.commit()
     session.close()
+    scheduler.cancel(task_id)
+    event_bus.publish(task_id, {"type": "canceled"})
     return jsonify({"message": "Задача отменена"}), 200
 
+# Эндпоинт статистики кэша решений для мониторинга
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(solution_cache.snapshot()), 200
+
+# Путь к профилю cProfile задачи
+def profile_path(task_id):
+    return os.path.join(PROFILE_DIR, f"{task_id}.prof")
+
+# Эндпоинт профиля решения задачи, запущенной с profile=true: текстовый отчет
+# по суммарному времени функций или, с format=raw, файл для snakeviz/pstats
+@app.route('/task/<task_id>/profile', methods=['GET'])
+def task_profile(task_id):
+    try:
+        uuid.UUID(task_id)
+    except ValueError:
+        return jsonify({"error": "Некорректный идентификатор задачи"}), 400
+    if not PROFILE_DIR or not os.path.exists(profile_path(task_id)):
+        return jsonify({"error": "Профиль задачи не найден"}), 404
+    if request.args.get('format') == 'raw':
+        return send_file(profile_path(task_id), mimetype="application/octet-stream",
+                         as_attachment=True, download_name=f"{task_id}.prof")
+    return Response(profile_report(profile_path(task_id)), mimetype="text/plain")
+
+# Эндпоинт метрик в текстовом формате Prometheus
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    lines = []
+    for metric in (STAGE_SECONDS, TASK_SECONDS, REQUEST_SECONDS, TASKS_TOTAL, DB_CHECKOUTS, DB_CHECKINS):
+        lines += metric.render()
+    queue = task_queue if task_queue is not None else scheduler
+    lines += render_gauge('milp_queue_depth', "Задания в очереди", queue.queue_depth)
+    lines += render_gauge('milp_active_solvers', "Задания, которые решаются сейчас", queue.active_count)
+    lines += render_gauge('milp_workers', "Рабочие процессы планировщика", scheduler.num_workers)
+    pool = engine.pool
+    if hasattr(pool, 'checkedout'):
+        lines += render_gauge('milp_db_connections_in_use', "Соединения с БД, занятые сессиями", pool.checkedout())
+    for name, value in solution_cache.snapshot().items():
+        if isinstance(value, (int, float)):
+            lines += render_gauge(f'milp_cache_{name}', "Статистика кэша решений", value)
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
 if __name__ == '__main__':
     app.run(debug=True, threaded=True)
@@ -0,0 +1,263 @@
+"""
+Асинхронный (ASGI) режим веб-приложения. Загрузка задач (/task, /task/excel),
+SSE поток хода решения и отмена обрабатываются в цикле событий asyncio: открытый
+SSE поток не занимает поток ОС, а ждет события на асинхронной подписке шины событий.
+Чтение и запись задач идут через асинхронное подключение к БД (asyncpg или aiosqlite).
+Остальные эндпоинты обслуживает Flask приложение через WsgiToAsgi.
+
+Запуск из директории backend:
+    uvicorn asgi:app --port 5000
+"""
+import asyncio
+import json
+import os
+import time
+import traceback
+from io import BytesIO
+
+import app as flask_app
+from asgiref.wsgi import WsgiToAsgi
+from helpers import ExcelValidationError, read_excel_problem
+from metrics import StageTimer
+from scheduler import QueueFullError
+from sqlalchemy import delete, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import defer
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+Task = flask_app.Task
+
+# Асинхронные драйверы для синхронных URL базы данных
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_database_url(url):
+    """URL базы данных для асинхронного движка: ASYNC_DATABASE_URL или DATABASE_URL с асинхронным драйвером."""
+    if os.getenv("ASYNC_DATABASE_URL"):
+        return os.getenv("ASYNC_DATABASE_URL")
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+async_engine = create_async_engine(async_database_url(flask_app.DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Чтения, которые сейчас выполняются: {(вид чтения, task_id): future}
+_pending_reads = {}
+
+
+async def shared_read(kind, task_id, read):
+    """
+    Объединяет одновременные чтения одной задачи: SSE потоки, которые следят за одной
+    задачей, получают результат одного запроса к БД вместо запроса на каждый поток.
+    """
+    key = (kind, task_id)
+    future = _pending_reads.get(key)
+    if future is None:
+        future = asyncio.ensure_future(read())
+        _pending_reads[key] = future
+        future.add_done_callback(lambda _: _pending_reads.pop(key, None))
+    return await asyncio.shield(future)
+
+
+async def load_task(task_id):
+    return await shared_read('task', task_id, lambda: _load_task(task_id))
+
+
+async def _load_task(task_id):
+    async with AsyncSessionLocal() as session:
+        # Excel файл нужен только при скачивании, при чтении задачи он не загружается
+        result = await session.execute(
+            select(Task)
+            .options(defer(Task.conditions_xlsx), defer(Task.conditions_excel))
+            .where(Task.task_id == task_id)
+        )
+        return result.scalars().first()
+
+
+def error_response(message, status_code=400, **fields):
+    return JSONResponse(dict(fields, error=message), status_code=status_code)
+
+
+# Создание записи о задаче и отправка ее на решение. Разбор условий, канонический ключ
+# и постановка в очередь выполняются в пуле потоков, запись в БД - асинхронно
+async def submit_task(problem, solver, backend, limits, conditions_xlsx=None, presolve=False, timer=None, profile=False):
+    timer = timer or StageTimer()
+    task_record, row_order = await run_in_threadpool(
+        flask_app.new_task_record, problem, solver, backend, limits, conditions_xlsx,
+        presolve=presolve, stages=timer.stages, profile=profile,
+    )
+    task_id, solver, key = task_record.task_id, task_record.solver, task_record.conditions_hash
+    with timer.stage('persist'):
+        async with AsyncSessionLocal() as session:
+            session.add(task_record)
+            await session.commit()
+    flask_app.problem_cache.put(task_id, problem)
+
+    try:
+        # Планировщик только ставит задачу в очередь, результат придет событием шины
+        position = await run_in_threadpool(
+            flask_app.dispatch_task, task_id, problem, solver, backend, limits, key, row_order,
+            None, presolve, profile, timer.stages,
+        )
+    except QueueFullError as e:
+        # Очередь заполнена: удаляем запись о задаче и просим клиента повторить позже
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Task).where(Task.task_id == task_id))
+            await session.commit()
+        return error_response(str(e), 429)
+    return JSONResponse({'task_id': task_id, 'queue_position': position, 'solver': solver}, status_code=202)
+
+
+# Эндпоит загрузки задачи через инпуты
+async def solve_milp_route(request):
+    timer = StageTimer()
+    with timer.stage('parse'):
+        data = await request.json()
+    solver = data.pop('solver', None)
+    backend = data.pop('backend', None) or 'pyomo'
+    presolve = flask_app.parse_presolve(data.pop('presolve', None))
+    profile = flask_app.parse_flag(data.pop('profile', None))
+    try:
+        limits = flask_app.parse_limits(data.pop('time_limit', None), data.pop('mip_gap', None))
+    except ValueError as e:
+        return error_response(str(e))
+    try:
+        with timer.stage('validate'):
+            problem = await run_in_threadpool(flask_app.prepare_problem, data, backend)
+    except Exception as e:
+        print("An error occurred:", traceback.format_exc())
+        return error_response(str(e), 500)
+
+    return await submit_task(problem, solver, backend, limits, presolve=presolve, timer=timer, profile=profile)
+
+
+# Эндпоинт для загрузки Excel и запуска фоновой задачи
+async def upload_excel(request):
+    form = await request.form()
+    if 'file' not in form:
+        return error_response('Вы не отправили файл')
+
+    solver = form.get("solver")
+    backend = form.get("backend") or 'pyomo'
+    try:
+        limits = flask_app.parse_limits(form.get("time_limit"), form.get("mip_gap"))
+    except ValueError as e:
+        return error_response(str(e))
+    file = form['file']
+    if not file.filename.endswith('.xlsx'):
+        return error_response('Файл не является Excel файлом. Загрузите файл с расширением .xlsx')
+
+    if backend not in flask_app.BACKENDS:
+        return error_response(f"Неизвестный способ решения: {backend}")
+
+    timer = StageTimer()
+    with timer.stage('parse'):
+        excel_bytes = await file.read()
+    try:
+        with timer.stage('validate'):
+            problem = await run_in_threadpool(read_excel_problem, BytesIO(excel_bytes))
+    except ExcelValidationError as e:
+        return error_response(str(e), errors=e.errors)
+    except ValueError as e:
+        return error_response(str(e))
+
+    return await submit_task(
+        problem, solver, backend, limits, excel_bytes,
+        presolve=flask_app.parse_presolve(form.get("presolve")), timer=timer,
+        profile=flask_app.parse_flag(form.get("profile")),
+    )
+
+
+async def queue_position(task_id):
+    if flask_app.task_queue is not None:
+        return await shared_read('position', task_id, lambda: run_in_threadpool(flask_app.task_queue.position, task_id))
+    return flask_app.scheduler.position(task_id)
+
+
+# Эндпоинт SSE для получения обновлений по задаче. Поток ждет событие на асинхронной
+# подписке; позиция в очереди планировщика проверяется раз в секунду, пока задача в очереди
+async def task_progress(request):
+    task_id = request.path_params['task_id']
+
+    async def event_stream():
+        # Подписываемся до чтения задачи из БД, чтобы не пропустить событие о завершении
+        subscription = flask_app.event_bus.subscribe_async(task_id)
+        try:
+            task_record = await load_task(task_id)
+            if not task_record:
+                yield "data: [error]\n\n"
+                return
+
+            last_message = None
+            position = await queue_position(task_id)
+            last_sent = last_loaded = time.monotonic()
+            while task_record.solve_time is None and not task_record.canceled:
+                message = flask_app.progress_message(position)
+                now = time.monotonic()
+                if message != last_message:
+                    yield f"data: {message}\n\n"
+                    last_message, last_sent = message, now
+                elif now - last_sent >= flask_app.KEEPALIVE_INTERVAL:
+                    yield ": keepalive\n\n"
+                    last_sent = now
+
+                # Позиция в очереди планировщика меняется без событий, поэтому ее нужно проверять
+                polling = position and flask_app.task_queue is None
+                event = await subscription.get(timeout=1 if polling else flask_app.KEEPALIVE_INTERVAL)
+                if event is not None and event.get("type") == "progress":
+                    # Ход решения передается отдельным типом события, чтобы не путать его с итоговым результатом
+                    yield "event: progress\ndata: " + json.dumps(event) + "\n\n"
+                elif event is not None or time.monotonic() - last_loaded >= flask_app.RECHECK_INTERVAL:
+                    task_record = await load_task(task_id)
+                    last_loaded = time.monotonic()
+                    if flask_app.task_queue is not None:
+                        position = await queue_position(task_id)
+                if flask_app.task_queue is None:
+                    position = flask_app.scheduler.position(task_id)
+
+            for message in flask_app.final_messages(task_record):
+                yield message
+        finally:
+            subscription.close()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# Эндпоинт отмены решения задачи
+async def cancel_task(request):
+    task_id = request.path_params['task_id']
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Task).options(defer(Task.conditions_xlsx)).where(Task.task_id == task_id))
+        task_record = result.scalars().first()
+        if not task_record:
+            return error_response("Задача не найдена", 404)
+        # Устанавливаем флаг отмены и останавливаем решение: задача убирается из очереди,
+        # а если уже решается - рабочий процесс завершается вместе с решателем
+        task_record.canceled = True
+        await session.commit()
+    # Отмена задачи в очереди сразу завершает ее: результат и ожидавшие задачи
+    # обрабатываются синхронными запросами к БД, поэтому не в цикле событий
+    await run_in_threadpool(flask_app.scheduler.cancel, task_id)
+    # Публикация в PostgreSQL шину - синхронный запрос к БД
+    await run_in_threadpool(flask_app.event_bus.publish, task_id, {"type": "canceled"})
+    return JSONResponse({"message": "Задача отменена"})
+
+
+app = Starlette(
+    routes=[
+        Route('/task', solve_milp_route, methods=['POST']),
+        Route('/task/excel', upload_excel, methods=['POST']),
+        Route('/task/task_progress/{task_id}', task_progress, methods=['GET']),
+        Route('/task/cancel_task/{task_id}', cancel_task, methods=['POST']),
+        # Остальные эндпоинты - Flask приложение
+        Mount('/', app=WsgiToAsgi(flask_app.app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+)
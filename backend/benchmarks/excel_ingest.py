@@ -0,0 +1,160 @@
+"""
+Сравнение времени чтения Excel файла с условиями задачи: прежний путь
+(pd.read_excel, validate_data, convert_to_json, from_conditions) и
+read_excel_problem (read_only книга, проверки по столбцам, сразу SparseProblem).
+
+Запуск из директории backend:
+    python -m benchmarks.excel_ingest
+"""
+import time
+from io import BytesIO
+
+import pandas as pd
+from helpers import generate_excel, read_excel_problem
+from problem import from_conditions
+
+from benchmarks.generate import generate_conditions
+
+NUM_VARIABLES = 50
+CONSTRAINTS = [100, 1000, 5000]
+DENSITY = 0.2
+REPEATS = 3
+
+
+# Прежний путь чтения Excel файла (до read_excel_problem), оставлен для сравнения.
+# Валидация данных
+def validate_data(df):
+    # Определим индексы или названия строк, в которые помещены одноэлементные значения
+    index_variable_count = 0
+    index_objective_sense = 3
+    index_constraint_count = 4
+
+    # Валидация количества переменных
+    try:
+        num_variables = int(df.iloc[0, index_variable_count])
+    except:
+        raise ValueError("Количество переменных должно быть целым числом")
+
+    # Валидация количества ограничений
+    try:
+        num_constraints = int(df.iloc[0, index_constraint_count])
+    except:
+        raise ValueError("Количество ограничений должно быть целым числом")
+    objective_sense = df.iloc[0, index_objective_sense]
+
+    # Проверяем наличие столбцов
+    expected_columns = {'Количество переменных', 'Указание на целочисленность', 'Коэффициенты функции', 'Вид оптимизации', 'Количество ограничений'}
+    for i in range(num_constraints):
+        expected_columns.add(f'Коэффициенты ограничения {i+1}')
+        expected_columns.add(f'Правая часть ограничения {i+1}')
+        expected_columns.add(f'Знак ограничения {i+1}')
+    if not expected_columns.issubset(df.columns):
+        raise ValueError('Неверный формат данных: пропущен обязательный столбец данных')
+
+    # Валидация указания на целочисленность и коэффициентов
+    if len(df.iloc[:, 1].dropna()) != num_variables:
+        raise ValueError("Количество элементов в столбце указания на целочисленность не совпадает с количеством переменных")
+    for x in df.iloc[:, 1]:
+        if x != 'NonNegativeReals' and x != 'NonNegativeIntegers' and x != 'Integers' and x != 'Reals' and x != 'Binary':
+            raise ValueError(f"Неверный формат значений столбца указания на целочисленность")
+    if len(df.iloc[:, 2].dropna()) != num_variables:
+        raise ValueError("Количество элементов в столбце коэффициентов функции не совпадает с количеством переменных")
+    for x in df.iloc[:, 2]:
+        try:
+            float(x)
+        except:
+            raise ValueError(f"Коэффициентами функции могут быть только числа")
+
+    # Валидация вида оптимизации
+    if objective_sense != 'maximize' and objective_sense != 'minimize':
+        raise ValueError("Неверный вид оптимизации")
+
+    # Валидация ограничений
+    for i in range(num_constraints):
+        if len(df.iloc[:, 5 + 3*i].dropna()) != num_variables:
+            raise ValueError(f"Количество коэффициентов в {i+1}-м ограничении не совпадает с количеством переменных")
+        for x in df.iloc[:, 5 + 3*i]:
+            try:
+                float(x)
+            except:
+                raise ValueError(f"Коэффициентами ограничений могут быть только числа")
+        try:
+            float(df.iloc[0, 6 + 3*i])
+        except:
+            raise ValueError(f"Неверно задана правая часть в {i+1}-м ограничении")
+        if df.iloc[0, 7 + 3*i] != '=' and df.iloc[0, 7 + 3*i] != '<=' and df.iloc[0, 7 + 3*i] != '>=':
+            raise ValueError(f"Неверно задан знак ограничения в {i+1}-м ограничении")
+
+
+# Преобразование данных в JSON
+def convert_to_json(df):
+    objective_sense = df.iloc[0, 3].strip().lower()
+    num_constraints = int(df.iloc[0, 4])
+
+    # Определим целочисленность переменных
+    variable_domains = df.iloc[:, 1].tolist()
+
+    # Формируем данные об объективной функции
+    objective_coefficients = df.iloc[:, 2].tolist()
+
+    objective = {
+        "coefficients": objective_coefficients,
+        "sense": objective_sense
+    }
+
+    # Формирование ограничений
+    constraints = []
+
+    for i in range(num_constraints):
+        start_col = 5 + 3*i
+        coefficients = df.iloc[:, start_col].tolist()
+        rhs = float(df.iloc[0, start_col + 1])
+        sense = df.iloc[0, start_col + 2]
+
+        constraint = {
+            "coefficients": coefficients,
+            "rhs": rhs,
+            "sense": sense
+        }
+
+        constraints.append(constraint)
+
+    # Создание JSON структуры
+    data_json = {
+        "objective": objective,
+        "variable_domains": variable_domains,
+        "constraints": constraints
+    }
+
+    return data_json
+
+
+def read_pandas(excel_bytes):
+    df = pd.read_excel(BytesIO(excel_bytes), engine='openpyxl')
+    validate_data(df)
+    return from_conditions(convert_to_json(df))
+
+
+def measure(read, excel_bytes):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        read(excel_bytes)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print(f"{'переменные':>10} {'ограничения':>11} {'файл, МБ':>8} | {'pandas, с':>9} {'streaming, с':>12}")
+    for num_constraints in CONSTRAINTS:
+        problem = from_conditions(generate_conditions(NUM_VARIABLES, num_constraints, DENSITY))
+        excel_bytes = generate_excel(problem)
+        pandas_time = measure(read_pandas, excel_bytes)
+        streaming_time = measure(lambda data: read_excel_problem(BytesIO(data)), excel_bytes)
+        size = len(excel_bytes) / 2**20
+        print(f"{NUM_VARIABLES:>10} {num_constraints:>11} {size:>8.2f} | {pandas_time:>9.2f} {streaming_time:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
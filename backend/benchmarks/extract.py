@@ -0,0 +1,67 @@
+"""
+Сравнение извлечения результата из решенной модели Pyomo: прежний способ
+(вычисление каждого ограничения constraint(), lslack(), uslack(), model.dual
+и строки чисел в списке словарей) и чтение массивами (sensitivity.solution_arrays)
+без диапазонов и с диапазонами. Для каждого способа выводятся время извлечения
+и размер решения в JSON.
+
+Запуск из директории backend:
+    python -m benchmarks.extract [glpk|cbc]
+"""
+import json
+import shutil
+import sys
+import time
+
+from model import _model_arrays, build_model
+from problem import from_conditions
+from pyomo.environ import SolverFactory
+
+from benchmarks.generate import generate_conditions
+
+SIZES = [(200, 100), (1000, 400), (3000, 1000)]
+DENSITY = 0.05
+EXECUTABLES = {'glpk': 'glpsol', 'cbc': 'cbc'}
+
+
+def extract_rows(model):
+    """Извлечение результата по одному ограничению, как до перехода на массивы."""
+    sensitivity = []
+    for (i, constraint) in model.constraints.items():
+        sensitivity.append({
+            "name": f"Ограничение {i}",
+            "value": str(constraint()),
+            "lslack": str(constraint.lslack()),
+            "uslack": str(constraint.uslack()),
+            "dual": str(model.dual.get(constraint))
+        })
+    return {'variable_values': {i: model.variables[i].value for i in model.variables}, 'sensitivity': sensitivity}
+
+
+def measure(extract):
+    start = time.perf_counter()
+    result = extract()
+    return time.perf_counter() - start, len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+
+
+def main():
+    solvers = sys.argv[1:] or [name for name, executable in EXECUTABLES.items() if shutil.which(executable)]
+    print(f"{'решатель':>8} {'переменные':>10} {'ограничения':>11} | {'по строкам, с':>13} {'массивы, с':>10} {'+ranging, с':>11} | {'JSON, КБ':>20}")
+    for solver in solvers:
+        for num_variables, num_constraints in SIZES:
+            problem = from_conditions(generate_conditions(num_variables, num_constraints, DENSITY))
+            model = build_model(problem)
+            model.solutions.load_from(SolverFactory(solver).solve(model, load_solutions=False))
+            # Решатель записывает только ненулевые значения, а прежнему способу нужны значения всех переменных
+            for variable in model.variables.values():
+                if variable.value is None:
+                    variable.value = 0
+            rows_time, rows_size = measure(lambda: extract_rows(model))
+            arrays_time, arrays_size = measure(lambda: _model_arrays(model, problem))
+            ranging_time, ranging_size = measure(lambda: _model_arrays(model, problem, ranges=True))
+            sizes = f"{rows_size / 1024:.0f} / {arrays_size / 1024:.0f} / {ranging_size / 1024:.0f}"
+            print(f"{solver:>8} {num_variables:>10} {num_constraints:>11} | {rows_time:>13.3f} {arrays_time:>10.3f} {ranging_time:>11.3f} | {sizes:>20}")
+
+
+if __name__ == '__main__':
+    main()
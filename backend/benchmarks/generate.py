@@ -0,0 +1,61 @@
+import random
+
+# Генерация случайных задач для бенчмарков
+
+
+def generate_conditions(num_variables, num_constraints, density, integer_fraction=0.0, seed=0):
+    """
+    Генерирует условия задачи в формате JSON, который принимает эндпоинт /task.
+    density - доля ненулевых коэффициентов в каждом ограничении.
+    """
+    rng = random.Random(seed)
+    variable_domains = [
+        'NonNegativeIntegers' if rng.random() < integer_fraction else 'NonNegativeReals'
+        for _ in range(num_variables)
+    ]
+    objective = [round(rng.uniform(1, 10), 2) for _ in range(num_variables)]
+
+    constraints = []
+    for _ in range(num_constraints):
+        coefficients = [
+            round(rng.uniform(1, 10), 2) if rng.random() < density else 0
+            for _ in range(num_variables)
+        ]
+        constraints.append({
+            "coefficients": coefficients,
+            "rhs": round(rng.uniform(10, 100) * num_variables * density, 2),
+            "sense": '<=',
+        })
+
+    return {
+        "objective": {"coefficients": objective, "sense": 'maximize'},
+        "variable_domains": variable_domains,
+        "constraints": constraints,
+    }
+
+
+def add_redundancy(data, seed=0):
+    """
+    Добавляет в условия задачи то, что часто встречается во введенных вручную задачах:
+    пропорциональные копии ограничений, пустые ограничения, ограничения с одной
+    переменной и фиксированные переменные.
+    """
+    rng = random.Random(seed)
+    num_variables = len(data['variable_domains'])
+    constraints = list(data['constraints'])
+    for constr in data['constraints'][:len(data['constraints']) // 4]:
+        factor = rng.choice([2, 0.5, -1])
+        constraints.append({
+            "coefficients": [value * factor for value in constr['coefficients']],
+            "rhs": round(constr['rhs'] * factor * rng.choice([1, 1.1]), 2),
+            "sense": constr['sense'] if factor > 0 else '>=',
+        })
+    for _ in range(max(1, num_variables // 20)):
+        constraints.append({"coefficients": [0] * num_variables, "rhs": 0, "sense": '<='})
+    for j in rng.sample(range(num_variables), num_variables // 5):
+        coefficients = [0] * num_variables
+        coefficients[j] = 1
+        sense = rng.choice(['<=', '='])
+        constraints.append({"coefficients": coefficients, "rhs": 0 if sense == '=' else rng.randint(5, 20), "sense": sense})
+    rng.shuffle(constraints)
+    return dict(data, constraints=constraints)
@@ -0,0 +1,104 @@
+"""
+Нагрузочный тест запущенного приложения: отправляет задачи на /task,
+дожидается результата каждой через SSE поток и выводит пропускную
+способность, p50/p99 задержки и количество отказов (HTTP 429).
+
+Запуск из директории backend при запущенном app.py:
+    python -m benchmarks.load_test --tasks 300 --concurrency 50
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.generate import generate_conditions
+
+
+def submit(base_url, data):
+    request = urllib.request.Request(
+        f"{base_url}/task",
+        data=json.dumps(data).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())['task_id']
+
+
+def wait_result(base_url, task_id):
+    """Читает SSE поток задачи до финального сообщения. Возвращает True при успешном решении."""
+    with urllib.request.urlopen(f"{base_url}/task/task_progress/{task_id}") as response:
+        for raw in response:
+            line = raw.decode('utf-8').strip()
+            if not line.startswith('data: '):
+                continue
+            message = line[len('data: '):]
+            if message.startswith('{'):
+                return True
+            if message in ('[error]', '[end]'):
+                return False
+    return False
+
+
+def run_one(base_url, data, stats, lock):
+    start = time.perf_counter()
+    try:
+        task_id = submit(base_url, data)
+    except urllib.error.HTTPError as ex:
+        with lock:
+            stats['rejected' if ex.code == 429 else 'failed'] += 1
+        return
+    ok = wait_result(base_url, task_id)
+    elapsed = time.perf_counter() - start
+    with lock:
+        if ok:
+            stats['latencies'].append(elapsed)
+        else:
+            stats['failed'] += 1
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--tasks', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--solver', default='glpk')
+    args = parser.parse_args()
+
+    # Смесь маленьких и больших задач, чтобы была видна работа приоритетов
+    problems = []
+    for k in range(args.tasks):
+        size = (20, 10) if k % 4 else (300, 150)
+        data = generate_conditions(*size, density=0.2, integer_fraction=0.3, seed=k)
+        data['solver'] = args.solver
+        problems.append(data)
+
+    stats = {'latencies': [], 'rejected': 0, 'failed': 0}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for data in problems:
+            executor.submit(run_one, args.url, data, stats, lock)
+    total = time.perf_counter() - start
+
+    latencies = stats['latencies']
+    print(f"Решено задач:       {len(latencies)} из {args.tasks}")
+    print(f"Отклонено (429):    {stats['rejected']}")
+    print(f"Ошибок:             {stats['failed']}")
+    print(f"Пропускная способность: {len(latencies) / total:.2f} задач/с")
+    print(f"Задержка p50:       {percentile(latencies, 50):.2f} с")
+    print(f"Задержка p99:       {percentile(latencies, 99):.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Сравнение времени построения и пикового потребления памяти двух способов
+построения модели: create_model (поэлементные выражения) и create_model_sparse (CSR).
+
+Запуск из директории backend:
+    python -m benchmarks.model_build
+"""
+import gc
+import time
+import tracemalloc
+
+from model import create_model, create_model_sparse
+from problem import from_conditions
+
+from benchmarks.generate import generate_conditions
+
+SIZES = [(500, 200), (2000, 800), (5000, 2000)]
+DENSITIES = [0.01, 0.1]
+
+
+def measure(build, data):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    build(data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    print(f"{'переменные':>10} {'ограничения':>11} {'плотность':>9} | {'dense, с':>9} {'dense, МБ':>9} | {'sparse, с':>9} {'sparse, МБ':>10}")
+    for num_variables, num_constraints in SIZES:
+        for density in DENSITIES:
+            data = generate_conditions(num_variables, num_constraints, density)
+            dense_time, dense_memory = measure(create_model, data)
+            sparse_time, sparse_memory = measure(lambda d: create_model_sparse(from_conditions(d)), data)
+            print(f"{num_variables:>10} {num_constraints:>11} {density:>9} | {dense_time:>9.2f} {dense_memory:>9.1f} | {sparse_time:>9.2f} {sparse_memory:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Сравнение времени решения задач с повторяющимися ограничениями, ограничениями
+с одной переменной и фиксированными переменными без упрощения и с упрощением
+(presolve.py). Время с упрощением включает само упрощение и восстановление решения.
+
+Запуск из директории backend:
+    python -m benchmarks.presolve [glpk|cbc|scip]
+"""
+import shutil
+import sys
+import time
+
+from model import solve_problem
+from presolve import presolve
+from problem import from_conditions
+
+from benchmarks.generate import add_redundancy, generate_conditions
+
+# (переменные, ограничения, плотность, доля целочисленных переменных)
+SIZES = [(200, 100, 0.05, 0.0), (1000, 500, 0.05, 0.0), (3000, 1500, 0.05, 0.0), (40, 30, 0.3, 0.5), (80, 60, 0.3, 0.5)]
+EXECUTABLES = {'glpk': 'glpsol', 'cbc': 'cbc', 'scip': 'scip'}
+
+
+def measure(problem, solver, use_presolve):
+    start = time.perf_counter()
+    result = solve_problem(problem, solver, presolve=use_presolve)
+    return time.perf_counter() - start, result.get('objective')
+
+
+def main():
+    solvers = sys.argv[1:] or [name for name, executable in EXECUTABLES.items() if shutil.which(executable)]
+    print(f"{'решатель':>8} {'переменные':>10} {'ограничения':>11} {'удалено':>13} | {'без, с':>7} {'presolve, с':>11} | {'целевая функция':>30}")
+    for solver in solvers:
+        for num_variables, num_constraints, density, integer_fraction in SIZES:
+            data = add_redundancy(generate_conditions(num_variables, num_constraints, density, integer_fraction))
+            problem = from_conditions(data)
+            stats = presolve(problem).stats
+            removed = f"{stats['removed_rows']}/{stats['removed_columns']}"
+            plain_time, plain_objective = measure(problem, solver, False)
+            presolve_time, presolve_objective = measure(problem, solver, True)
+            objectives = f"{plain_objective} / {presolve_objective}"
+            print(f"{solver:>8} {num_variables:>10} {problem.num_constraints:>11} {removed:>13} | {plain_time:>7.2f} {presolve_time:>11.2f} | {objectives:>30}")
+
+
+if __name__ == '__main__':
+    main()
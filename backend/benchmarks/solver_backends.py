@@ -0,0 +1,48 @@
+"""
+Сравнение полной задержки решения (построение + запись файла + решение + чтение
+результата) для решения через Pyomo и прямой записи LP файла.
+
+Запуск из директории backend:
+    python -m benchmarks.solver_backends [glpk|cbc|scip]
+"""
+import shutil
+import sys
+import time
+
+from model import build_model, solve_direct, solve_model
+from problem import from_conditions
+
+from benchmarks.generate import generate_conditions
+
+SIZES = [(100, 50), (1000, 400), (3000, 1000)]
+DENSITY = 0.05
+EXECUTABLES = {'glpk': 'glpsol', 'cbc': 'cbc', 'scip': 'scip'}
+
+
+def solve_pyomo(data, solver):
+    problem = from_conditions(data)
+    return solve_model(build_model(problem), problem, solver)
+
+
+def solve_lp_file(data, solver):
+    return solve_direct(from_conditions(data), solver)
+
+
+def main():
+    solvers = sys.argv[1:] or [name for name, executable in EXECUTABLES.items() if shutil.which(executable)]
+    print(f"{'решатель':>8} {'переменные':>10} {'ограничения':>11} | {'pyomo, с':>9} {'direct, с':>9} | {'целевая функция':>30}")
+    for solver in solvers:
+        for num_variables, num_constraints in SIZES:
+            data = generate_conditions(num_variables, num_constraints, DENSITY)
+            start = time.perf_counter()
+            pyomo_result = solve_pyomo(data, solver)
+            pyomo_time = time.perf_counter() - start
+            start = time.perf_counter()
+            direct_result = solve_lp_file(data, solver)
+            direct_time = time.perf_counter() - start
+            objectives = f"{pyomo_result.get('objective')} / {direct_result.get('objective')}"
+            print(f"{solver:>8} {num_variables:>10} {num_constraints:>11} | {pyomo_time:>9.2f} {direct_time:>9.2f} | {objectives:>30}")
+
+
+if __name__ == '__main__':
+    main()
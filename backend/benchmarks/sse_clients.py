@@ -0,0 +1,86 @@
+"""
+Нагрузка от SSE клиентов: число запросов к БД и процессорное время при N
+одновременно открытых потоках /task/task_progress/<task_id>.
+
+Сравниваются прежний способ (каждый клиент раз в секунду читает задачу из БД)
+и текущий (клиенты ждут события о завершении на шине событий).
+
+Запуск из директории backend (по умолчанию используется временная база SQLite):
+    python -m benchmarks.sse_clients --clients 1000 --seconds 10
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///sse_benchmark.db")
+
+from sqlalchemy import event
+
+import app as backend
+
+
+def legacy_stream(task_id, stop):
+    """Прежний цикл SSE обработчика: запрос к БД каждую секунду."""
+    while not stop.is_set():
+        session = backend.SessionLocal()
+        task_record = session.query(backend.Task).filter(backend.Task.task_id == task_id).first()
+        session.close()
+        if task_record.solve_time is not None:
+            stop.wait(1)
+            continue
+        time.sleep(1)
+
+
+def current_stream(task_id, stop):
+    with backend.app.test_request_context():
+        response = backend.task_progress(task_id)
+    for _ in response.response:
+        pass
+
+
+def run(mode, clients, seconds):
+    task_id = str(uuid.uuid4())
+    session = backend.SessionLocal()
+    session.add(backend.Task(task_id=task_id, conditions={}, solver='glpk'))
+    session.commit()
+    session.close()
+
+    queries = [0]
+    lock = threading.Lock()
+
+    def count(*args):
+        with lock:
+            queries[0] += 1
+
+    event.listen(backend.engine, "before_cursor_execute", count)
+    stop = threading.Event()
+    target = legacy_stream if mode == 'legacy' else current_stream
+    threads = [threading.Thread(target=target, args=(task_id, stop), daemon=True) for _ in range(clients)]
+    cpu_start = time.process_time()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    # Завершаем задачу: в текущем режиме это событие закрывает все потоки
+    backend.process_task(task_id, {'termination_condition': 'optimal', 'message': ''}, None)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    cpu = time.process_time() - cpu_start
+    event.remove(backend.engine, "before_cursor_execute", count)
+    return queries[0], cpu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--seconds', type=int, default=10)
+    args = parser.parse_args()
+    for mode in ('legacy', 'current'):
+        queries, cpu = run(mode, args.clients, args.seconds)
+        print(f"{mode:>8}: {args.clients} клиентов, {args.seconds} с — запросов к БД: {queries}, процессорное время: {cpu:.2f} с")
+
+
+if __name__ == '__main__':
+    main()
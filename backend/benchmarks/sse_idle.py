@@ -0,0 +1,189 @@
+"""
+Нагрузочный тест бездействующих SSE клиентов: N одновременно открытых потоков
+/task/task_progress/<task_id> для задачи, которая не решается. Измеряются память
+(RSS) и число потоков сервера, время до первого сообщения потока и задержка
+обычных запросов (POST /task, GET /cache/stats), пока все потоки открыты.
+
+Сервер запускается отдельным процессом: asgi - uvicorn asgi:app, wsgi - Flask
+app.run(threaded=True). Задача ставится в очередь в БД (TASK_QUEUE=database) без
+рабочих узлов, поэтому она остается в очереди, а потоки только поддерживают соединение.
+
+Запуск из директории backend (по умолчанию используется временная база SQLite):
+    python -m benchmarks.sse_idle --clients 5000 --server asgi
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.generate import generate_conditions
+
+HOST = '127.0.0.1'
+# Одновременно устанавливаемые соединения при подключении клиентов
+CONNECT_CONCURRENCY = 200
+# Количество запросов для замера задержки под нагрузкой
+PROBES = 20
+
+
+def server_command(server, port):
+    if server == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', HOST, '--port', str(port),
+                '--log-level', 'warning', '--backlog', '8192']
+    return [sys.executable, '-c', f"import app; app.app.run(host='{HOST}', port={port}, threaded=True)"]
+
+
+def process_stats(pid):
+    """RSS в МБ и число потоков процесса из /proc."""
+    stats = {}
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            name, _, value = line.partition(':')
+            stats[name] = value.strip()
+    return int(stats['VmRSS'].split()[0]) / 1024, int(stats['Threads'])
+
+
+def request(base_url, path, data=None):
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    req = urllib.request.Request(f"{base_url}{path}", data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def wait_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("Сервер завершился при запуске")
+        try:
+            request(base_url, '/cache/stats')
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("Сервер не запустился")
+
+
+async def open_stream(port, task_id, connected, first_message, streams):
+    """
+    Открывает SSE поток, ждет первого сообщения (после него вызывается connected.set())
+    и дальше читает поток до закрытия.
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(f"GET /task/task_progress/{task_id} HTTP/1.1\r\nHost: {HOST}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Поток закрыт сервером")
+        if line.startswith(b'data:'):
+            break
+    first_message.append(time.perf_counter() - start)
+    streams.append(writer)
+    connected.set()
+    while await reader.read(4096):
+        pass
+
+
+async def probe(base_url, data):
+    """Задержка обычных запросов, пока открыты все потоки."""
+    latencies = {'POST /task': [], 'GET /cache/stats': []}
+    for k in range(PROBES):
+        start = time.perf_counter()
+        await asyncio.to_thread(request, base_url, '/task', dict(data, objective=dict(data['objective'], coefficients=[c + k + 1 for c in data['objective']['coefficients']])))
+        latencies['POST /task'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        await asyncio.to_thread(request, base_url, '/cache/stats')
+        latencies['GET /cache/stats'].append(time.perf_counter() - start)
+    return latencies
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(args, base_url, process, task_id, data):
+    first_message, streams, errors = [], [], []
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def client():
+        connected = asyncio.Event()
+        async with semaphore:
+            stream = asyncio.create_task(open_stream(args.port, task_id, connected, first_message, streams))
+            # Соединение считается установленным после первого сообщения потока
+            await asyncio.wait([stream, asyncio.create_task(connected.wait())], return_when=asyncio.FIRST_COMPLETED)
+        try:
+            await stream
+        except (OSError, ConnectionError) as ex:
+            errors.append(str(ex))
+
+    rss_before, threads_before = process_stats(process.pid)
+    start = time.perf_counter()
+    clients = [asyncio.create_task(client()) for _ in range(args.clients)]
+    while len(first_message) + len(errors) < args.clients:
+        await asyncio.sleep(0.1)
+    connect_time = time.perf_counter() - start
+    await asyncio.sleep(args.idle)
+    rss_after, threads_after = process_stats(process.pid)
+    latencies = await probe(base_url, data)
+
+    print(f"сервер: {args.server}, клиентов: {args.clients}, ошибок: {len(errors)}")
+    print(f"подключение всех клиентов: {connect_time:.2f} с")
+    if first_message:
+        print(f"первое сообщение потока: p50 {percentile(first_message, 0.5) * 1000:.1f} мс, "
+              f"p99 {percentile(first_message, 0.99) * 1000:.1f} мс")
+    print(f"память сервера: {rss_before:.1f} -> {rss_after:.1f} МБ "
+          f"({(rss_after - rss_before) * 1024 / max(len(first_message), 1):.1f} КБ на поток)")
+    print(f"потоки сервера: {threads_before} -> {threads_after}")
+    for name, values in latencies.items():
+        print(f"{name}: p50 {statistics.median(values) * 1000:.1f} мс, p99 {percentile(values, 0.99) * 1000:.1f} мс")
+    if errors:
+        print(f"первая ошибка: {errors[0]}")
+
+    for writer in streams:
+        writer.close()
+    for task in clients:
+        task.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--server', choices=['asgi', 'wsgi'], default='asgi')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--idle', type=float, default=5, help="секунды бездействия перед замерами")
+    args = parser.parse_args()
+
+    # Каждому клиенту и каждому соединению сервера нужен файловый дескриптор
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            DATABASE_URL=os.getenv("DATABASE_URL", f"sqlite:///{directory}/sse_idle.db"),
+            TASK_QUEUE='database',
+            SOLVER_QUEUE_SIZE=str(PROBES + 10),
+        )
+        process = subprocess.Popen(server_command(args.server, args.port), env=env)
+        try:
+            base_url = f"http://{HOST}:{args.port}"
+            wait_ready(base_url, process)
+            data = dict(generate_conditions(10, 5, 0.5), solver='cbc')
+            task_id = request(base_url, '/task', data)['task_id']
+            asyncio.run(run(args, base_url, process, task_id, data))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
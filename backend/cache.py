@@ -0,0 +1,180 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sensitivity import compact_solution
+
+# Количество значащих цифр, до которого округляются коэффициенты при вычислении ключа
+SIGNIFICANT_DIGITS = 12
+# Статусы, решение с которыми не зависит от лимитов и может быть переиспользовано
+CACHEABLE_TERMINATIONS = ('optimal', 'infeasible', 'unbounded')
+
+
+def _normalize(values):
+    """Округление до SIGNIFICANT_DIGITS значащих цифр, -0.0 приводится к 0.0."""
+    return np.array([float(f"{value:.{SIGNIFICANT_DIGITS}g}") + 0.0 for value in np.asarray(values, dtype=np.float64).tolist()])
+
+
+def canonical_key(problem, solver, mip_gap=None):
+    """
+    Ключ задачи, не зависящий от порядка ограничений и погрешности записи чисел.
+    Возвращает ключ и порядок строк: row_order[k] - индекс ограничения задачи,
+    которое стоит k-м в каноническом порядке.
+    """
+    row_digests = []
+    for i in range(problem.num_constraints):
+        indices, values = problem.row(i)
+        digest = hashlib.sha256()
+        digest.update(problem.row_senses[i].encode())
+        digest.update(_normalize([problem.rhs[i]]).tobytes())
+        digest.update(np.asarray(indices, dtype=np.int64).tobytes())
+        digest.update(_normalize(values).tobytes())
+        row_digests.append(digest.digest())
+    row_order = sorted(range(problem.num_constraints), key=lambda i: row_digests[i])
+
+    key = hashlib.sha256()
+    key.update(f"{solver}|{mip_gap}|{problem.sense}|{','.join(problem.domains)}".encode())
+    for values in (problem.objective, [problem.objective_offset], problem.lb, problem.ub):
+        key.update(_normalize(values).tobytes())
+    for i in row_order:
+        key.update(row_digests[i])
+    return key.hexdigest(), row_order
+
+
+def _reorder_sensitivity(sensitivity, mapping):
+    """Перенумеровывает строки анализа чувствительности: новый номер = mapping[старый индекс]."""
+    constraints = {}
+    for name, values in sensitivity['constraints'].items():
+        reordered = [None] * len(values)
+        for index, value in zip(mapping, values):
+            reordered[index] = value
+        constraints[name] = reordered
+    return dict(sensitivity, constraints=constraints)
+
+
+def canonicalize_solution(solution, row_order):
+    """Решение с ограничениями в каноническом порядке."""
+    solution = compact_solution(solution)
+    if not solution.get('sensitivity'):
+        return solution
+    position = np.argsort(row_order).tolist()
+    return dict(solution, sensitivity=_reorder_sensitivity(solution['sensitivity'], position))
+
+
+def restore_solution(solution, row_order):
+    """Решение из канонического порядка ограничений в порядок конкретной задачи."""
+    if not solution.get('sensitivity'):
+        return solution
+    return dict(solution, sensitivity=_reorder_sensitivity(solution['sensitivity'], row_order))
+
+
+class _Follower:
+    def __init__(self, task_id, row_order, resubmit):
+        self.task_id = task_id
+        self.row_order = row_order
+        self.resubmit = resubmit
+
+
+class SolutionCache:
+    """
+    LRU кэш решений по каноническому ключу условий задачи и учет задач,
+    которые решаются прямо сейчас: одинаковые задачи, пришедшие во время
+    решения, ждут результата первой (ведущей) задачи вместо повторного решения.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._solutions = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'db_hits': 0, 'misses': 0, 'evictions': 0, 'collapsed': 0}
+
+    def get(self, key):
+        with self._lock:
+            solution = self._solutions.get(key)
+            if solution is None:
+                self.stats['misses'] += 1
+                return None
+            self._solutions.move_to_end(key)
+            self.stats['hits'] += 1
+            return solution
+
+    def put(self, key, solution, from_db=False):
+        with self._lock:
+            if from_db:
+                # Решение найдено в таблице tasks после промаха в памяти
+                self.stats['misses'] -= 1
+                self.stats['hits'] += 1
+                self.stats['db_hits'] += 1
+            self._solutions[key] = solution
+            self._solutions.move_to_end(key)
+            while len(self._solutions) > self.max_size:
+                self._solutions.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def join(self, key, task_id, row_order, resubmit):
+        """
+        Регистрирует задачу с ключом key. Возвращает True, если задача стала ведущей
+        и ее нужно решать, False - если она будет ждать решения уже решаемой задачи.
+        resubmit() вызывается, если ведущая задача была отменена.
+        """
+        with self._lock:
+            if key in self._in_flight:
+                self._in_flight[key].append(_Follower(task_id, row_order, resubmit))
+                self.stats['collapsed'] += 1
+                return False
+            self._in_flight[key] = []
+            return True
+
+    def complete(self, key, solution):
+        """
+        Завершает решение ключа key. Кэширует решение, если его статус окончательный,
+        и возвращает ожидавшие задачи.
+        """
+        with self._lock:
+            followers = self._in_flight.pop(key, [])
+        if solution is not None and solution.get('termination_condition') in CACHEABLE_TERMINATIONS:
+            self.put(key, solution)
+        return followers
+
+    def abandon(self, key):
+        """Ведущая задача отменена: возвращает ожидавшие задачи, которые нужно отправить заново."""
+        with self._lock:
+            return self._in_flight.pop(key, [])
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, size=len(self._solutions), in_flight=len(self._in_flight))
+
+
+class ProblemCache:
+    """LRU кэш разобранных задач (SparseProblem) по task_id для повторного решения с изменениями."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._problems = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, task_id):
+        with self._lock:
+            problem = self._problems.get(task_id)
+            if problem is not None:
+                self._problems.move_to_end(task_id)
+            return problem
+
+    def put(self, task_id, problem):
+        with self._lock:
+            self._problems[task_id] = problem
+            self._problems.move_to_end(task_id)
+            while len(self._problems) > self.max_size:
+                self._problems.popitem(last=False)
+
+
+def create_problem_cache():
+    return ProblemCache(int(os.getenv("PROBLEM_CACHE_SIZE", 200)))
+
+
+def create_solution_cache():
+    return SolutionCache(int(os.getenv("SOLUTION_CACHE_SIZE", 1000)))
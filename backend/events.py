@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import queue
+import select
+import threading
+import time
+import traceback
+
+from sqlalchemy import text
+
+# Канал PostgreSQL LISTEN/NOTIFY, через который передаются события задач
+NOTIFY_CHANNEL = "task_events"
+
+
+class Subscription:
+    """Подписка на события одного канала (задачи). События читаются методом get."""
+
+    def __init__(self, bus, channel):
+        self._bus = bus
+        self.channel = channel
+        self._queue = queue.Queue()
+
+    def put(self, event):
+        self._queue.put(event)
+
+    def get(self, timeout=None):
+        """Следующее событие или None, если за timeout секунд событий не было."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """
+    Подписка для asyncio: события публикуются из потоков планировщика и шины,
+    а читаются в цикле событий без блокировки потока.
+    """
+
+    def __init__(self, bus, channel):
+        self._bus = bus
+        self.channel = channel
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def put(self, event):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    async def get(self, timeout=None):
+        """Следующее событие или None, если за timeout секунд событий не было."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """
+    Шина событий внутри процесса: process_task публикует события задачи,
+    SSE обработчики ждут их на подписке вместо опроса базы данных.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        return self._register(Subscription(self, channel))
+
+    def subscribe_async(self, channel):
+        """Подписка для asyncio, вызывается из цикла событий."""
+        return self._register(AsyncSubscription(self, channel))
+
+    def _register(self, subscription):
+        with self._lock:
+            self._subscribers.setdefault(subscription.channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, event):
+        self._deliver(channel, event)
+
+    def _deliver(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class PostgresEventBus(EventBus):
+    """
+    Шина событий поверх PostgreSQL LISTEN/NOTIFY: события доходят до подписчиков
+    во всех процессах и на всех серверах, подключенных к одной базе данных.
+    Одно соединение на процесс слушает канал и раздает события локальным подпискам.
+    """
+
+    def __init__(self, engine):
+        super().__init__()
+        self._engine = engine
+        self._listening = False
+
+    def _register(self, subscription):
+        # Слушающее соединение открывается при первой подписке, а не при импорте
+        with self._lock:
+            if not self._listening:
+                self._listening = True
+                threading.Thread(target=self._listen, daemon=True).start()
+        return super()._register(subscription)
+
+    def publish(self, channel, event):
+        payload = json.dumps({"channel": channel, "event": event}, ensure_ascii=False)
+        with self._engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+
+    def _listen(self):
+        while True:
+            try:
+                connection = self._engine.raw_connection()
+                try:
+                    dbapi_connection = connection.connection
+                    dbapi_connection.set_session(autocommit=True)
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    while True:
+                        if select.select([dbapi_connection], [], [], 5) == ([], [], []):
+                            continue
+                        dbapi_connection.poll()
+                        while dbapi_connection.notifies:
+                            notify = dbapi_connection.notifies.pop(0)
+                            message = json.loads(notify.payload)
+                            self._deliver(message["channel"], message["event"])
+                finally:
+                    connection.invalidate()
+            except Exception:
+                # Соединение потеряно, переподключаемся
+                traceback.print_exc()
+                time.sleep(1)
+
+
+def create_event_bus(engine):
+    """Создает шину событий: EVENT_BUS=postgres для LISTEN/NOTIFY, иначе внутри процесса."""
+    if os.getenv("EVENT_BUS", "memory") == "postgres":
+        return PostgresEventBus(engine)
+    return EventBus()
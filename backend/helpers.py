@@ -1,145 +1,204 @@
-import base64
 from io import BytesIO
+
+import numpy as np
 import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+from problem import DOMAINS, SENSES, SparseProblem, domain_bounds
+
+# Первые столбцы Excel файла с условиями, далее по три столбца на каждое ограничение
+EXCEL_HEADER = ["Количество переменных", "Указание на целочисленность", "Коэффициенты функции", "Вид оптимизации", "Количество ограничений"]
+# Сколько ошибок Excel файла показывать в сообщении
+MAX_REPORTED_ERRORS = 100
+# Максимальное количество столбцов листа Excel
+EXCEL_MAX_COLUMNS = 16384
+
+def _expected_header(num_constraints):
+    header = list(EXCEL_HEADER)
+    for i in range(1, num_constraints + 1):
+        header += [f"Коэффициенты ограничения {i}", f"Правая часть ограничения {i}", f"Знак ограничения {i}"]
+    return header
+
+def _excel_value(value):
+    # Целые значения записываются без дробной части, как их вводит пользователь
+    return int(value) if float(value).is_integer() else value
+
+def generate_excel(problem) -> bytes:
+    """
+    Генерирует Excel-файл с условиями задачи (SparseProblem) в формате, который
+    принимает /task/excel, и возвращает его содержимое. Книга создается в режиме
+    write_only: строки (по одной на переменную) записываются по мере формирования.
+    """
+    n = problem.num_variables
+    m = problem.num_constraints
+    # Задачи из MPS/LP файлов могут не помещаться в формат Excel условий
+    if len(EXCEL_HEADER) + 3 * m > EXCEL_MAX_COLUMNS:
+        raise ValueError(f"Задачу с {m} ограничениями нельзя записать в Excel: не больше {(EXCEL_MAX_COLUMNS - len(EXCEL_HEADER)) // 3} ограничений")
+    lb, ub = domain_bounds(problem.domains)
+    if not (np.array_equal(lb, problem.lb) and np.array_equal(ub, problem.ub)):
+        raise ValueError("Задачу с границами переменных нельзя записать в Excel: формат задает только области определения")
+    if problem.objective_offset != 0:
+        raise ValueError("Задачу с постоянным слагаемым целевой функции нельзя записать в Excel: в формате его нет")
+
+    # Столбцы матрицы ограничений: коэффициенты переменной j во всех ограничениях
+    rows = np.repeat(np.arange(m), np.diff(problem.indptr))
+    order = np.argsort(problem.indices, kind='stable')
+    column_ptr = np.concatenate(([0], np.cumsum(np.bincount(problem.indices, minlength=n))))
+    column_rows = rows[order]
+    column_values = problem.data[order]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(_expected_header(m))
+
+    objective = problem.objective.tolist()
+    rhs = [_excel_value(value) for value in problem.rhs.tolist()]
+    for j in range(n):
+        first = j == 0
+        coefficients = np.zeros(m)
+        start, end = column_ptr[j], column_ptr[j + 1]
+        coefficients[column_rows[start:end]] = column_values[start:end]
+        row = [
+            n if first else None,
+            problem.domains[j],
+            _excel_value(objective[j]),
+            problem.sense if first else None,
+            m if first else None,
+        ]
+        for i, value in enumerate(coefficients.tolist()):
+            row += [_excel_value(value), rhs[i] if first else None, problem.row_senses[i] if first else None]
+        sheet.append(row)
 
-# Валидация данных
-def validate_data(df):
-    # Определим индексы или названия строк, в которые помещены одноэлементные значения
-    index_variable_count = 0
-    index_objective_sense = 3
-    index_constraint_count = 4
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+class ExcelValidationError(ValueError):
+    """Ошибки в Excel файле с условиями задачи, каждая с адресом ячейки."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        message = "; ".join(errors[:MAX_REPORTED_ERRORS])
+        if len(errors) > MAX_REPORTED_ERRORS:
+            message += f"; и еще ошибок: {len(errors) - MAX_REPORTED_ERRORS}"
+        super().__init__(message)
+
+def _cell(row, column):
+    # Адрес ячейки по индексам строки данных и столбца (с нуля), первая строка листа - заголовок
+    return f"{get_column_letter(column + 1)}{row + 2}"
+
+def _to_numbers(values):
+    """Числа из значений ячеек, маски пустых ячеек и ячеек, которые не являются числами."""
+    numbers = pd.to_numeric(pd.Series(values.ravel(), dtype=object), errors='coerce').to_numpy(dtype=np.float64).reshape(values.shape)
+    empty = pd.isna(values)
+    return numbers, empty, np.isnan(numbers) & ~empty
+
+def _to_count(value, cell, what, errors):
+    numbers, empty, invalid = _to_numbers(np.array([value], dtype=object))
+    if empty[0] or invalid[0] or not numbers[0].is_integer() or numbers[0] < 0:
+        errors.append(f"{cell}: {what} должно быть целым неотрицательным числом")
+        return None
+    return int(numbers[0])
+
+def _report(errors, mask, columns, message, first_row=0):
+    # Ошибка для каждой отмеченной ячейки, columns[k] - номер столбца листа для k-го столбца маски
+    for row, k in np.argwhere(mask).tolist():
+        errors.append(f"{_cell(first_row + row, columns[k])}: {message(k)}")
+
+def read_excel_problem(file):
+    """
+    Читает Excel файл с условиями задачи сразу в SparseProblem.
 
-    # Валидация количества переменных
+    Книга читается в режиме read_only построчно, проверки выполняются
+    над целыми столбцами. Если в файле есть ошибки, выбрасывается
+    ExcelValidationError со списком всех ошибок и адресами ячеек.
+    """
     try:
-        num_variables = int(df.iloc[0, index_variable_count])
-    except:
-        raise ValueError("Количество переменных должно быть целым числом")
-
-    # Валидация количества ограничений
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"Ошибка в чтении Excel файла: {e}")
     try:
-        num_constraints = int(df.iloc[0, index_constraint_count])
-    except:
-        raise ValueError("Количество ограничений должно быть целым числом")
-    objective_sense = df.iloc[0, index_objective_sense]
-
-    # Проверяем наличие столбцов
-    expected_columns = {'Количество переменных', 'Указание на целочисленность', 'Коэффициенты функции', 'Вид оптимизации', 'Количество ограничений'}
-    for i in range(num_constraints):
-        expected_columns.add(f'Коэффициенты ограничения {i+1}')
-        expected_columns.add(f'Правая часть ограничения {i+1}')
-        expected_columns.add(f'Знак ограничения {i+1}')
-    if not expected_columns.issubset(df.columns):
-        raise ValueError('Неверный формат данных: пропущен обязательный столбец данных')
-
-    # Валидация указания на целочисленность и коэффициентов
-    if len(df.iloc[:, 1].dropna()) != num_variables:
-        raise ValueError("Количество элементов в столбце указания на целочисленность не совпадает с количеством переменных")
-    for x in df.iloc[:, 1]:
-        if x != 'NonNegativeReals' and x != 'NonNegativeIntegers' and x != 'Integers' and x != 'Reals' and x != 'Binary':
-            raise ValueError(f"Неверный формат значений столбца указания на целочисленность")
-    if len(df.iloc[:, 2].dropna()) != num_variables:
-        raise ValueError("Количество элементов в столбце коэффициентов функции не совпадает с количеством переменных")
-    for x in df.iloc[:, 2]:
-        try:
-            float(x)
-        except:
-            raise ValueError(f"Коэффициентами функции могут быть только числа")
-
-    # Валидация вида оптимизации
-    if objective_sense != 'maximize' and objective_sense != 'minimize':
-        raise ValueError("Неверный вид оптимизации")
-
-    # Валидация ограничений
-    for i in range(num_constraints):
-        if len(df.iloc[:, 5 + 3*i].dropna()) != num_variables:
-            raise ValueError(f"Количество коэффициентов в {i+1}-м ограничении не совпадает с количеством переменных")
-        for x in df.iloc[:, 5 + 3*i]:
-            try:
-                float(x)
-            except:
-                raise ValueError(f"Коэффициентами ограничений могут быть только числа")
-        try:
-            float(df.iloc[0, 6 + 3*i])
-        except:
-            raise ValueError(f"Неверно задана правая часть в {i+1}-м ограничении")
-        if df.iloc[0, 7 + 3*i] != '=' and df.iloc[0, 7 + 3*i] != '<=' and df.iloc[0, 7 + 3*i] != '>=':
-            raise ValueError(f"Неверно задан знак ограничения в {i+1}-м ограничении")
-
-# Преобразование данных в JSON
-def convert_to_json(df):
-    objective_sense = df.iloc[0, 3].strip().lower()
-    num_constraints = int(df.iloc[0, 4])
-
-    # Определим целочисленность переменных
-    variable_domains = df.iloc[:, 1].tolist()
-
-    # Формируем данные об объективной функции
-    objective_coefficients = df.iloc[:, 2].tolist()
-
-    objective = {
-        "coefficients": objective_coefficients,
-        "sense": objective_sense
-    }
-
-    # Формирование ограничений
-    constraints = []
-
-    for i in range(num_constraints):
-        start_col = 5 + 3*i
-        coefficients = df.iloc[:, start_col].tolist()
-        rhs = float(df.iloc[0, start_col + 1])
-        sense = df.iloc[0, start_col + 2]
-
-        constraint = {
-            "coefficients": coefficients,
-            "rhs": rhs,
-            "sense": sense
-        }
-
-        constraints.append(constraint)
-
-    # Создание JSON структуры
-    data_json = {
-        "objective": objective,
-        "variable_domains": variable_domains,
-        "constraints": constraints
-    }
-
-    return data_json
-
-def generate_excel_from_conditions(conditions: dict) -> str:
-    """
-    Генерирует Excel-файл из условий задачи (conditions) и возвращает его содержимое, закодированное в base64.
-    """
-    num_var = len(conditions.get("variable_domains", []))
-    num_constraints = len(conditions.get("constraints", []))
-
-    # Заполняем словарь данных для одного ряда Excel.
-    data = {
-        "Количество переменных": [num_var] + [None] * (num_var - 1),
-        "Указание на целочисленность": conditions.get("variable_domains", []),
-        "Коэффициенты функции": [str(x) for x in conditions.get("objective", {}).get("coefficients", [])],
-        "Вид оптимизации": [conditions.get("objective", {}).get("sense", "")] + [None] * (num_var - 1),
-        "Количество ограничений": [num_constraints] + [None] * (num_var - 1)
-    }
-    
-    # Для каждого ограничения добавляем 3 колонки: коэффициенты, правая часть и знак.
-    for i, constr in enumerate(conditions.get("constraints", []), start=1):
-        col_coeff = f"Коэффициенты ограничения {i}"
-        col_rhs   = f"Правая часть ограничения {i}"
-        col_sign  = f"Знак ограничения {i}"
-        data[col_coeff] = [str(x) for x in constr.get("coefficients", [])]
-        data[col_rhs]   = [constr.get("rhs", "")] + [None] * (num_var - 1)
-        data[col_sign]  = [constr.get("sense", "")] + [None] * (num_var - 1)
-    
-    # Создаем DataFrame
-    df = pd.DataFrame(data)
-    
-    # Записываем DataFrame в Excel в памяти
-    output = BytesIO()
-    df.to_excel(output, index=False)
-    excel_bytes = output.getvalue()
-    
-    # Кодируем в base64 и возвращаем строку
-    b64_excel = base64.b64encode(excel_bytes).decode('utf-8')
-    return b64_excel
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, None) or [])
+        body = list(rows)
+    finally:
+        workbook.close()
+
+    while header and header[-1] is None:
+        header.pop()
+    while body and all(value is None for value in body[-1]):
+        body.pop()
+    if not body:
+        raise ExcelValidationError(["A2: В файле нет данных задачи"])
+
+    errors = []
+    num_variables = _to_count(body[0][0] if body[0] else None, "A2", "Количество переменных", errors)
+    num_constraints = _to_count(body[0][4] if len(body[0]) > 4 else None, "E2", "Количество ограничений", errors)
+    if errors:
+        raise ExcelValidationError(errors)
+
+    # Проверка заголовка: столбцы должны идти в том же порядке, в каком их записывает generate_excel
+    expected = _expected_header(num_constraints)
+    for column, name in enumerate(expected):
+        actual = header[column] if column < len(header) else None
+        if actual != name:
+            errors.append(f"{get_column_letter(column + 1)}1: ожидается столбец '{name}'")
+    if errors:
+        raise ExcelValidationError(errors)
+
+    # Все ячейки в одном массиве: строка на каждую переменную, лишние строки проверяются отдельно
+    width = len(expected)
+    cells = np.empty((max(len(body), num_variables), width), dtype=object)
+    for row, values in enumerate(body):
+        values = values[:width]
+        cells[row, :len(values)] = values
+    extra = cells[num_variables:]
+    cells = cells[:num_variables]
+
+    if num_variables == 0:
+        raise ExcelValidationError(["A2: Количество переменных должно быть положительным"])
+    sense = cells[0, 3]
+    if sense not in ('maximize', 'minimize'):
+        errors.append(f"D2: Неверный вид оптимизации: {sense}")
+
+    domains = cells[:, 1]
+    _report(errors, ~np.isin(domains, DOMAINS)[:, None], [1], lambda k: "Неверное указание на целочисленность")
+
+    objective, empty, invalid = _to_numbers(cells[:, 2])
+    _report(errors, empty[:, None], [2], lambda k: "Не задан коэффициент функции")
+    _report(errors, invalid[:, None], [2], lambda k: "Коэффициентами функции могут быть только числа")
+
+    coefficient_columns = list(range(5, width, 3))
+    coefficients, empty, invalid = _to_numbers(cells[:, 5::3])
+    _report(errors, empty, coefficient_columns, lambda k: f"Не задан коэффициент {k + 1}-го ограничения")
+    _report(errors, invalid, coefficient_columns, lambda k: "Коэффициентами ограничений могут быть только числа")
+
+    rhs_columns = list(range(6, width, 3))
+    rhs, empty, invalid = _to_numbers(cells[:1, 6::3])
+    _report(errors, empty | invalid, rhs_columns, lambda k: f"Неверно задана правая часть в {k + 1}-м ограничении")
+
+    sense_columns = list(range(7, width, 3))
+    row_senses = cells[0, 7::3]
+    _report(errors, ~np.isin(row_senses, SENSES)[None, :], sense_columns, lambda k: f"Неверно задан знак ограничения в {k + 1}-м ограничении")
+
+    # Значения ниже строк переменных в столбцах, которые заполняются по переменным
+    value_columns = [1, 2] + coefficient_columns
+    _report(errors, ~pd.isna(extra[:, value_columns]), value_columns, lambda k: f"Лишнее значение: количество переменных {num_variables}", num_variables)
+    if errors:
+        raise ExcelValidationError(errors)
+
+    # Матрица ограничений по строкам (CSR) из столбцов коэффициентов
+    matrix = coefficients.T
+    rows, columns = np.nonzero(matrix)
+    indptr = np.concatenate(([0], np.cumsum(np.count_nonzero(matrix, axis=1))))
+    return SparseProblem(
+        objective=objective,
+        sense=sense,
+        domains=domains.tolist(),
+        indptr=indptr,
+        indices=columns,
+        data=matrix[rows, columns],
+        row_senses=row_senses.tolist(),
+        rhs=rhs[0],
+    )
@@ -0,0 +1,232 @@
+import numpy as np
+from problem import INTEGER_DOMAINS
+
+# Количество строк, которые записываются в файл за один раз
+CHUNK_ROWS = 1000
+# Количество слагаемых в одной строке LP файла (ограничение длины строки у решателей)
+TERMS_PER_LINE = 8
+
+
+def column_name(j):
+    return f"x{j}"
+
+
+def row_name(i):
+    # Ограничения нумеруются с единицы, как в ConstraintList
+    return f"c{i + 1}"
+
+
+def _format_number(value):
+    return format(value, '.17g')
+
+
+def _format_terms(indices, values):
+    """Линейное выражение в формате CPLEX LP, разбитое на строки."""
+    terms = [
+        f"{'-' if value < 0 else '+'} {_format_number(abs(value))} {column_name(j)}"
+        for j, value in zip(indices, values)
+    ]
+    lines = [' '.join(terms[k:k + TERMS_PER_LINE]) for k in range(0, len(terms), TERMS_PER_LINE)]
+    return '\n   '.join(lines)
+
+
+def write_lp(problem, path):
+    """
+    Записывает SparseProblem в файл формата CPLEX LP.
+    Строки ограничений формируются и записываются порциями по CHUNK_ROWS,
+    поэтому текст всего файла целиком в памяти не собирается.
+    """
+    if problem.num_variables == 0:
+        # Пустые строки записываются как 0 x0, а в задаче без переменных столбца x0 нет
+        raise ValueError("В задаче нет переменных")
+    indptr = problem.indptr.tolist()
+    indices = problem.indices.tolist()
+    values = problem.data.tolist()
+    rhs = problem.rhs.tolist()
+
+    with open(path, 'w') as f:
+        f.write("Maximize\n" if problem.sense == 'maximize' else "Minimize\n")
+        # В целевую функцию записываются все переменные, в том числе с нулевыми коэффициентами:
+        # так GLPK нумерует столбцы в порядке индексов переменных
+        f.write(f" obj: {_format_terms(range(problem.num_variables), problem.objective.tolist())}\n")
+
+        f.write("Subject To\n")
+        for chunk_start in range(0, problem.num_constraints, CHUNK_ROWS):
+            chunk = []
+            for i in range(chunk_start, min(chunk_start + CHUNK_ROWS, problem.num_constraints)):
+                start, end = indptr[i], indptr[i + 1]
+                if start == end:
+                    expr = f"0 {column_name(0)}"
+                else:
+                    expr = _format_terms(indices[start:end], values[start:end])
+                chunk.append(f" {row_name(i)}: {expr} {problem.row_senses[i]} {_format_number(rhs[i])}\n")
+            f.write(''.join(chunk))
+
+        # По умолчанию в LP формате переменные неотрицательны, записываем только отличающиеся границы
+        f.write("Bounds\n")
+        chunk = []
+        for j, (lb, ub) in enumerate(zip(problem.lb.tolist(), problem.ub.tolist())):
+            if problem.domains[j] == 'Binary' or (lb == 0 and ub == np.inf):
+                continue
+            name = column_name(j)
+            if lb == -np.inf and ub == np.inf:
+                chunk.append(f" {name} free\n")
+            else:
+                lower = '-inf' if lb == -np.inf else _format_number(lb)
+                upper = '+inf' if ub == np.inf else _format_number(ub)
+                chunk.append(f" {lower} <= {name} <= {upper}\n")
+            if len(chunk) >= CHUNK_ROWS:
+                f.write(''.join(chunk))
+                chunk = []
+        f.write(''.join(chunk))
+
+        general = [column_name(j) for j, domain in enumerate(problem.domains) if domain in INTEGER_DOMAINS and domain != 'Binary']
+        binary = [column_name(j) for j, domain in enumerate(problem.domains) if domain == 'Binary']
+        for section, names in (("General", general), ("Binary", binary)):
+            if names:
+                f.write(f"{section}\n")
+                for chunk_start in range(0, len(names), CHUNK_ROWS):
+                    chunk = names[chunk_start:chunk_start + CHUNK_ROWS]
+                    lines = [' '.join(chunk[k:k + TERMS_PER_LINE]) for k in range(0, len(chunk), TERMS_PER_LINE)]
+                    f.write(' ' + '\n '.join(lines) + '\n')
+        f.write("End\n")
+
+
+def _index(name, prefix):
+    """Индекс переменной или ограничения по имени в LP файле, None для чужих имен."""
+    if not name.startswith(prefix) or not name[len(prefix):].isdigit():
+        return None
+    return int(name[len(prefix):])
+
+
+class SolverSolution:
+    """Результат, прочитанный из файла решения решателя."""
+
+    def __init__(self, num_variables, num_constraints):
+        self.status = 'other'
+        self.has_solution = False
+        self.values = np.zeros(num_variables)
+        self.duals = None
+        self.reduced_costs = None
+        self.num_constraints = num_constraints
+
+    def set_dual(self, i, value):
+        if self.duals is None:
+            self.duals = np.zeros(self.num_constraints)
+        self.duals[i] = value
+
+    def set_reduced_cost(self, j, value):
+        if self.reduced_costs is None:
+            self.reduced_costs = np.zeros(len(self.values))
+        self.reduced_costs[j] = value
+
+
+def read_glpk_solution(path, num_variables, num_constraints):
+    """
+    Читает решение, записанное glpsol с ключом -w (формат GLPK 4.57+):
+        s bas ROWS COLS PST DST OBJ   |   s mip ROWS COLS STAT OBJ
+        i ROW ST PRIM DUAL            |   i ROW PRIM
+        j COL ST PRIM DUAL            |   j COL PRIM
+    """
+    solution = SolverSolution(num_variables, num_constraints)
+    is_mip = False
+    with open(path) as f:
+        for line in f:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == 's':
+                is_mip = tokens[1] == 'mip'
+                if is_mip:
+                    stat = tokens[4]
+                    solution.status = {'o': 'optimal', 'f': 'feasible', 'n': 'infeasible'}.get(stat, 'other')
+                    solution.has_solution = stat in ('o', 'f')
+                else:
+                    primal, dual = tokens[4], tokens[5]
+                    if primal == 'f' and dual == 'f':
+                        solution.status = 'optimal'
+                    elif primal == 'n':
+                        solution.status = 'infeasible'
+                    elif primal == 'f' and dual == 'n':
+                        solution.status = 'unbounded'
+                    solution.has_solution = primal == 'f'
+            elif tokens[0] == 'j':
+                j = int(tokens[1]) - 1
+                solution.values[j] = float(tokens[2] if is_mip else tokens[3])
+                if not is_mip:
+                    solution.set_reduced_cost(j, float(tokens[4]))
+            elif tokens[0] == 'i' and not is_mip:
+                solution.set_dual(int(tokens[1]) - 1, float(tokens[4]))
+    return solution
+
+
+def read_cbc_solution(path, num_variables, num_constraints):
+    """
+    Читает файл решения CBC (printingOptions all): в первой строке статус,
+    далее строки "индекс имя значение двойственная_оценка", сначала ограничения, затем
+    переменные (у переменных вместо двойственной оценки - приведенная стоимость).
+    """
+    solution = SolverSolution(num_variables, num_constraints)
+    with open(path) as f:
+        header = f.readline().strip().lower()
+        if header.startswith('optimal'):
+            solution.status = 'optimal'
+        elif 'infeasible' in header:
+            solution.status = 'infeasible'
+        elif header.startswith('unbounded'):
+            solution.status = 'unbounded'
+        elif 'time' in header:
+            solution.status = 'maxTimeLimit'
+        # При остановке по времени без допустимого целочисленного решения CBC записывает
+        # решение непрерывной релаксации ("no integer solution - continuous used"), оно не допустимо
+        solution.has_solution = solution.status in ('optimal', 'maxTimeLimit') and 'no feasible' not in header and 'no integer solution' not in header
+        for line in f:
+            tokens = line.split()
+            if tokens and tokens[0] == '**':
+                tokens = tokens[1:]
+            if len(tokens) < 4:
+                continue
+            name, value, dual = tokens[1], float(tokens[2]), float(tokens[3])
+            j = _index(name, 'x')
+            if j is not None and j < num_variables:
+                solution.values[j] = value
+                solution.set_reduced_cost(j, dual)
+                continue
+            i = _index(name, 'c')
+            if i is not None and 0 < i <= num_constraints:
+                solution.set_dual(i - 1, dual)
+    return solution
+
+
+def read_scip_solution(path, num_variables, num_constraints):
+    """
+    Читает файл решения SCIP (write solution): строки статуса и значения целевой функции,
+    затем "имя значение (obj:коэффициент)". Нулевые значения SCIP не записывает.
+    """
+    solution = SolverSolution(num_variables, num_constraints)
+    with open(path) as f:
+        for line in f:
+            if line.startswith('solution status:'):
+                status = line.split(':', 1)[1].strip().lower()
+                if status.startswith('optimal'):
+                    solution.status = 'optimal'
+                elif status.startswith('infeasible or unbounded'):
+                    solution.status = 'infeasibleOrUnbounded'
+                elif status.startswith('infeasible'):
+                    solution.status = 'infeasible'
+                elif status.startswith('unbounded'):
+                    solution.status = 'unbounded'
+                elif 'time limit' in status:
+                    solution.status = 'maxTimeLimit'
+                elif 'gap limit' in status:
+                    solution.status = 'feasible'
+                continue
+            if line.startswith('objective value:'):
+                solution.has_solution = True
+                continue
+            tokens = line.split()
+            if len(tokens) >= 2:
+                j = _index(tokens[0], 'x')
+                if j is not None and j < num_variables:
+                    solution.values[j] = float(tokens[1])
+    return solution
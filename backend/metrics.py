@@ -0,0 +1,144 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+# Границы интервалов гистограмм длительностей в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+# Количество строк отчета cProfile
+PROFILE_LINES = 60
+
+
+def utcnow():
+    """Текущее время UTC без часового пояса: в таком виде время хранится в БД."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class StageTimer:
+    """Длительности этапов обработки одной задачи в секундах: {этап: длительность}."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = round(self.stages.get(name, 0.0) + seconds, 6)
+
+
+# Таймер задания, которое сейчас выполняется в рабочем процессе (см. record_stages)
+_current_timer = None
+
+
+def stage(name):
+    """Замер этапа решения для текущего задания рабочего процесса; вне задания ничего не делает."""
+    timer = _current_timer
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+@contextmanager
+def record_stages(timer):
+    """Этапы, замеренные через stage() внутри блока, записываются в timer."""
+    global _current_timer
+    previous, _current_timer = _current_timer, timer
+    try:
+        yield timer
+    finally:
+        _current_timer = previous
+
+
+@contextmanager
+def profile_to(path):
+    """Профилирует блок cProfile и сохраняет статистику в path; без path ничего не делает."""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def profile_report(path):
+    """Текстовый отчет pstats по сохраненному профилю: функции по суммарному времени."""
+    output = io.StringIO()
+    pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return output.getvalue()
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопленные счетчики по интервалам, сумма и количество."""
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            counts, total = self._series.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+            for k, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[k] += 1
+            counts[-1] += 1
+            self._series[label_values] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, (counts, total) in series:
+            labels = list(zip(self.label_names, label_values))
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                lines.append(f"{self.name}_bucket{_labels(labels + [('le', bound)])} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(labels)} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    """Счетчик в формате Prometheus с необязательными метками."""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_labels(list(zip(self.label_names, label_values)))} {value}")
+        return lines
+
+
+def render_gauge(name, help_text, value):
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
@@ -1,5 +1,32 @@
+import math
+import os
+import subprocess
+import tempfile
+import time
+import traceback
+from contextlib import redirect_stdout
+
+import numpy as np
+from lpfile import (column_name, read_cbc_solution, read_glpk_solution,
+                    read_scip_solution, write_lp)
+from metrics import stage
+from portfolio import PORTFOLIO, available_solvers, race
+from presolve import presolve as presolve_problem
+from problem import (domain_bounds, objective_value, row_activity, to_conditions,
+                     with_parameters)
+from progress import ProgressReporter
+from pyomo.core.expr.numeric_expr import LinearExpression
 from pyomo.environ import *
 from pyomo.opt import SolverStatus, TerminationCondition
+from sensitivity import from_json_array, solution_arrays
+
+DOMAIN_SETS = {
+    'NonNegativeReals': NonNegativeReals,
+    'NonNegativeIntegers': NonNegativeIntegers,
+    'Integers': Integers,
+    'Reals': Reals,
+    'Binary': Binary,
+}
 
 
 def create_model(data):
@@ -22,6 +49,7 @@ def create_model(data):
 
     # Задание целевой функции
     objective_expr = sum(coeff * model.variables[i] for i, coeff in enumerate(data['objective']['coefficients']))
+    objective_expr += data['objective'].get('constant', 0)
     if data['objective']['sense'] == 'maximize':
         model.obj = Objective(expr=objective_expr, sense=maximize)
     else:
@@ -40,34 +68,191 @@ def create_model(data):
 
     # Поддерживаем анализ чувствительности к коэффициентам
     model.dual = Suffix(direction=Suffix.IMPORT)
+    model.rc = Suffix(direction=Suffix.IMPORT)
     return model
 
-def solve_model(model, solver):
-    solver = SolverFactory(solver)
-    result = solver.solve(model)
+def create_model_sparse(problem, parametric=False):
+    """
+    Строит модель Pyomo из SparseProblem целиком: каждое ограничение собирается
+    одним LinearExpression по ненулевым элементам строки CSR без поэлементного
+    суммирования выражений.
+    При parametric=True коэффициенты целевой функции и правые части задаются
+    изменяемыми параметрами model.cost и model.rhs, чтобы решать одну модель
+    для разных сценариев (см. set_parameters).
+    """
+    model = ConcreteModel()
+    n = problem.num_variables
+    m = problem.num_constraints
+
+    domains = [DOMAIN_SETS[domain] for domain in problem.domains]
+    lb = [None if np.isinf(x) else x for x in problem.lb.tolist()]
+    ub = [None if np.isinf(x) else x for x in problem.ub.tolist()]
+    model.variables = Var(range(n), domain=lambda m, i: domains[i], bounds=lambda m, i: (lb[i], ub[i]))
+    variables = [model.variables[i] for i in range(n)]
+
+    # Задание целевой функции
+    if parametric:
+        cost = problem.objective.tolist()
+        model.cost = Param(range(n), mutable=True, initialize=lambda m, i: cost[i])
+        nonzero = list(range(n))
+        coefs = [model.cost[i] for i in nonzero]
+    else:
+        nonzero = np.flatnonzero(problem.objective).tolist()
+        coefs = problem.objective[nonzero].tolist()
+    objective_expr = LinearExpression(
+        constant=problem.objective_offset,
+        linear_coefs=coefs,
+        linear_vars=[variables[i] for i in nonzero],
+    )
+    model.obj = Objective(expr=objective_expr, sense=maximize if problem.sense == 'maximize' else minimize)
+
+    # Создание ограничений, индексы совпадают с ConstraintList (с единицы)
+    indptr = problem.indptr.tolist()
+    indices = problem.indices.tolist()
+    values = problem.data.tolist()
+    rhs = problem.rhs.tolist()
+    if parametric:
+        rhs_values = rhs
+        model.rhs = Param(range(m), mutable=True, initialize=lambda m, i: rhs_values[i])
+        rhs = [model.rhs[i] for i in range(m)]
+
+    def constraint_rule(model, k):
+        i = k - 1
+        start, end = indptr[i], indptr[i + 1]
+        sense = problem.row_senses[i]
+        if start == end:
+            # Пустая строка остается в модели с нулевым коэффициентом, как в create_model,
+            # чтобы нумерация ограничений и анализ чувствительности не менялись
+            if not variables:
+                return Constraint.Skip
+            coefs, terms = [0], [variables[0]]
+        else:
+            coefs, terms = values[start:end], [variables[j] for j in indices[start:end]]
+        expr = LinearExpression(constant=0, linear_coefs=coefs, linear_vars=terms)
+        if sense == '<=':
+            return (None, expr, rhs[i])
+        if sense == '>=':
+            return (rhs[i], expr, None)
+        return (expr, rhs[i])
+
+    model.constraints = Constraint(RangeSet(1, m), rule=constraint_rule)
+
+    # Поддерживаем анализ чувствительности к коэффициентам
+    model.dual = Suffix(direction=Suffix.IMPORT)
+    model.rc = Suffix(direction=Suffix.IMPORT)
+    return model
 
-    if result.solver.status == SolverStatus.ok:
+def build_model(problem, builder='sparse'):
+    """
+    Строит модель Pyomo по SparseProblem. По умолчанию используется разреженный
+    построитель, при ошибке в нем - исходный create_model. create_model задает
+    переменным только области определения, поэтому для задачи с другими границами
+    (из MPS/LP файла или после упрощения) ошибка разреженного построителя не скрывается:
+    иначе была бы решена другая задача.
+    """
+    if builder == 'sparse':
         try:
-            sensitivity = []
-            for (i, constraint) in model.constraints.items():
-                sensitivity.append({
-                    "name": f"Ограничение {i}",
-                    "value": str(constraint()),
-                    "lslack": str(constraint.lslack()),
-                    "uslack": str(constraint.uslack()),
-                    "dual": str(model.dual[constraint])
-                })
-        except Exception as ex:
-            print(ex, "Не удалось получить dual значения")
+            return create_model_sparse(problem)
+        except Exception:
+            lb, ub = domain_bounds(problem.domains)
+            if not (np.array_equal(lb, problem.lb) and np.array_equal(ub, problem.ub)):
+                raise
+            print("Не удалось построить модель разреженным способом:", traceback.format_exc())
+    return create_model(to_conditions(problem))
+
+def set_parameters(model, problem):
+    """Переносит коэффициенты целевой функции и правые части задачи в параметрическую модель."""
+    model.cost.store_values(dict(enumerate(problem.objective.tolist())))
+    model.rhs.store_values(dict(enumerate(problem.rhs.tolist())))
+
+# Сообщения для статусов завершения, общие для обоих способов решения
+TERMINATION_MESSAGES = {
+    'optimal': "Найдено оптимальное решение задачи.",
+    'infeasible': "Задача не имеет допустимых решений, удовлетворяющих всем ограничениям.",
+    'unbounded': "Целевая функция может быть улучшена безгранично.",
+    'feasible': "Найдено допустимое решение, его оптимальность не доказана.",
+    'maxTimeLimit': "Достигнут лимит времени, возвращено лучшее найденное решение.",
+    'maxTimeLimitNoSolution': "Достигнут лимит времени, допустимое решение не найдено.",
+}
+
+def _glpk_time_limit(time_limit):
+    # GLPK принимает лимит в целых секундах, дробный лимит округляется вверх, чтобы не получить 0
+    return max(1, math.ceil(time_limit))
+
+def solver_options(solver, time_limit=None, mip_gap=None):
+    """Опции Pyomo для ограничения времени решения и допустимого относительного разрыва MIP."""
+    names = {
+        'glpk': ('tmlim', 'mipgap'),
+        'cbc': ('sec', 'ratioGap'),
+        'scip': ('limits/time', 'limits/gap'),
+    }
+    time_option, gap_option = names.get(solver, (None, None))
+    options = {}
+    if time_limit and time_option:
+        options[time_option] = _glpk_time_limit(time_limit) if solver == 'glpk' else time_limit
+    if mip_gap is not None and gap_option:
+        options[gap_option] = mip_gap
+    return options
+
+def solve_model(model, problem, solver, time_limit=None, mip_gap=None, warm_start=None, on_progress=None):
+    """Решает модель Pyomo, построенную по SparseProblem problem (см. build_model)."""
+    solver_name = solver
+    solver = SolverFactory(solver)
+    solver.options.update(solver_options(solver_name, time_limit, mip_gap))
+    # Решение загружается в модель вручную, чтобы при срабатывании лимита получить лучшее найденное решение
+    kwargs = {'load_solutions': False}
+    if warm_start and solver.warm_start_capable():
+        # Начальное решение (MIP start) из решения родительской задачи
+        for i, value in warm_start.items():
+            model.variables[i].value = value
+        kwargs['warmstart'] = True
+    # Pyomo записывает файл задачи и читает решение внутри solve, поэтому этап solve включает их
+    with stage('solve'):
+        if on_progress is None:
+            result = solver.solve(model, **kwargs)
+        else:
+            # Вывод решателя (tee) разбирается построчно во время решения
+            sense = 'maximize' if model.obj.sense == maximize else 'minimize'
+            reporter = ProgressReporter(solver_name, sense, on_progress)
+            try:
+                with redirect_stdout(reporter):
+                    result = solver.solve(model, tee=True, **kwargs)
+            finally:
+                reporter.close()
+    with stage('extract'):
+        return _model_result(model, result, problem)
+
+def _model_result(model, result, problem):
+    """Решение из модели Pyomo и результата решателя: статус, значения переменных, анализ чувствительности."""
+    termination_condition = result.solver.termination_condition
+    # CBC, остановленный по времени без целочисленного решения, возвращает статус aborted,
+    # условие intermediateNonInteger и решение непрерывной релаксации, которое не загружается
+    if termination_condition == TerminationCondition.intermediateNonInteger or (
+            termination_condition == TerminationCondition.maxTimeLimit and len(result.solution) == 0):
+        return {
+            'termination_condition': str(TerminationCondition.maxTimeLimit),
+            'message': TERMINATION_MESSAGES['maxTimeLimitNoSolution'],
+        }
+
+    if len(result.solution) > 0:
+        model.solutions.load_from(result)
+
+    if termination_condition == TerminationCondition.maxTimeLimit:
+        return dict({
+            'termination_condition': str(result.solver.termination_condition),
+            'message': TERMINATION_MESSAGES['maxTimeLimit'],
+            'objective': model.obj(),
+        }, **solution_arrays(problem, _variable_values(model, problem)))
+
+    # Доказанную недопустимость задачи CBC Pyomo сообщает со статусом warning
+    if result.solver.status in (SolverStatus.ok, SolverStatus.warning):
         termination_condition = str(result.solver.termination_condition)
         if result.solver.termination_condition == TerminationCondition.optimal:
-            return {
+            return dict({
                 'termination_condition': termination_condition,
                 'message': "Найдено оптимальное решение задачи.",
                 'objective': model.obj(),
-                'variable_values': {i: model.variables[i].value for i in model.variables},
-                'sensitivity': sensitivity,
-            }
+            }, **_model_arrays(model, problem, ranges=True))
         elif result.solver.termination_condition == TerminationCondition.infeasible:
             return {
                 'termination_condition': termination_condition,
@@ -80,17 +265,260 @@ def solve_model(model, solver):
             }
         else:
             try:
-                return {
+                return dict({
                     'termination_condition': termination_condition,
                     'message': str(result.solver.termination_condition),
                     'objective': model.obj(),
-                    'variable_values': {i: model.variables[i].value for i in model.variables},
-                    'sensitivity': sensitivity,
-                }
+                }, **_model_arrays(model, problem))
             except:
                 return {
                     'termination_condition': termination_condition,
                     'message': f"Статус решателя: {str(result.solver.termination_condition)}",
                 }
     else:
-        raise Exception('Что-то пошло не так попробуйте позже или введите другую задачу')
\ No newline at end of file
+        raise Exception('Что-то пошло не так попробуйте позже или введите другую задачу')
+
+def _variable_values(model, problem):
+    """
+    Значения переменных модели массивом. Решатели записывают в файл решения только
+    ненулевые значения, поэтому переменные без значения после загрузки решения равны нулю.
+    """
+    variables = model.variables
+    values = np.array([variables[j].value for j in range(problem.num_variables)], dtype=np.float64)
+    return np.nan_to_num(values, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+def _suffix_values(suffix, components):
+    """
+    Значения суффикса решателя (dual, rc) массивом; None, если решатель их не вернул.
+    Как и значения переменных, решатель записывает только ненулевые значения.
+    """
+    if len(suffix) == 0:
+        return None
+    return np.array([suffix.get(component, 0.0) for component in components], dtype=np.float64)
+
+def _model_arrays(model, problem, ranges=False):
+    """
+    Значения переменных, двойственные оценки и приведенные стоимости читаются из модели
+    одним проходом по суффиксам решателя, левые части и запасы ограничений считаются
+    по SparseProblem (см. sensitivity.solution_arrays).
+    """
+    constraints = model.constraints
+    rows = [constraints[k] if k in constraints else None for k in range(1, problem.num_constraints + 1)]
+    duals = _suffix_values(model.dual, rows)
+    costs = _suffix_values(model.rc, [model.variables[j] for j in range(problem.num_variables)])
+    return solution_arrays(problem, _variable_values(model, problem), duals, costs, ranges)
+
+def _write_warm_start(solver, path, warm_start):
+    """
+    Записывает начальное решение в формате, который читает решатель:
+    файл решения CBC для команды mipstart или файл решения SCIP.
+    """
+    with open(path, 'w') as f:
+        if solver == 'cbc':
+            f.write("Optimal - objective value 0\n")
+            for k, (j, value) in enumerate(sorted(warm_start.items())):
+                f.write(f"{k} {column_name(j)} {value!r}\n")
+        else:
+            f.write("solution status: feasible\n")
+            for j, value in sorted(warm_start.items()):
+                f.write(f"{column_name(j)} {value!r}\n")
+
+def _solver_command(solver, lp_path, solution_path, time_limit=None, mip_gap=None, start_path=None):
+    if solver == 'glpk':
+        command = ['glpsol', '--lp', lp_path, '-w', solution_path]
+        if time_limit:
+            command += ['--tmlim', str(_glpk_time_limit(time_limit))]
+        if mip_gap is not None:
+            command += ['--mipgap', str(mip_gap)]
+        return command
+    if solver == 'cbc':
+        command = ['cbc', lp_path]
+        if start_path:
+            command += ['mipstart', start_path]
+        if time_limit:
+            command += ['sec', str(time_limit)]
+        if mip_gap is not None:
+            command += ['ratioGap', str(mip_gap)]
+        return command + ['solve', 'printingOptions', 'all', 'solution', solution_path]
+    if solver == 'scip':
+        commands = [f'read {lp_path}']
+        if start_path:
+            commands.append(f'read {start_path}')
+        if time_limit:
+            commands.append(f'set limits time {time_limit}')
+        if mip_gap is not None:
+            commands.append(f'set limits gap {mip_gap}')
+        commands += ['optimize', f'write solution {solution_path}', 'quit']
+        return ['scip', '-c', ' '.join(commands)]
+    raise ValueError(f"Решатель {solver} не поддерживается")
+
+def _read_solution(solver, solution_path, problem):
+    if solver == 'glpk':
+        return read_glpk_solution(solution_path, problem.num_variables, problem.num_constraints)
+    if solver == 'cbc':
+        return read_cbc_solution(solution_path, problem.num_variables, problem.num_constraints)
+    return read_scip_solution(solution_path, problem.num_variables, problem.num_constraints)
+
+def _run_solver(command, reporter=None, on_start=None):
+    """
+    Запускает решатель; если задан reporter, его вывод разбирается построчно во время решения.
+    on_start(process) вызывается с запущенным процессом решателя, чтобы его можно было завершить.
+    """
+    if reporter is None and on_start is None:
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+    output = subprocess.PIPE if reporter is not None else subprocess.DEVNULL
+    with subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT, text=True, bufsize=1) as process:
+        if on_start is not None:
+            on_start(process)
+        if reporter is None:
+            process.wait()
+            return
+        for line in process.stdout:
+            reporter.feed_line(line)
+        reporter.close()
+
+def solve_direct(problem, solver, time_limit=None, mip_gap=None, warm_start=None, on_progress=None, on_start=None):
+    """
+    Решает SparseProblem без Pyomo: задача записывается в LP файл, решатель
+    запускается отдельным процессом, решение читается из его файла решения.
+    Возвращает словарь того же вида, что и solve_model.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        lp_path = os.path.join(tmp, 'model.lp')
+        solution_path = os.path.join(tmp, 'model.sol')
+        with stage('write_file'):
+            write_lp(problem, lp_path)
+        # GLPK не принимает начальное решение из командной строки
+        start_path = None
+        if warm_start and solver in ('cbc', 'scip'):
+            start_path = os.path.join(tmp, 'start.sol')
+            _write_warm_start(solver, start_path, warm_start)
+        reporter = ProgressReporter(solver, problem.sense, on_progress) if on_progress else None
+        with stage('solve'):
+            _run_solver(_solver_command(solver, lp_path, solution_path, time_limit, mip_gap, start_path), reporter, on_start)
+        if not os.path.exists(solution_path):
+            raise Exception('Что-то пошло не так попробуйте позже или введите другую задачу')
+        with stage('extract'):
+            solution = _read_solution(solver, solution_path, problem)
+
+    result = {
+        'termination_condition': solution.status,
+        'message': TERMINATION_MESSAGES.get(solution.status, f"Статус решателя: {solution.status}"),
+    }
+    if not solution.has_solution or solution.status in ('infeasible', 'unbounded'):
+        if solution.status == 'maxTimeLimit':
+            result['message'] = TERMINATION_MESSAGES['maxTimeLimitNoSolution']
+        return result
+
+    values = solution.values
+    with stage('extract'):
+        result['objective'] = objective_value(problem, values)
+        result.update(solution_arrays(problem, values, solution.duals, solution.reduced_costs, solution.status == 'optimal'))
+    return result
+
+def _solve(problem, solver, backend, time_limit, mip_gap, warm_start, on_progress):
+    if solver == PORTFOLIO:
+        # Решатели соревнуются через LP файл: процесс каждого можно завершить, не дожидаясь Pyomo
+        solve = lambda name, on_start, progress: solve_direct(problem, name, time_limit, mip_gap, warm_start, progress, on_start)
+        return race(available_solvers(), solve, problem.sense, on_progress)
+    start = time.perf_counter()
+    if backend == 'direct':
+        solution = solve_direct(problem, solver, time_limit, mip_gap, warm_start, on_progress)
+    else:
+        with stage('build_model'):
+            model = build_model(problem)
+        solution = solve_model(model, problem, solver, time_limit, mip_gap, warm_start, on_progress)
+    solution['solver_time'] = round(time.perf_counter() - start, 3)
+    return solution
+
+def solve_problem(problem, solver, backend='pyomo', time_limit=None, mip_gap=None, warm_start=None, presolve=False, on_progress=None):
+    """
+    Решает SparseProblem выбранным способом: через Pyomo или напрямую через LP файл.
+    warm_start - начальное решение {индекс переменной: значение}.
+    on_progress(event) вызывается с событиями о ходе решения, разобранными из вывода решателя.
+    solver="portfolio" - решение несколькими решателями одновременно (см. portfolio.race).
+    При presolve=True решателю передается упрощенная задача (см. presolve.py), решение
+    переводится обратно в нумерацию исходной задачи, статистика упрощения добавляется в поле presolve.
+    """
+    if not presolve:
+        return _solve(problem, solver, backend, time_limit, mip_gap, warm_start, on_progress)
+
+    with stage('presolve'):
+        reduction = presolve_problem(problem)
+    if reduction.infeasible:
+        return {
+            'termination_condition': 'infeasible',
+            'message': TERMINATION_MESSAGES['infeasible'],
+            'presolve': reduction.stats,
+        }
+    reduced = reduction.problem
+    if reduced.num_variables == 0:
+        # Все переменные определены при упрощении, решатель не нужен
+        solution = {
+            'termination_condition': 'optimal',
+            'message': TERMINATION_MESSAGES['optimal'],
+            'variable_values': [],
+        }
+    else:
+        if warm_start:
+            warm_start = reduction.reduce_values(warm_start)
+        solution = _solve(reduced, solver, backend, time_limit, mip_gap, warm_start, on_progress)
+    with stage('postsolve'):
+        return postsolve_solution(problem, reduction, solution)
+
+def postsolve_solution(problem, reduction, solution):
+    """Решение упрощенной задачи в нумерации исходной задачи."""
+    solution = dict(solution, presolve=reduction.stats)
+    if solution.get('variable_values') is None:
+        return solution
+    values = reduction.postsolve_values(_values_dict(solution['variable_values']))
+    solution['objective'] = objective_value(problem, values)
+    duals = ((solution.get('sensitivity') or {}).get('constraints') or {}).get('dual')
+    if duals is None and reduction.problem.num_constraints == 0:
+        duals = []
+    if duals is not None and len(duals) == reduction.problem.num_constraints:
+        # Двойственные оценки есть для всех ограничений упрощенной задачи
+        duals = reduction.postsolve_duals(values, from_json_array(duals))
+    else:
+        duals = None
+    # Приведенные стоимости и диапазоны считаются заново по исходной задаче
+    optimal = solution.get('termination_condition') == 'optimal'
+    solution.update(solution_arrays(problem, values, duals, ranges=optimal and duals is not None))
+    return solution
+
+def _values_dict(values):
+    """Значения переменных {индекс: значение} из массива решения, без переменных без значения."""
+    return {j: value for j, value in enumerate(values) if value is not None}
+
+
+def solve_scenarios(problem, scenarios, solver, backend='pyomo', time_limit=None, mip_gap=None, on_progress=None):
+    """
+    Решает серию сценариев одной задачи: scenarios - список пар (номер сценария,
+    {"rhs": ..., "objective": ...}). Модель Pyomo строится один раз, для каждого
+    сценария меняются только ее параметры; решение предыдущего сценария
+    передается решателю как начальное.
+    Результат каждого сценария передается в on_progress(event) сразу после решения.
+    Возвращает количество решенных сценариев.
+    """
+    model = None
+    if backend != 'direct':
+        with stage('build_model'):
+            model = create_model_sparse(problem, parametric=True)
+    warm_start = None
+    for index, parameters in scenarios:
+        event = {'type': 'scenario', 'index': index}
+        try:
+            scenario = with_parameters(problem, parameters.get('rhs'), parameters.get('objective'))
+            if model is None:
+                solution = solve_direct(scenario, solver, time_limit, mip_gap, warm_start)
+            else:
+                set_parameters(model, scenario)
+                solution = solve_model(model, scenario, solver, time_limit, mip_gap, warm_start)
+            event['solution'] = solution
+            warm_start = _values_dict(solution.get('variable_values') or []) or warm_start
+        except Exception as ex:
+            event['error'] = str(ex)
+        if on_progress is not None:
+            on_progress(event)
+    return len(scenarios)
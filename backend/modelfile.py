@@ -0,0 +1,601 @@
+import gzip
+import io
+import re
+from array import array
+
+import numpy as np
+from problem import SparseProblem
+
+# Первые байты файла, сжатого gzip
+GZIP_MAGIC = b'\x1f\x8b'
+# Позиции полей фиксированного формата MPS (столбцы 2-3, 5-12, 15-22, 25-36, 40-47, 50-61)
+FIXED_MPS_FIELDS = ((1, 3), (4, 12), (14, 22), (24, 36), (39, 47), (49, 61))
+MPS_ROW_SENSES = {'L': '<=', 'G': '>=', 'E': '='}
+LP_SENSES = {'<=': '<=', '=<': '<=', '<': '<=', '>=': '>=', '=>': '>=', '>': '>=', '=': '='}
+
+# Разделы CPLEX LP файла, которые распознаются в начале строки
+LP_SECTIONS = [
+    (re.compile(r'(maximi[sz]e|maximum|max)(?=\s|$)', re.I), 'maximize'),
+    (re.compile(r'(minimi[sz]e|minimum|min)(?=\s|$)', re.I), 'minimize'),
+    (re.compile(r'(subject\s+to|such\s+that|st|s\.t\.)(?=\s|$)', re.I), 'constraints'),
+    (re.compile(r'bounds?(?=\s|$)', re.I), 'bounds'),
+    (re.compile(r'(generals?|gen|integers?)(?=\s|$)', re.I), 'general'),
+    (re.compile(r'(binary|binaries|bin)(?=\s|$)', re.I), 'binary'),
+    (re.compile(r'(semi-continuous|semis?|sos[12]?|lazy\s+constraints|user\s+cuts)(?=\s|$)', re.I), 'unsupported'),
+    (re.compile(r'end(?=\s|$)', re.I), 'end'),
+]
+LP_NUMBER = r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+LP_NAME = r'[A-Za-z_!"#$%&()/,.;?@\'`{}|~][^\s:+\-*/<>=^\[\]]*'
+LP_TOKEN = re.compile(rf'''
+    (?P<op><=|=<|>=|=>|<|>|=)
+  | (?P<sign>[+-])
+  | (?P<number>{LP_NUMBER})
+  | (?P<colon>:)
+  | (?P<name>{LP_NAME})
+  | (?P<other>\S)
+''', re.X)
+# Типичная строка выражения: [имя:] слагаемые [знак сравнения и правая часть]
+LP_TERM = re.compile(rf'([+-]?)\s*({LP_NUMBER})?\s*({LP_NAME})')
+LP_TERMS_LINE = re.compile(
+    rf'(?:({LP_NAME})\s*:)?((?:\s*[+-]?\s*(?:{LP_NUMBER})?\s*{LP_NAME})*)'
+    rf'\s*(?:(<=|=<|>=|=>|<|>|=)\s*([+-]?)\s*({LP_NUMBER}))?'
+)
+
+
+class _ProblemBuilder:
+    """
+    Накапливает задачу по мере чтения файла. Ненулевые коэффициенты хранятся
+    тройками (строка, столбец, значение) в массивах array, матрица CSR
+    собирается один раз в build.
+    """
+
+    def __init__(self):
+        self.sense = 'minimize'
+        self.columns = {}
+        self.rows = {}
+        self.objective = {}
+        self.objective_offset = 0.0
+        self.row_senses = []
+        self.rhs = array('d')
+        # Диапазоны ограничений в смысле раздела RANGES формата MPS
+        self.ranges = {}
+        self.lb = array('d')
+        self.ub = array('d')
+        self.integer = set()
+        self.entry_rows = array('q')
+        self.entry_columns = array('q')
+        self.entry_values = array('d')
+
+    def column(self, name):
+        j = self.columns.get(name)
+        if j is None:
+            j = self.columns[name] = len(self.columns)
+            self.lb.append(0.0)
+            self.ub.append(np.inf)
+        return j
+
+    def add_row(self, name, sense, rhs=0.0):
+        if name in self.rows:
+            raise ValueError(f"ограничение {name} задано повторно")
+        i = self.rows[name] = len(self.row_senses)
+        self.row_senses.append(sense)
+        self.rhs.append(rhs)
+        return i
+
+    def add(self, i, j, value):
+        if value != 0:
+            self.entry_rows.append(i)
+            self.entry_columns.append(j)
+            self.entry_values.append(value)
+
+    def add_terms(self, i, columns, values):
+        # Нулевые и повторные коэффициенты обрабатываются в build
+        self.entry_rows.extend([i] * len(columns))
+        self.entry_columns.extend(columns)
+        self.entry_values.extend(values)
+
+    def set_sense(self, text):
+        text = text.upper()
+        if text not in ('MAX', 'MAXIMIZE', 'MAXIMISE', 'MIN', 'MINIMIZE', 'MINIMISE'):
+            raise ValueError(f"неверный вид оптимизации {text}")
+        self.sense = 'maximize' if text.startswith('MAX') else 'minimize'
+
+    def build(self):
+        n = len(self.columns)
+        if n == 0:
+            raise ValueError("В файле нет переменных")
+        row_senses = list(self.row_senses)
+        rhs = np.frombuffer(self.rhs, dtype=np.float64).copy()
+        rows = np.frombuffer(self.entry_rows, dtype=np.int64) if self.entry_rows else np.zeros(0, dtype=np.int64)
+        columns = np.frombuffer(self.entry_columns, dtype=np.int64) if self.entry_columns else np.zeros(0, dtype=np.int64)
+        values = np.frombuffer(self.entry_values, dtype=np.float64) if self.entry_values else np.zeros(0)
+
+        # Ограничение с диапазоном заменяется парой: >= нижняя граница и <= верхняя граница
+        if self.ranges:
+            ranged = sorted(self.ranges)
+            upper_rows = {}
+            upper_rhs = []
+            for i in ranged:
+                value = self.ranges[i]
+                if row_senses[i] == '=':
+                    lower, upper = (rhs[i], rhs[i] + value) if value >= 0 else (rhs[i] + value, rhs[i])
+                elif row_senses[i] == '>=':
+                    lower, upper = rhs[i], rhs[i] + abs(value)
+                else:
+                    lower, upper = rhs[i] - abs(value), rhs[i]
+                row_senses[i], rhs[i] = '>=', lower
+                upper_rows[i] = len(row_senses) + len(upper_rhs)
+                upper_rhs.append(upper)
+            row_senses += ['<='] * len(upper_rhs)
+            rhs = np.concatenate((rhs, upper_rhs))
+            copy = np.isin(rows, ranged)
+            new_rows = np.array([upper_rows[i] for i in rows[copy].tolist()], dtype=np.int64)
+            rows = np.concatenate((rows, new_rows))
+            columns = np.concatenate((columns, columns[copy]))
+            values = np.concatenate((values, values[copy]))
+
+        # Сортировка по строкам и столбцам, повторные коэффициенты складываются
+        m = len(row_senses)
+        order = np.lexsort((columns, rows))
+        rows, columns, values = rows[order], columns[order], values[order]
+        if len(rows):
+            first = np.concatenate(([True], (np.diff(rows) != 0) | (np.diff(columns) != 0)))
+            starts = np.flatnonzero(first)
+            rows, columns, values = rows[starts], columns[starts], np.add.reduceat(values, starts)
+            nonzero = values != 0
+            rows, columns, values = rows[nonzero], columns[nonzero], values[nonzero]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=m))))
+
+        objective = np.zeros(n)
+        for j, value in self.objective.items():
+            objective[j] += value
+        lb = np.frombuffer(self.lb, dtype=np.float64).copy()
+        ub = np.frombuffer(self.ub, dtype=np.float64).copy()
+        domains = []
+        for j in range(n):
+            if j in self.integer:
+                if lb[j] == 0 and ub[j] == 1:
+                    domains.append('Binary')
+                elif lb[j] >= 0:
+                    domains.append('NonNegativeIntegers')
+                else:
+                    domains.append('Integers')
+            else:
+                domains.append('NonNegativeReals' if lb[j] >= 0 else 'Reals')
+
+        return SparseProblem(
+            objective=objective,
+            sense=self.sense,
+            domains=domains,
+            indptr=indptr,
+            indices=columns,
+            data=values,
+            row_senses=row_senses,
+            rhs=rhs,
+            lb=lb,
+            ub=ub,
+            objective_offset=self.objective_offset,
+        )
+
+
+def _mps_fields(line, fixed):
+    if not fixed:
+        return line.split()
+    # В фиксированном формате имена могут содержать пробелы, поля выделяются по позициям
+    return [field for field in (line[start:end].strip() for start, end in FIXED_MPS_FIELDS) if field]
+
+
+def _pairs(fields):
+    # Пары (имя, значение) в строках COLUMNS, RHS и RANGES
+    if len(fields) % 2:
+        raise ValueError("неверное количество полей")
+    return [(fields[k], float(fields[k + 1])) for k in range(0, len(fields), 2)]
+
+
+def read_mps(lines, fixed=False):
+    """
+    Читает задачу в формате MPS (свободном или фиксированном) построчно
+    и возвращает SparseProblem. Постоянное слагаемое целевой функции
+    (RHS строки целевой функции, взятая с обратным знаком) читается в objective_offset
+    и прибавляется к значению целевой функции в решении.
+    """
+    builder = _ProblemBuilder()
+    section = None
+    objective_row = None
+    free_rows = set()
+    integer_columns = False
+
+    for lineno, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if not line.strip() or line.startswith('*'):
+            continue
+        try:
+            if not line[0].isspace():
+                # Заголовок раздела
+                fields = line.split()
+                section = fields[0].upper()
+                if section == 'ENDATA':
+                    break
+                if section == 'OBJSENSE' and len(fields) > 1:
+                    builder.set_sense(fields[1])
+                elif section not in ('NAME', 'OBJSENSE', 'ROWS', 'COLUMNS', 'RHS', 'RANGES', 'BOUNDS'):
+                    raise ValueError(f"раздел {section} не поддерживается")
+                continue
+
+            if section == 'COLUMNS' and "'MARKER'" in line:
+                integer_columns = "'INTORG'" in line
+                continue
+            fields = _mps_fields(line, fixed)
+            if section == 'OBJSENSE':
+                builder.set_sense(fields[0])
+            elif section == 'ROWS':
+                kind, name = fields[0].upper(), fields[1]
+                if kind == 'N':
+                    if objective_row is None:
+                        objective_row = name
+                    else:
+                        free_rows.add(name)
+                else:
+                    builder.add_row(name, MPS_ROW_SENSES[kind])
+            elif section == 'COLUMNS':
+                j = builder.column(fields[0])
+                if integer_columns:
+                    builder.integer.add(j)
+                for name, value in _pairs(fields[1:]):
+                    if name == objective_row:
+                        builder.objective[j] = builder.objective.get(j, 0.0) + value
+                    elif name not in free_rows:
+                        builder.add(builder.rows[name], j, value)
+            elif section in ('RHS', 'RANGES'):
+                # Имя набора значений может быть опущено
+                if len(fields) % 2:
+                    fields = fields[1:]
+                for name, value in _pairs(fields):
+                    if name == objective_row:
+                        # Правая часть строки целевой функции - постоянное слагаемое с обратным знаком
+                        if section == 'RHS':
+                            builder.objective_offset -= value
+                        continue
+                    if name in free_rows:
+                        continue
+                    if section == 'RHS':
+                        builder.rhs[builder.rows[name]] = value
+                    else:
+                        builder.ranges[builder.rows[name]] = value
+            elif section == 'BOUNDS':
+                _read_mps_bound(builder, fields)
+            else:
+                raise ValueError("запись вне раздела")
+        except (ValueError, KeyError, IndexError) as e:
+            detail = f"неизвестное имя {e}" if isinstance(e, KeyError) else str(e) or "неверная запись"
+            raise ValueError(f"Строка {lineno}: {detail}: {line.strip()}")
+
+    return builder.build()
+
+
+def _read_mps_bound(builder, fields):
+    kind = fields[0].upper()
+    if kind in ('FR', 'MI', 'PL', 'BV'):
+        # Границы без значения: тип, [имя набора], переменная
+        j = builder.column(fields[2] if len(fields) > 2 else fields[1])
+    else:
+        j = builder.column(fields[-2])
+        value = float(fields[-1])
+    if kind == 'UP':
+        # По соглашению MPS отрицательная верхняя граница без нижней делает нижнюю -inf
+        if value < 0 and builder.lb[j] == 0:
+            builder.lb[j] = -np.inf
+        builder.ub[j] = value
+    elif kind == 'LO':
+        builder.lb[j] = value
+    elif kind == 'FX':
+        builder.lb[j] = builder.ub[j] = value
+    elif kind == 'FR':
+        builder.lb[j], builder.ub[j] = -np.inf, np.inf
+    elif kind == 'MI':
+        builder.lb[j] = -np.inf
+    elif kind == 'PL':
+        builder.ub[j] = np.inf
+    elif kind == 'BV':
+        builder.integer.add(j)
+        builder.lb[j], builder.ub[j] = 0.0, 1.0
+    elif kind == 'LI':
+        builder.integer.add(j)
+        builder.lb[j] = value
+    elif kind == 'UI':
+        builder.integer.add(j)
+        builder.ub[j] = value
+    else:
+        raise ValueError(f"тип границы {kind} не поддерживается")
+
+
+class _LpPart:
+    # Часть выражения между знаками сравнения: слагаемые (повторы складываются при сборке) и постоянные
+    def __init__(self):
+        self.columns = []
+        self.values = []
+        self.constants = []
+
+
+class _LpStatement:
+    """Целевая функция или ограничение LP файла: части выражения между знаками сравнения."""
+
+    def __init__(self):
+        self.parts = [_LpPart()]
+        self.operators = []
+
+    @property
+    def empty(self):
+        return not self.operators and not self.parts[0].columns and not self.parts[0].constants
+
+    @property
+    def complete(self):
+        # Ограничение закончено, если после знака сравнения есть только число
+        part = self.parts[-1]
+        return bool(self.operators) and not part.columns and bool(part.constants)
+
+    def add_term(self, j, value):
+        part = self.parts[-1]
+        part.columns.append(j)
+        part.values.append(value)
+
+    def add_constant(self, value):
+        self.parts[-1].constants.append(value)
+
+    def add_operator(self, operator):
+        self.operators.append(LP_SENSES[operator])
+        self.parts.append(_LpPart())
+
+
+class _LpReader:
+    def __init__(self):
+        self.builder = _ProblemBuilder()
+        self.section = None
+        self.statement = _LpStatement()
+        self.label = None
+        self.sign = 1.0
+        self.number = None
+
+    def feed(self, line):
+        line = line.split('\\', 1)[0]
+        stripped = line.strip()
+        if not stripped:
+            return True
+        for pattern, section in LP_SECTIONS:
+            match = pattern.match(stripped)
+            if match:
+                self.finish_statement()
+                if section == 'unsupported':
+                    raise ValueError(f"раздел {match.group(0)} не поддерживается")
+                if section == 'end':
+                    return False
+                if section in ('maximize', 'minimize'):
+                    self.builder.sense = section
+                    self.section = 'objective'
+                else:
+                    self.section = section
+                stripped = stripped[match.end():]
+                break
+        if self.section in ('objective', 'constraints') and self.feed_terms_line(stripped):
+            return True
+        tokens = [(match.lastgroup, match.group(match.lastgroup)) for match in LP_TOKEN.finditer(stripped)]
+        if self.section in ('objective', 'constraints'):
+            self.feed_expression(tokens)
+        elif self.section == 'bounds':
+            if tokens:
+                self.feed_bound(tokens)
+        elif self.section in ('general', 'binary'):
+            for kind, text in tokens:
+                if kind != 'name':
+                    raise ValueError(f"ожидается имя переменной, получено {text}")
+                j = self.builder.column(text)
+                self.builder.integer.add(j)
+                if self.section == 'binary':
+                    self.builder.lb[j], self.builder.ub[j] = 0.0, 1.0
+        elif tokens:
+            raise ValueError("запись вне раздела")
+        return True
+
+    def feed_terms_line(self, line):
+        """
+        Быстрый разбор типичной строки выражения одним регулярным выражением.
+        Возвращает False, если строку нужно разобрать по токенам.
+        """
+        match = LP_TERMS_LINE.fullmatch(line)
+        if match is None or self.number is not None or self.sign != 1.0:
+            return False
+        label, terms, operator, rhs_sign, rhs = match.groups()
+        statement = self.statement
+        if statement.operators and not statement.complete:
+            return False
+        if 'inf' in terms.lower():
+            return False
+        if label is not None or statement.complete:
+            self.finish_statement()
+            self.label = label
+            statement = self.statement
+        columns, values = statement.parts[-1].columns, statement.parts[-1].values
+        known, column = self.builder.columns, self.builder.column
+        for sign, coefficient, name in LP_TERM.findall(terms):
+            value = float(coefficient) if coefficient else 1.0
+            j = known.get(name)
+            columns.append(column(name) if j is None else j)
+            values.append(-value if sign == '-' else value)
+        if operator is not None:
+            statement.add_operator(operator)
+            statement.add_constant(-float(rhs) if rhs_sign == '-' else float(rhs))
+        return True
+
+    def flush_number(self, coefficient):
+        # Число перед именем переменной - коэффициент, иначе постоянное слагаемое
+        if self.number is not None and not coefficient:
+            self.statement.add_constant(self.sign * self.number)
+            self.sign, self.number = 1.0, None
+
+    def feed_expression(self, tokens):
+        for k, (kind, text) in enumerate(tokens):
+            if kind == 'other':
+                raise ValueError(f"неожиданный символ {text}")
+            if kind == 'colon':
+                continue
+            is_label = kind == 'name' and k + 1 < len(tokens) and tokens[k + 1][0] == 'colon'
+            self.flush_number(kind == 'name' and not is_label)
+            if kind != 'op' and (self.statement.complete or is_label) and self.number is None and self.sign == 1.0:
+                self.finish_statement()
+            if is_label:
+                self.label = text
+            elif kind == 'op':
+                self.statement.add_operator(text)
+            elif kind == 'sign':
+                if text == '-':
+                    self.sign = -self.sign
+            elif kind == 'number':
+                part = self.statement.parts[-1]
+                if self.statement.operators and not part.columns and not part.constants:
+                    # Первое число после знака сравнения - правая часть ограничения
+                    self.statement.add_constant(self.sign * float(text))
+                    self.sign = 1.0
+                else:
+                    self.number = float(text)
+            else:
+                value = self.sign * (1.0 if self.number is None else self.number)
+                if text.lower() in ('inf', 'infinity'):
+                    self.statement.add_constant(value * np.inf)
+                else:
+                    self.statement.add_term(self.builder.column(text), value)
+                self.sign, self.number = 1.0, None
+
+    def finish_statement(self):
+        self.flush_number(False)
+        if self.sign != 1.0:
+            raise ValueError("знак без слагаемого")
+        statement, self.statement = self.statement, _LpStatement()
+        label, self.label = self.label, None
+        if statement.empty:
+            return
+        if self.section == 'objective':
+            if statement.operators:
+                raise ValueError("знак сравнения в целевой функции")
+            objective = self.builder.objective
+            part = statement.parts[0]
+            for j, value in zip(part.columns, part.values):
+                objective[j] = objective.get(j, 0.0) + value
+            self.builder.objective_offset += sum(part.constants)
+            return
+        if not statement.operators:
+            raise ValueError("ограничение без знака сравнения")
+        if not statement.parts[-1].columns and not statement.parts[-1].constants:
+            raise ValueError("ограничение без правой части")
+        name = label or f"R{len(self.builder.row_senses) + 1}"
+        if len(statement.operators) == 1:
+            # Слагаемые правой части переносятся влево, постоянные - вправо
+            left, right = statement.parts
+            i = self.builder.add_row(name, statement.operators[0], sum(right.constants) - sum(left.constants))
+            self.builder.add_terms(i, left.columns, left.values)
+            if right.columns:
+                self.builder.add_terms(i, right.columns, [-value for value in right.values])
+            return
+        # Ограничение с диапазоном: a <= выражение <= b
+        operators = statement.operators
+        if len(operators) != 2:
+            raise ValueError("неверная запись ограничения с диапазоном")
+        first, middle, last = statement.parts
+        if first.columns or last.columns or middle.constants or operators[0] != operators[1] or operators[0] == '=':
+            raise ValueError("неверная запись ограничения с диапазоном")
+        lower, upper = sum(first.constants), sum(last.constants)
+        if operators[0] == '>=':
+            lower, upper = upper, lower
+        i = self.builder.add_row(name, '>=', lower)
+        self.builder.ranges[i] = upper - lower
+        self.builder.add_terms(i, middle.columns, middle.values)
+
+    def feed_bound(self, tokens):
+        items = []
+        sign = 1.0
+        for kind, text in tokens:
+            if kind == 'sign':
+                sign = -sign if text == '-' else sign
+            elif kind == 'number':
+                items.append(('value', sign * float(text)))
+                sign = 1.0
+            elif kind == 'name' and text.lower() in ('inf', 'infinity'):
+                items.append(('value', sign * np.inf))
+                sign = 1.0
+            elif kind == 'name' and text.lower() == 'free':
+                items.append(('free', None))
+            elif kind == 'name':
+                items.append(('name', text))
+            elif kind == 'op':
+                items.append(('op', LP_SENSES[text]))
+            else:
+                raise ValueError(f"неожиданный символ {text}")
+        kinds = [kind for kind, _ in items]
+        builder = self.builder
+        if kinds == ['name', 'free']:
+            j = builder.column(items[0][1])
+            builder.lb[j], builder.ub[j] = -np.inf, np.inf
+        elif kinds == ['name', 'op', 'value']:
+            self.set_bound(builder.column(items[0][1]), items[1][1], items[2][1])
+        elif kinds == ['value', 'op', 'name']:
+            # "v <= x" - то же, что "x >= v"
+            flipped = {'<=': '>=', '>=': '<=', '=': '='}[items[1][1]]
+            self.set_bound(builder.column(items[2][1]), flipped, items[0][1])
+        elif kinds == ['value', 'op', 'name', 'op', 'value'] and items[1][1] == items[3][1] == '<=':
+            j = builder.column(items[2][1])
+            builder.lb[j], builder.ub[j] = items[0][1], items[4][1]
+        else:
+            raise ValueError("неверная запись границы")
+
+    def set_bound(self, j, operator, value):
+        if operator == '<=':
+            self.builder.ub[j] = value
+        elif operator == '>=':
+            self.builder.lb[j] = value
+        else:
+            self.builder.lb[j] = self.builder.ub[j] = value
+
+
+def read_lp(lines):
+    """
+    Читает задачу в формате CPLEX LP построчно и возвращает SparseProblem.
+    Поддерживаются разделы целевой функции, ограничений (в том числе с диапазоном),
+    границ, General и Binary. Постоянное слагаемое целевой функции читается
+    в objective_offset и прибавляется к значению целевой функции в решении.
+    """
+    reader = _LpReader()
+    lineno = 0
+    try:
+        for lineno, line in enumerate(lines, 1):
+            if not reader.feed(line):
+                break
+        reader.finish_statement()
+    except (ValueError, KeyError) as e:
+        raise ValueError(f"Строка {lineno}: {e}")
+    return reader.builder.build()
+
+
+def read_model_file(stream, filename, fixed=False):
+    """
+    Читает задачу из файла .mps или .lp, в том числе сжатого gzip (.mps.gz, .lp.gz).
+    Файл читается построчно, целиком в память не загружается.
+    fixed - фиксированный формат MPS вместо свободного.
+    """
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if not name.endswith(('.mps', '.lp')):
+        raise ValueError("Поддерживаются файлы .mps и .lp, в том числе сжатые gzip (.gz)")
+
+    magic = stream.read(2)
+    stream.seek(0)
+    if magic == GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream)
+    lines = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    try:
+        if name.endswith('.mps'):
+            return read_mps(lines, fixed)
+        return read_lp(lines)
+    except (OSError, EOFError) as e:
+        raise ValueError(f"Ошибка в чтении файла: {e}")
+    finally:
+        lines.detach()
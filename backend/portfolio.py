@@ -0,0 +1,156 @@
+import math
+import queue
+import shutil
+import threading
+import time
+
+from problem import INTEGER_DOMAINS
+
+# Режимы выбора решателя: гонка всех доступных решателей и выбор по истории решений
+PORTFOLIO = 'portfolio'
+AUTO = 'auto'
+# Исполняемые файлы решателей, которые участвуют в гонке
+SOLVER_EXECUTABLES = {'glpk': 'glpsol', 'cbc': 'cbc', 'scip': 'scip'}
+# Статусы, при которых решение решателя окончательное и остальные решатели можно остановить
+PROVEN_TERMINATIONS = ('optimal', 'infeasible', 'unbounded')
+# Во сколько раз время решателя, не доказавшего результат, хуже его фактического времени
+UNPROVEN_PENALTY = 2.0
+# Сколько секунд ждать завершения остальных решателей после окончательного решения
+STOP_WAIT = 5
+# Количество ближайших по признакам решенных задач для выбора решателя в режиме auto
+AUTO_NEIGHBOURS = 10
+# Меньше решенных портфелем задач - режим auto продолжает решать портфелем
+AUTO_MIN_HISTORY = 5
+
+
+def available_solvers():
+    """Решатели, исполняемые файлы которых найдены в PATH."""
+    return [solver for solver, executable in SOLVER_EXECUTABLES.items() if shutil.which(executable)]
+
+
+def problem_features(problem):
+    """Признаки задачи для выбора решателя: размеры, доля целочисленных переменных, плотность."""
+    n, m = problem.num_variables, problem.num_constraints
+    integer = sum(1 for domain in problem.domains if domain in INTEGER_DOMAINS)
+    return {
+        'num_variables': n,
+        'num_constraints': m,
+        'nnz': problem.nnz,
+        'integer_fraction': integer / n if n else 0.0,
+        'density': problem.nnz / (n * m) if n and m else 0.0,
+    }
+
+
+def _feature_vector(features):
+    return (
+        math.log1p(features['num_variables']),
+        math.log1p(features['num_constraints']),
+        math.log1p(features['nnz']),
+        features['integer_fraction'] * 5,
+        features['density'] * 5,
+    )
+
+
+def choose_solver(features, history):
+    """
+    Выбирает решатель для режима auto по истории решений похожих задач.
+    history - список пар (признаки задачи, {решатель: {'time': ..., 'status': ...}}).
+    Для каждого решателя усредняется время на AUTO_NEIGHBOURS ближайших задачах,
+    время без доказанного результата умножается на UNPROVEN_PENALTY.
+    Возвращает None, если истории недостаточно.
+    """
+    if len(history) < AUTO_MIN_HISTORY:
+        return None
+    target = _feature_vector(features)
+    nearest = sorted(history, key=lambda item: math.dist(_feature_vector(item[0]), target))[:AUTO_NEIGHBOURS]
+    scores = {}
+    for _, timings in nearest:
+        for solver, timing in timings.items():
+            elapsed = timing['time']
+            if timing['status'] not in PROVEN_TERMINATIONS:
+                elapsed *= UNPROVEN_PENALTY
+            scores.setdefault(solver, []).append(elapsed)
+    available = set(available_solvers())
+    candidates = [(sum(times) / len(times), solver) for solver, times in scores.items() if solver in available]
+    return min(candidates)[1] if candidates else None
+
+
+def _better(solution, best, sense):
+    if best is None or best.get('objective') is None:
+        return True
+    if sense == 'maximize':
+        return solution['objective'] > best['objective']
+    return solution['objective'] < best['objective']
+
+
+def race(solvers, solve, sense, on_progress=None):
+    """
+    Решает задачу несколькими решателями одновременно. solve(solver, on_start, on_progress)
+    решает задачу одним решателем и вызывает on_start(process) с процессом решателя.
+    Возвращается первое окончательное решение (optimal, infeasible, unbounded), процессы
+    остальных решателей завершаются. Если окончательного решения нет, возвращается решение
+    с лучшим значением целевой функции. В поле portfolio решения - победитель и время
+    каждого решателя.
+    """
+    if not solvers:
+        raise Exception("Не найдено ни одного решателя для режима portfolio")
+    results = queue.Queue()
+    lock = threading.Lock()
+    processes = []
+    stopped = threading.Event()
+    start = time.perf_counter()
+
+    def on_start(process):
+        with lock:
+            processes.append(process)
+        if stopped.is_set():
+            process.kill()
+
+    def run(solver):
+        progress = None
+        if on_progress is not None:
+            def progress(event):
+                # События решателей передаются одному получателю по очереди
+                with lock:
+                    on_progress(dict(event, solver=solver))
+        try:
+            results.put((solver, solve(solver, on_start, progress), None))
+        except Exception as ex:
+            results.put((solver, None, str(ex)))
+
+    for solver in solvers:
+        threading.Thread(target=run, args=(solver,), daemon=True).start()
+
+    timings = {}
+    winner, best = None, None
+    for _ in solvers:
+        try:
+            solver, solution, error = results.get(timeout=STOP_WAIT if stopped.is_set() else None)
+        except queue.Empty:
+            # Процесс решателя завершен, но его поток еще не вернул результат
+            break
+        elapsed = round(time.perf_counter() - start, 3)
+        if stopped.is_set():
+            timings[solver] = {'time': elapsed, 'status': 'canceled'}
+            continue
+        if error is not None:
+            timings[solver] = {'time': elapsed, 'status': 'error', 'error': error}
+            continue
+        timings[solver] = {'time': elapsed, 'status': solution['termination_condition']}
+        if solution['termination_condition'] in PROVEN_TERMINATIONS:
+            winner, best = solver, solution
+            stopped.set()
+            with lock:
+                for process in processes:
+                    if process.poll() is None:
+                        process.kill()
+        elif solution.get('objective') is not None and _better(solution, best, sense):
+            winner, best = solver, solution
+        elif best is None:
+            winner, best = solver, solution
+
+    for solver in solvers:
+        timings.setdefault(solver, {'time': round(time.perf_counter() - start, 3), 'status': 'canceled'})
+    if best is None:
+        raise Exception("; ".join(f"{solver}: {timing.get('error')}" for solver, timing in timings.items()))
+    return dict(best, portfolio={'winner': winner, 'timings': timings})
@@ -0,0 +1,354 @@
+import time
+
+import numpy as np
+from problem import INTEGER_DOMAINS, SparseProblem
+
+# Допуск сравнения чисел при упрощении задачи
+TOLERANCE = 1e-9
+# Допуск выполнения ограничений: при проверке допустимости, округлении границ
+# целочисленных переменных и поиске переменных на границе в решении
+FEASIBILITY_TOLERANCE = 1e-6
+# Максимальное количество проходов упрощения
+MAX_PASSES = 20
+# Границы, выведенные из ограничений, больше этого значения по модулю не используются
+MAX_DERIVED_BOUND = 1e9
+# Знаки ограничений с верхней и нижней границей выражения
+UPPER_SENSES = ('<=', '=')
+LOWER_SENSES = ('>=', '=')
+
+
+def _close(a, b, tolerance=TOLERANCE):
+    return abs(a - b) <= tolerance * (1 + max(abs(a), abs(b)))
+
+
+class PresolveResult:
+    """
+    Результат упрощения задачи: упрощенная задача, сведения для восстановления
+    решения исходной задачи (postsolve) и статистика упрощения.
+
+    rows и columns - индексы строк и переменных исходной задачи, оставшихся
+    в упрощенной задаче (в порядке упрощенной задачи).
+    """
+
+    def __init__(self, original, problem, rows, columns, fixed_values, lb, ub, bound_rows, lb_rows, ub_rows, infeasible, stats):
+        self.original = original
+        self.problem = problem
+        self.rows = rows
+        self.columns = columns
+        self.fixed_values = fixed_values
+        self.lb = lb
+        self.ub = ub
+        self.bound_rows = bound_rows
+        self.lb_rows = lb_rows
+        self.ub_rows = ub_rows
+        self.infeasible = infeasible
+        self.stats = stats
+
+    def reduce_values(self, values):
+        """Значения переменных {индекс в исходной задаче: значение} в нумерации упрощенной задачи."""
+        return {k: values[j] for k, j in enumerate(self.columns.tolist()) if j in values}
+
+    def postsolve_values(self, values):
+        """Значения всех переменных исходной задачи по значениям переменных упрощенной задачи."""
+        x = self.fixed_values.copy()
+        reduced = [0.0 if values.get(k) is None else values[k] for k in range(len(self.columns))]
+        x[self.columns] = reduced
+        return x
+
+    def postsolve_duals(self, x, duals):
+        """
+        Двойственные оценки всех ограничений исходной задачи. Удаленные ограничения
+        получают нулевую оценку, кроме ограничений, замененных границей переменной:
+        если эта граница достигается, ограничению передается приведенная стоимость переменной.
+        """
+        problem = self.original
+        y = np.zeros(problem.num_constraints)
+        y[self.rows] = duals
+        entry_rows = np.repeat(np.arange(problem.num_constraints), np.diff(problem.indptr))
+        reduced_costs = problem.objective - np.bincount(problem.indices, weights=problem.data * y[entry_rows], minlength=problem.num_variables)
+        direction = 1 if problem.sense == 'minimize' else -1
+        for i, j, a in reversed(self.bound_rows):
+            d = reduced_costs[j] * direction
+            at_lower = d > 0 and self.lb_rows[j] == i and _close(x[j], self.lb[j], FEASIBILITY_TOLERANCE)
+            at_upper = d < 0 and self.ub_rows[j] == i and _close(x[j], self.ub[j], FEASIBILITY_TOLERANCE)
+            if not (at_lower or at_upper):
+                continue
+            # Ограничение i - единственное, что удерживает переменную j на границе
+            y[i] = reduced_costs[j] / a
+            indices, values = problem.row(i)
+            reduced_costs[indices] -= values * y[i]
+        return y
+
+
+class _Presolver:
+    def __init__(self, problem):
+        self.problem = problem
+        m, n = problem.num_constraints, problem.num_variables
+        self.entry_rows = np.repeat(np.arange(m), np.diff(problem.indptr))
+        self.row_active = np.ones(m, dtype=bool)
+        self.column_active = np.ones(n, dtype=bool)
+        self.rhs = problem.rhs.copy()
+        self.lb = problem.lb.copy()
+        self.ub = problem.ub.copy()
+        self.integer = np.array([domain in INTEGER_DOMAINS for domain in problem.domains], dtype=bool)
+        self.upper_rows = np.array([sense in UPPER_SENSES for sense in problem.row_senses], dtype=bool)
+        self.lower_rows = np.array([sense in LOWER_SENSES for sense in problem.row_senses], dtype=bool)
+        self.fixed_values = np.zeros(n)
+        # Ограничения, замененные границами переменных: (строка, переменная, коэффициент)
+        self.bound_rows = []
+        # Строка, из которой получена текущая нижняя (верхняя) граница переменной, -1 - исходная граница
+        self.lb_rows = np.full(n, -1)
+        self.ub_rows = np.full(n, -1)
+        self.infeasible = False
+        self.stats = {
+            'empty_rows': 0,
+            'duplicate_rows': 0,
+            'singleton_rows': 0,
+            'fixed_columns': 0,
+            'empty_columns': 0,
+            'tightened_bounds': 0,
+        }
+
+    def tighten(self, j, lower=None, upper=None, row=-1):
+        """Сужает границы переменной j. Возвращает True, если границы изменились."""
+        changed = False
+        if lower is not None and np.isfinite(lower):
+            if self.integer[j]:
+                lower = np.ceil(lower - FEASIBILITY_TOLERANCE)
+            if lower > self.lb[j] + TOLERANCE * (1 + abs(lower)):
+                self.lb[j] = lower
+                self.lb_rows[j] = row
+                changed = True
+        if upper is not None and np.isfinite(upper):
+            if self.integer[j]:
+                upper = np.floor(upper + FEASIBILITY_TOLERANCE)
+            if upper < self.ub[j] - TOLERANCE * (1 + abs(upper)):
+                self.ub[j] = upper
+                self.ub_rows[j] = row
+                changed = True
+        if self.lb[j] > self.ub[j]:
+            if self.lb[j] - self.ub[j] > FEASIBILITY_TOLERANCE * (1 + abs(self.lb[j])):
+                self.infeasible = True
+            else:
+                self.ub[j] = self.lb[j]
+        if changed and row < 0:
+            self.stats['tightened_bounds'] += 1
+        return changed
+
+    def active_entries(self):
+        return self.row_active[self.entry_rows] & self.column_active[self.problem.indices]
+
+    def remove_empty_rows(self, counts):
+        empty = np.flatnonzero(self.row_active & (counts == 0))
+        for i in empty.tolist():
+            sense, b = self.problem.row_senses[i], self.rhs[i]
+            if (sense in UPPER_SENSES and b < -FEASIBILITY_TOLERANCE) or (sense in LOWER_SENSES and b > FEASIBILITY_TOLERANCE):
+                self.infeasible = True
+        self.row_active[empty] = False
+        self.stats['empty_rows'] += len(empty)
+        return len(empty) > 0
+
+    def remove_singleton_rows(self, entries, counts):
+        """Ограничение с одной переменной a * x_j (знак) b заменяется границей x_j."""
+        singleton = self.row_active & (counts == 1)
+        found = entries & singleton[self.entry_rows]
+        for e in np.flatnonzero(found).tolist():
+            i, j, a = int(self.entry_rows[e]), int(self.problem.indices[e]), float(self.problem.data[e])
+            sense, bound = self.problem.row_senses[i], self.rhs[i] / a
+            if a < 0 and sense != '=':
+                sense = '<=' if sense == '>=' else '>='
+            self.tighten(
+                j,
+                lower=bound if sense in LOWER_SENSES else None,
+                upper=bound if sense in UPPER_SENSES else None,
+                row=i,
+            )
+            self.row_active[i] = False
+            self.bound_rows.append((i, j, a))
+        self.stats['singleton_rows'] += int(found.sum())
+        return bool(found.any())
+
+    def fix_columns(self, columns, values):
+        """Переменные с известными значениями удаляются, их вклад переносится в правые части."""
+        self.fixed_values[columns] = values
+        self.column_active[columns] = False
+        fixed = np.zeros(len(self.column_active), dtype=bool)
+        fixed[columns] = True
+        mask = fixed[self.problem.indices] & self.row_active[self.entry_rows]
+        weights = self.problem.data[mask] * self.fixed_values[self.problem.indices[mask]]
+        self.rhs -= np.bincount(self.entry_rows[mask], weights=weights, minlength=len(self.rhs))
+
+    def remove_fixed_columns(self):
+        fixed = np.flatnonzero(self.column_active & np.isfinite(self.lb) & (self.ub - self.lb <= TOLERANCE * (1 + np.abs(self.lb))))
+        if len(fixed):
+            self.fix_columns(fixed, self.lb[fixed])
+            self.stats['fixed_columns'] += len(fixed)
+        return len(fixed) > 0
+
+    def remove_empty_columns(self, entries):
+        """
+        Переменная, которая не входит ни в одно ограничение, фиксируется на лучшей
+        для целевой функции границе. Переменные, улучшающие целевую функцию
+        безгранично, остаются в задаче, чтобы статус определил решатель.
+        """
+        used = np.zeros(len(self.column_active), dtype=bool)
+        used[self.problem.indices[entries]] = True
+        cost = self.problem.objective if self.problem.sense == 'minimize' else -self.problem.objective
+        values = np.where(cost > 0, self.lb, np.where(cost < 0, self.ub, np.clip(0.0, self.lb, self.ub)))
+        empty = np.flatnonzero(self.column_active & ~used & np.isfinite(values))
+        if len(empty):
+            self.fix_columns(empty, values[empty])
+            self.stats['empty_columns'] += len(empty)
+        return len(empty) > 0
+
+    def remove_duplicate_rows(self, entries, counts):
+        """
+        Ограничения с пропорциональными коэффициентами сравниваются как границы одного
+        выражения: остаются самые сильные, противоречие означает недопустимость задачи.
+        """
+        groups = {}
+        indices, data = self.problem.indices, self.problem.data
+        indptr = self.problem.indptr
+        for i in np.flatnonzero(self.row_active & (counts >= 2)).tolist():
+            start, end = indptr[i], indptr[i + 1]
+            mask = entries[start:end]
+            columns, values = indices[start:end][mask], data[start:end][mask]
+            scale = values[0]
+            normalized = np.round(values / scale, 12) + 0.0
+            groups.setdefault((columns.tobytes(), normalized.tobytes()), []).append((i, scale))
+
+        removed = 0
+        for rows in groups.values():
+            if len(rows) < 2:
+                continue
+            equal, lower, upper = [], [], []
+            for i, scale in rows:
+                sense, value = self.problem.row_senses[i], self.rhs[i] / scale
+                if scale < 0 and sense != '=':
+                    sense = '<=' if sense == '>=' else '>='
+                if sense == '=':
+                    equal.append((value, i))
+                elif sense == '>=':
+                    lower.append((value, i))
+                else:
+                    upper.append((value, i))
+            if equal:
+                value, kept = equal[0]
+                if any(not _close(other, value) for other, _ in equal) \
+                        or any(bound > value + FEASIBILITY_TOLERANCE * (1 + abs(value)) for bound, _ in lower) \
+                        or any(bound < value - FEASIBILITY_TOLERANCE * (1 + abs(value)) for bound, _ in upper):
+                    self.infeasible = True
+                keep = {kept}
+            else:
+                keep = set()
+                if lower:
+                    keep.add(max(lower)[1])
+                if upper:
+                    keep.add(min(upper)[1])
+                if lower and upper and max(lower)[0] > min(upper)[0] + FEASIBILITY_TOLERANCE * (1 + abs(min(upper)[0])):
+                    self.infeasible = True
+            for i, _ in rows:
+                if i not in keep:
+                    self.row_active[i] = False
+                    removed += 1
+        self.stats['duplicate_rows'] += removed
+        return removed > 0
+
+    def tighten_integer_bounds(self, entries):
+        """
+        Сужение границ целочисленных переменных по ограничениям: для a * x <= b
+        x_j <= (b - минимум остальных слагаемых) / a_j, если a_j > 0 (и аналогично для a_j < 0).
+        """
+        rows = self.entry_rows[entries]
+        columns = self.problem.indices[entries]
+        values = self.problem.data[entries]
+        m = len(self.rhs)
+        lower, upper = self.lb.copy(), self.ub.copy()
+        for sign, side_rows in ((1, self.upper_rows), (-1, self.lower_rows)):
+            side = side_rows[rows]
+            r, j, a = rows[side], columns[side], values[side] * sign
+            with np.errstate(invalid='ignore'):
+                contribution = np.where(a > 0, a * self.lb[j], a * self.ub[j])
+            infinite = ~np.isfinite(contribution)
+            finite_sum = np.bincount(r, weights=np.where(infinite, 0.0, contribution), minlength=m)
+            infinite_count = np.bincount(r, weights=infinite, minlength=m)
+            rest = finite_sum[r] - np.where(infinite, 0.0, contribution)
+            valid = self.integer[j] & (infinite_count[r] - infinite == 0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                bound = (self.rhs[r] * sign - rest) / a
+            valid &= np.abs(bound) < MAX_DERIVED_BOUND
+            np.minimum.at(upper, j[valid & (a > 0)], bound[valid & (a > 0)])
+            np.maximum.at(lower, j[valid & (a < 0)], bound[valid & (a < 0)])
+
+        changed = False
+        for j in np.flatnonzero(self.column_active & self.integer & ((lower > self.lb) | (upper < self.ub))).tolist():
+            changed |= self.tighten(j, lower=lower[j], upper=upper[j])
+        return changed
+
+    def run(self):
+        for j in np.flatnonzero(self.integer).tolist():
+            self.tighten(j, lower=self.lb[j], upper=self.ub[j])
+        passes = 0
+        changed = True
+        while changed and not self.infeasible and passes < MAX_PASSES:
+            passes += 1
+            entries = self.active_entries()
+            counts = np.bincount(self.entry_rows[entries], minlength=len(self.rhs))
+            changed = self.remove_empty_rows(counts)
+            changed |= self.remove_singleton_rows(entries, counts)
+            changed |= self.remove_fixed_columns()
+
+            entries = self.active_entries()
+            counts = np.bincount(self.entry_rows[entries], minlength=len(self.rhs))
+            changed |= self.remove_duplicate_rows(entries, counts)
+            entries = self.active_entries()
+            changed |= self.tighten_integer_bounds(entries)
+            changed |= self.remove_fixed_columns()
+            changed |= self.remove_empty_columns(self.active_entries())
+        self.stats['passes'] = passes
+        return self.result()
+
+    def result(self):
+        problem = self.problem
+        rows = np.flatnonzero(self.row_active)
+        columns = np.flatnonzero(self.column_active)
+        position = np.full(problem.num_variables, -1)
+        position[columns] = np.arange(len(columns))
+
+        entries = self.active_entries()
+        counts = np.bincount(self.entry_rows[entries], minlength=problem.num_constraints)[rows]
+        reduced = SparseProblem(
+            objective=problem.objective[columns],
+            sense=problem.sense,
+            domains=[problem.domains[j] for j in columns.tolist()],
+            indptr=np.concatenate(([0], np.cumsum(counts))),
+            indices=position[problem.indices[entries]],
+            data=problem.data[entries],
+            row_senses=[problem.row_senses[i] for i in rows.tolist()],
+            rhs=self.rhs[rows],
+            lb=self.lb[columns],
+            ub=self.ub[columns],
+        )
+        self.stats.update({
+            'rows': problem.num_constraints,
+            'columns': problem.num_variables,
+            'removed_rows': problem.num_constraints - reduced.num_constraints,
+            'removed_columns': problem.num_variables - reduced.num_variables,
+        })
+        return PresolveResult(
+            problem, reduced, rows, columns, self.fixed_values, self.lb, self.ub, self.bound_rows,
+            self.lb_rows, self.ub_rows, self.infeasible, self.stats,
+        )
+
+
+def presolve(problem):
+    """
+    Упрощает задачу перед передачей решателю: удаляет пустые и повторяющиеся
+    ограничения, заменяет ограничения с одной переменной границами переменных,
+    удаляет фиксированные переменные и сужает границы целочисленных переменных.
+    Проходы повторяются, пока задача меняется. Возвращает PresolveResult.
+    """
+    start = time.perf_counter()
+    result = _Presolver(problem).run()
+    result.stats['time'] = round(time.perf_counter() - start, 4)
+    return result
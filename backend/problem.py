@@ -0,0 +1,352 @@
+from io import BytesIO
+
+import numpy as np
+
+# Допустимые области определения переменных
+DOMAINS = ('NonNegativeReals', 'NonNegativeIntegers', 'Integers', 'Reals', 'Binary')
+INTEGER_DOMAINS = ('NonNegativeIntegers', 'Integers', 'Binary')
+SENSES = ('<=', '>=', '=')
+
+
+class SparseProblem:
+    """
+    Разреженное представление задачи MILP.
+
+    Матрица ограничений хранится в формате CSR (indptr, indices, data),
+    нулевые коэффициенты не хранятся. Строки нумеруются с нуля, в отчетах
+    ограничения нумеруются с единицы, как в ConstraintList.
+    objective_offset - постоянное слагаемое целевой функции.
+    """
+
+    def __init__(self, objective, sense, domains, indptr, indices, data, row_senses, rhs, lb=None, ub=None, objective_offset=0.0):
+        self.objective = np.asarray(objective, dtype=np.float64)
+        self.objective_offset = float(objective_offset)
+        self.sense = sense
+        self.domains = list(domains)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=np.float64)
+        self.row_senses = list(row_senses)
+        self.rhs = np.asarray(rhs, dtype=np.float64)
+        default_lb, default_ub = domain_bounds(self.domains)
+        self.lb = default_lb if lb is None else np.asarray(lb, dtype=np.float64)
+        self.ub = default_ub if ub is None else np.asarray(ub, dtype=np.float64)
+
+    @property
+    def num_variables(self):
+        return len(self.domains)
+
+    @property
+    def num_constraints(self):
+        return len(self.row_senses)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def size_estimate(self):
+        """Оценка размера задачи для приоритета в очереди."""
+        return self.nnz + self.num_variables + self.num_constraints
+
+    def row(self, i):
+        """Возвращает индексы и коэффициенты ненулевых элементов строки i."""
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+
+def domain_bounds(domains):
+    """Границы переменных, которые следуют из их областей определения."""
+    lb = np.full(len(domains), -np.inf)
+    ub = np.full(len(domains), np.inf)
+    for i, domain in enumerate(domains):
+        if domain in ('NonNegativeReals', 'NonNegativeIntegers'):
+            lb[i] = 0.0
+        elif domain == 'Binary':
+            lb[i] = 0.0
+            ub[i] = 1.0
+    return lb, ub
+
+
+def from_conditions(data):
+    """
+    Преобразует условия задачи (JSON с плотными списками коэффициентов) в SparseProblem.
+    """
+    domains = data['variable_domains']
+    num_variables = len(domains)
+    for domain in domains:
+        if domain not in DOMAINS:
+            raise ValueError(f"Неизвестная область определения переменной: {domain}")
+
+    objective = np.zeros(num_variables)
+    coefficients = np.asarray(data['objective']['coefficients'], dtype=np.float64)
+    objective[:len(coefficients)] = coefficients[:num_variables]
+
+    indptr = [0]
+    indices = []
+    values = []
+    row_senses = []
+    rhs = []
+    for constr in data['constraints']:
+        if constr['sense'] not in SENSES:
+            raise ValueError(f"Неизвестный знак ограничения: {constr['sense']}")
+        row = np.asarray(constr['coefficients'], dtype=np.float64)[:num_variables]
+        nonzero = np.flatnonzero(row)
+        indices.append(nonzero)
+        values.append(row[nonzero])
+        indptr.append(indptr[-1] + len(nonzero))
+        row_senses.append(constr['sense'])
+        rhs.append(float(constr['rhs']))
+
+    return SparseProblem(
+        objective=objective,
+        sense=data['objective']['sense'],
+        domains=domains,
+        indptr=indptr,
+        indices=np.concatenate(indices) if indices else [],
+        data=np.concatenate(values) if values else [],
+        row_senses=row_senses,
+        rhs=rhs,
+        objective_offset=data['objective'].get('constant', 0.0),
+    )
+
+
+def to_conditions(problem):
+    """
+    Обратное преобразование SparseProblem в плотные условия задачи (JSON).
+    """
+    constraints = []
+    for i in range(problem.num_constraints):
+        row = np.zeros(problem.num_variables)
+        indices, values = problem.row(i)
+        row[indices] = values
+        constraints.append({
+            "coefficients": row.tolist(),
+            "rhs": float(problem.rhs[i]),
+            "sense": problem.row_senses[i],
+        })
+    return {
+        "objective": {
+            "coefficients": problem.objective.tolist(),
+            "sense": problem.sense,
+            "constant": problem.objective_offset,
+        },
+        "variable_domains": list(problem.domains),
+        "constraints": constraints,
+    }
+
+
+def row_activity(problem, x):
+    """Значения левых частей ограничений (A @ x) для вектора переменных x."""
+    x = np.asarray(x, dtype=np.float64)
+    rows = np.repeat(np.arange(problem.num_constraints), np.diff(problem.indptr))
+    return np.bincount(rows, weights=problem.data * x[problem.indices], minlength=problem.num_constraints)
+
+
+def objective_value(problem, x):
+    """Значение целевой функции с постоянным слагаемым для вектора переменных x."""
+    return float(problem.objective @ np.asarray(x, dtype=np.float64)) + problem.objective_offset
+
+
+def _check_index(index, size, what):
+    index = int(index)
+    if not 0 <= index < size:
+        raise ValueError(f"Неверный индекс {what}: {index}")
+    return index
+
+
+def apply_delta(problem, delta):
+    """
+    Применяет к задаче изменения и возвращает новую задачу и список column_map,
+    где column_map[j] - индекс переменной j в исходной задаче (None для новых переменных).
+
+    Индексы в изменениях отсчитываются с нуля и относятся к исходной задаче:
+        objective: {"coefficients": {j: c}, "sense": "maximize"}
+        variable_domains: {j: domain}
+        coefficients: [{"row": i, "column": j, "value": a}]
+        rhs: {i: b}, senses: {i: sense}
+        add_variables: [{"domain": ..., "objective": c, "coefficients": {i: a}}]
+        add_constraints: [{"coefficients": [...] или {j: a}, "rhs": b, "sense": sense}]
+        remove_constraints: [i, ...], remove_variables: [j, ...]
+    Сначала применяются изменения, затем добавления, затем удаления.
+    """
+    n, m = problem.num_variables, problem.num_constraints
+    objective = problem.objective.tolist()
+    sense = problem.sense
+    domains = list(problem.domains)
+    lb, ub = problem.lb.tolist(), problem.ub.tolist()
+    rows = []
+    for i in range(m):
+        indices, values = problem.row(i)
+        rows.append(dict(zip(indices.tolist(), values.tolist())))
+    row_senses = list(problem.row_senses)
+    rhs = problem.rhs.tolist()
+
+    # Изменения существующих коэффициентов, правых частей, знаков и областей определения
+    objective_delta = delta.get('objective', {})
+    for j, value in objective_delta.get('coefficients', {}).items():
+        objective[_check_index(j, n, 'переменной')] = float(value)
+    if 'sense' in objective_delta:
+        if objective_delta['sense'] not in ('maximize', 'minimize'):
+            raise ValueError("Неверный вид оптимизации")
+        sense = objective_delta['sense']
+    for j, domain in delta.get('variable_domains', {}).items():
+        j = _check_index(j, n, 'переменной')
+        if domain not in DOMAINS:
+            raise ValueError(f"Неизвестная область определения переменной: {domain}")
+        domains[j] = domain
+        (lb[j],), (ub[j],) = domain_bounds([domain])
+    for change in delta.get('coefficients', []):
+        i = _check_index(change['row'], m, 'ограничения')
+        j = _check_index(change['column'], n, 'переменной')
+        if float(change['value']) == 0:
+            rows[i].pop(j, None)
+        else:
+            rows[i][j] = float(change['value'])
+    for i, value in delta.get('rhs', {}).items():
+        rhs[_check_index(i, m, 'ограничения')] = float(value)
+    for i, value in delta.get('senses', {}).items():
+        if value not in SENSES:
+            raise ValueError(f"Неизвестный знак ограничения: {value}")
+        row_senses[_check_index(i, m, 'ограничения')] = value
+
+    # Новые переменные и ограничения
+    column_map = list(range(n))
+    for variable in delta.get('add_variables', []):
+        domain = variable.get('domain', 'NonNegativeReals')
+        if domain not in DOMAINS:
+            raise ValueError(f"Неизвестная область определения переменной: {domain}")
+        j = len(domains)
+        domains.append(domain)
+        objective.append(float(variable.get('objective', 0)))
+        (var_lb,), (var_ub,) = domain_bounds([domain])
+        lb.append(var_lb)
+        ub.append(var_ub)
+        column_map.append(None)
+        for i, value in variable.get('coefficients', {}).items():
+            if float(value) != 0:
+                rows[_check_index(i, m, 'ограничения')][j] = float(value)
+    for constr in delta.get('add_constraints', []):
+        if constr['sense'] not in SENSES:
+            raise ValueError(f"Неизвестный знак ограничения: {constr['sense']}")
+        coefficients = constr['coefficients']
+        if isinstance(coefficients, dict):
+            items = coefficients.items()
+        else:
+            items = enumerate(coefficients)
+        row = {}
+        for j, value in items:
+            if float(value) != 0:
+                row[_check_index(j, len(domains), 'переменной')] = float(value)
+        rows.append(row)
+        row_senses.append(constr['sense'])
+        rhs.append(float(constr['rhs']))
+
+    # Удаление ограничений и переменных
+    removed_rows = {_check_index(i, m, 'ограничения') for i in delta.get('remove_constraints', [])}
+    removed_columns = {_check_index(j, n, 'переменной') for j in delta.get('remove_variables', [])}
+    kept_rows = [i for i in range(len(rows)) if i not in removed_rows]
+    kept_columns = [j for j in range(len(domains)) if j not in removed_columns]
+    new_index = {j: k for k, j in enumerate(kept_columns)}
+
+    indptr = [0]
+    indices = []
+    values = []
+    for i in kept_rows:
+        row = sorted((new_index[j], value) for j, value in rows[i].items() if j in new_index)
+        indices.extend(j for j, _ in row)
+        values.extend(value for _, value in row)
+        indptr.append(len(indices))
+
+    new_problem = SparseProblem(
+        objective=[objective[j] for j in kept_columns],
+        sense=sense,
+        domains=[domains[j] for j in kept_columns],
+        indptr=indptr,
+        indices=indices,
+        data=values,
+        row_senses=[row_senses[i] for i in kept_rows],
+        rhs=[rhs[i] for i in kept_rows],
+        lb=[lb[j] for j in kept_columns],
+        ub=[ub[j] for j in kept_columns],
+        objective_offset=problem.objective_offset,
+    )
+    return new_problem, [column_map[j] for j in kept_columns]
+
+
+def _replace_values(values, update, what):
+    if update is None:
+        return values
+    if isinstance(update, dict):
+        values = values.copy()
+        for i, value in update.items():
+            values[_check_index(i, len(values), what)] = float(value)
+        return values
+    update = np.asarray(update, dtype=np.float64)
+    if update.shape != values.shape:
+        raise ValueError(f"Неверное количество значений: ожидалось {len(values)}, получено {len(update)}")
+    return update
+
+
+def with_parameters(problem, rhs=None, objective=None):
+    """
+    Задача с той же матрицей ограничений, но другими правыми частями и/или
+    коэффициентами целевой функции. Массивы матрицы не копируются.
+    rhs и objective задаются полным списком значений или словарем {индекс: значение}.
+    """
+    return SparseProblem(
+        objective=_replace_values(problem.objective, objective, 'переменной'),
+        sense=problem.sense,
+        domains=problem.domains,
+        indptr=problem.indptr,
+        indices=problem.indices,
+        data=problem.data,
+        row_senses=problem.row_senses,
+        rhs=_replace_values(problem.rhs, rhs, 'ограничения'),
+        lb=problem.lb,
+        ub=problem.ub,
+        objective_offset=problem.objective_offset,
+    )
+
+
+def pack_problem(problem):
+    """
+    Компактное бинарное представление задачи для хранения в БД: массивы CSR,
+    коэффициенты и границы в сжатом архиве NumPy, области определения и знаки
+    ограничений - номерами в DOMAINS и SENSES.
+    """
+    output = BytesIO()
+    np.savez_compressed(
+        output,
+        sense=np.array([problem.sense == 'maximize'], dtype=np.uint8),
+        objective=problem.objective,
+        objective_offset=np.array([problem.objective_offset]),
+        domains=np.array([DOMAINS.index(domain) for domain in problem.domains], dtype=np.uint8),
+        indptr=problem.indptr,
+        indices=problem.indices,
+        data=problem.data,
+        row_senses=np.array([SENSES.index(sense) for sense in problem.row_senses], dtype=np.uint8),
+        rhs=problem.rhs,
+        lb=problem.lb,
+        ub=problem.ub,
+    )
+    return output.getvalue()
+
+
+def unpack_problem(blob):
+    """Восстанавливает SparseProblem из результата pack_problem."""
+    with np.load(BytesIO(blob), allow_pickle=False) as arrays:
+        return SparseProblem(
+            objective=arrays['objective'],
+            sense='maximize' if arrays['sense'][0] else 'minimize',
+            domains=[DOMAINS[k] for k in arrays['domains'].tolist()],
+            indptr=arrays['indptr'],
+            indices=arrays['indices'],
+            data=arrays['data'],
+            row_senses=[SENSES[k] for k in arrays['row_senses'].tolist()],
+            rhs=arrays['rhs'],
+            lb=arrays['lb'],
+            ub=arrays['ub'],
+            # В задачах, сохраненных до появления постоянного слагаемого, его нет
+            objective_offset=arrays['objective_offset'][0] if 'objective_offset' in arrays.files else 0.0,
+        )
@@ -0,0 +1,170 @@
+import os
+import re
+import time
+
+# Минимальный интервал между событиями о ходе решения в секундах
+PROGRESS_INTERVAL = float(os.getenv("SOLVER_PROGRESS_INTERVAL", 1))
+
+# GLPK: "+   154: mip =   2.100000000e+01 <=   2.300000000e+01   8.7% (12; 0)"
+GLPK_MIP_LINE = re.compile(
+    r'^[+*]?\s*\d+:\s+mip\s+=\s+(not found yet|\S+)\s+[<>]=\s+(\S+)(?:\s+([\d.]+)%)?\s+\((\d+);\s+(\d+)\)'
+)
+# CBC: "Cbc0010I After 100 nodes, 36 on tree, -23 best solution, best possible -25.5 (1.23 seconds)"
+CBC_NODES_LINE = re.compile(
+    r'^Cbc0010I After (\d+) nodes, \d+ on tree, (\S+) best solution, best possible (\S+)'
+)
+# CBC: "Cbc0012I Integer solution of -23 found by DiveCoefficient after 38 iterations and 0 nodes (0.06 seconds)"
+CBC_SOLUTION_LINE = re.compile(
+    r'^Cbc00(?:04|12)I Integer solution of (\S+) found.* and (\d+) nodes'
+)
+# CBC выводит 1e+50 вместо значения, если решение еще не найдено
+CBC_NO_VALUE = 1e49
+
+
+def _float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _gap(incumbent, bound):
+    if incumbent is None or bound is None:
+        return None
+    return abs(incumbent - bound) / max(abs(incumbent), 1e-10) * 100
+
+
+class SolverLogParser:
+    """
+    Разбирает вывод решателя (GLPK, CBC, SCIP) построчно и возвращает
+    текущее состояние решения: лучшее найденное значение целевой функции,
+    лучшую границу, относительный разрыв в процентах и число узлов.
+    """
+
+    def __init__(self, solver, sense):
+        self.solver = solver
+        # CBC решает задачу максимизации как минимизацию и выводит значения с обратным знаком
+        self.sign = -1 if solver == 'cbc' and sense == 'maximize' else 1
+        self.state = {'incumbent': None, 'bound': None, 'gap': None, 'nodes': None}
+        self._scip_columns = None
+
+    def feed(self, line):
+        """Обрабатывает строку вывода. Возвращает True, если состояние изменилось."""
+        if self.solver == 'glpk':
+            return self._feed_glpk(line)
+        if self.solver == 'cbc':
+            return self._feed_cbc(line)
+        if self.solver == 'scip':
+            return self._feed_scip(line)
+        return False
+
+    def _update(self, **values):
+        changed = False
+        for key, value in values.items():
+            if value is not None and self.state[key] != value:
+                self.state[key] = value
+                changed = True
+        if changed and values.get('gap') is None:
+            self.state['gap'] = _gap(self.state['incumbent'], self.state['bound'])
+        return changed
+
+    def _feed_glpk(self, line):
+        match = GLPK_MIP_LINE.match(line)
+        if not match:
+            return False
+        incumbent, bound, gap, active, completed = match.groups()
+        return self._update(
+            incumbent=_float(incumbent),
+            bound=_float(bound),
+            gap=_float(gap) if gap else None,
+            nodes=int(active) + int(completed),
+        )
+
+    def _cbc_value(self, text):
+        value = _float(text)
+        if value is None or abs(value) >= CBC_NO_VALUE:
+            return None
+        return self.sign * value
+
+    def _feed_cbc(self, line):
+        match = CBC_NODES_LINE.match(line)
+        if match:
+            nodes, incumbent, bound = match.groups()
+            return self._update(incumbent=self._cbc_value(incumbent), bound=self._cbc_value(bound), nodes=int(nodes))
+        match = CBC_SOLUTION_LINE.match(line)
+        if match:
+            incumbent, nodes = match.groups()
+            return self._update(incumbent=self._cbc_value(incumbent), nodes=int(nodes))
+        return False
+
+    def _feed_scip(self, line):
+        # Таблица хода решения SCIP: столбцы определяются по строке заголовка
+        if '|' not in line:
+            return False
+        cells = [cell.strip() for cell in line.split('|')]
+        if 'dualbound' in cells and 'primalbound' in cells:
+            self._scip_columns = {name: k for k, name in enumerate(cells)}
+            return False
+        columns = self._scip_columns
+        if not columns or len(cells) != len(columns):
+            return False
+        gap = cells[columns['gap']].rstrip('%') if 'gap' in columns else ''
+        nodes = cells[columns['node']] if 'node' in columns else ''
+        return self._update(
+            incumbent=_float(cells[columns['primalbound']]),
+            bound=_float(cells[columns['dualbound']]),
+            gap=_float(gap),
+            nodes=int(nodes) if nodes.isdigit() else None,
+        )
+
+
+class ProgressReporter:
+    """
+    Файлоподобный объект для вывода решателя: собирает строки, передает их
+    SolverLogParser и вызывает on_progress(event) не чаще PROGRESS_INTERVAL.
+    Состояние, пропущенное из-за интервала, отправляется при close() по окончании вывода.
+    """
+
+    def __init__(self, solver, sense, on_progress, interval=PROGRESS_INTERVAL):
+        self.parser = SolverLogParser(solver, sense)
+        self.on_progress = on_progress
+        self.interval = interval
+        self.start = time.monotonic()
+        self._last_sent = None
+        self._pending = False
+        self._buffer = ''
+
+    def write(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            self.feed_line(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Разбирает последнюю незавершенную строку и отправляет последнее неотправленное состояние."""
+        if self._buffer:
+            line, self._buffer = self._buffer, ''
+            self.feed_line(line)
+        if self._pending:
+            self._send(time.monotonic())
+
+    def feed_line(self, line):
+        if not self.parser.feed(line.rstrip('\r\n')):
+            return
+        now = time.monotonic()
+        if self._last_sent is not None and now - self._last_sent < self.interval:
+            self._pending = True
+            return
+        self._send(now)
+
+    def _send(self, now):
+        self._last_sent = now
+        self._pending = False
+        event = dict(self.parser.state)
+        event['type'] = 'progress'
+        event['elapsed'] = round(now - self.start, 3)
+        self.on_progress(event)
@@ -0,0 +1,271 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+
+from metrics import StageTimer, profile_to, record_stages
+
+# Запас времени сверх лимита решателя, после которого рабочий процесс принудительно завершается
+KILL_GRACE_SECONDS = 10
+# Период проверки отмены и лимита времени во время решения
+POLL_INTERVAL = 0.5
+# Имя рабочих процессов планировщика (см. in_solver_process)
+SOLVER_PROCESS_NAME = 'solver-worker'
+
+
+class QueueFullError(Exception):
+    """Очередь задач заполнена, новая задача не может быть принята."""
+
+
+def _worker_main(conn):
+    """
+    Основной цикл рабочего процесса: получает задание (функцию и аргументы),
+    выполняет его и отправляет результат обратно диспетчеру вместе с
+    длительностями этапов решения (metrics.stage).
+    """
+    # Отдельная группа процессов, чтобы при отмене завершить и процессы решателей
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        fn, args, with_progress, profile_path = message
+        # События о ходе решения передаются диспетчеру до результата
+        kwargs = {'on_progress': lambda event: conn.send(('progress', event, None))} if with_progress else {}
+        timer = StageTimer()
+        try:
+            with record_stages(timer), profile_to(profile_path):
+                result = fn(*args, **kwargs)
+            conn.send(('ok', result, timer.stages))
+        except Exception as ex:
+            conn.send(('error', f"{ex}\n{traceback.format_exc()}", timer.stages))
+
+
+def in_solver_process():
+    """
+    True в рабочем процессе планировщика. Процесс, запущенный методом spawn, получает имя
+    до того, как заново выполнит главный модуль родителя (python app.py, python -m worker),
+    поэтому модули могут по имени пропустить инициализацию, которая нужна только приложению.
+    """
+    return multiprocessing.current_process().name == SOLVER_PROCESS_NAME
+
+
+def _kill(process):
+    """Завершает рабочий процесс вместе со всеми запущенными им процессами."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        process.kill()
+    process.join()
+
+
+class _Job:
+    def __init__(self, task_id, fn, args, priority, seq, on_done, on_progress, time_limit, profile_path):
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.seq = seq
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.time_limit = time_limit
+        self.profile_path = profile_path
+        self.canceled = False
+        self.submitted = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class SolverScheduler:
+    """
+    Планировщик решения задач: фиксированное число долгоживущих рабочих
+    процессов и ограниченная очередь с приоритетом. Задачи с меньшим
+    приоритетом (оценкой размера) решаются раньше, при одинаковом
+    приоритете - в порядке поступления.
+
+    Каждый рабочий процесс обслуживается своим потоком-диспетчером, который
+    берет задание из очереди, передает его процессу и вызывает on_done(result, error, stages).
+    При отмене задания или превышении лимита времени диспетчер завершает
+    рабочий процесс вместе с решателем и запускает новый.
+    """
+
+    def __init__(self, num_workers, max_queue):
+        self.num_workers = num_workers
+        self.max_queue = max_queue
+        self._queue = []
+        self._running = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._context = multiprocessing.get_context('spawn')
+        self._started = False
+        self._stopped = False
+
+    def _start(self):
+        # Процессы запускаются при первой задаче, а не при импорте модуля
+        self._started = True
+        for _ in range(self.num_workers):
+            threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def _spawn_worker(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn,), daemon=True, name=SOLVER_PROCESS_NAME)
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def submit(self, task_id, fn, args, priority=0, on_done=None, on_progress=None, time_limit=None, profile_path=None):
+        """
+        Ставит задание в очередь и возвращает его позицию (с единицы).
+        Если очередь заполнена, выбрасывает QueueFullError.
+        Если задан on_progress, fn вызывается с аргументом on_progress, а события,
+        которые она передает, доставляются в on_progress(event) в процессе веб-приложения.
+        time_limit - лимит времени решения в секундах, по истечении которого
+        (с запасом KILL_GRACE_SECONDS) рабочий процесс завершается принудительно.
+        on_done(result, error, stages) получает длительности этапов: ожидание в очереди
+        (queue) и этапы, замеренные в рабочем процессе.
+        profile_path - файл, в который сохраняется профиль cProfile выполнения задания.
+        """
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError("Очередь задач заполнена, попробуйте позже")
+            if not self._started:
+                self._start()
+            job = _Job(task_id, fn, args, priority, next(self._seq), on_done, on_progress, time_limit, profile_path)
+            heapq.heappush(self._queue, job)
+            self._cond.notify()
+            return self._position(job)
+
+    def _position(self, job):
+        return sum(1 for other in self._queue if other < job) + 1
+
+    def position(self, task_id):
+        """
+        Позиция задачи в очереди (с единицы), 0 - если задача уже решается,
+        None - если планировщик о ней не знает.
+        """
+        with self._cond:
+            if task_id in self._running:
+                return 0
+            for job in self._queue:
+                if job.task_id == task_id:
+                    return self._position(job)
+        return None
+
+    def cancel(self, task_id):
+        """
+        Отменяет задачу: убирает ее из очереди или, если она уже решается,
+        завершает рабочий процесс вместе с решателем. В обоих случаях вызывается
+        on_done с ошибкой отмены, чтобы вызывающий код освободил связанные с задачей ресурсы.
+        Возвращает True, если задача была найдена.
+        """
+        with self._cond:
+            if task_id in self._running:
+                self._running[task_id].canceled = True
+                return True
+            for job in self._queue:
+                if job.task_id == task_id:
+                    self._queue.remove(job)
+                    heapq.heapify(self._queue)
+                    break
+            else:
+                return False
+        self._finish(job, None, "Задача отменена", {'queue': round(time.monotonic() - job.submitted, 6)})
+        return True
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    @property
+    def active_count(self):
+        return len(self._running)
+
+    def _dispatch(self):
+        process, conn = self._spawn_worker()
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    break
+                job = heapq.heappop(self._queue)
+                self._running[job.task_id] = job
+
+            result, error = None, None
+            stages = {'queue': round(time.monotonic() - job.submitted, 6)}
+            try:
+                if not process.is_alive():
+                    process, conn = self._spawn_worker()
+                conn.send((job.fn, job.args, job.on_progress is not None, job.profile_path))
+                deadline = time.monotonic() + job.time_limit + KILL_GRACE_SECONDS if job.time_limit else None
+                while True:
+                    if conn.poll(POLL_INTERVAL):
+                        status, payload, worker_stages = conn.recv()
+                        if status == 'ok':
+                            result = payload
+                            stages.update(worker_stages)
+                            break
+                        if status == 'error':
+                            error = payload
+                            stages.update(worker_stages)
+                            break
+                        self._notify_progress(job, payload)
+                    if job.canceled:
+                        error = "Задача отменена"
+                    elif deadline and time.monotonic() > deadline:
+                        # Решатель не уложился в свой лимит времени
+                        result = {
+                            'termination_condition': 'maxTimeLimit',
+                            'message': "Достигнут лимит времени, допустимое решение не найдено.",
+                        }
+                    else:
+                        continue
+                    _kill(process)
+                    process, conn = self._spawn_worker()
+                    break
+            except (EOFError, OSError) as ex:
+                # Рабочий процесс завершился аварийно, следующая задача получит новый
+                error = f"Рабочий процесс завершился: {ex}"
+                process, conn = self._spawn_worker()
+            finally:
+                with self._cond:
+                    self._running.pop(job.task_id, None)
+
+            self._finish(job, result, error, stages)
+
+        conn.send(None)
+        process.join()
+
+    def _finish(self, job, result, error, stages):
+        if job.on_done:
+            try:
+                job.on_done(result, error, stages)
+            except Exception:
+                traceback.print_exc()
+
+    def _notify_progress(self, job, event):
+        try:
+            job.on_progress(event)
+        except Exception:
+            traceback.print_exc()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
+def create_scheduler():
+    """Создает планировщик с настройками из переменных окружения."""
+    num_workers = int(os.getenv("SOLVER_WORKERS", os.cpu_count() or 1))
+    max_queue = int(os.getenv("SOLVER_QUEUE_SIZE", 100))
+    return SolverScheduler(num_workers, max_queue)
@@ -0,0 +1,308 @@
+"""
+Решение и анализ чувствительности в виде числовых массивов: значения переменных,
+левые части и запасы ограничений, двойственные оценки, приведенные стоимости
+и диапазоны устойчивости базиса (ranging) для правых частей ограничений
+и коэффициентов целевой функции. Все величины считаются векторно по SparseProblem,
+без вычисления выражений модели по одному ограничению.
+"""
+import os
+
+import numpy as np
+from problem import INTEGER_DOMAINS, row_activity
+
+# Допуск ведущих элементов при ранжировании
+TOLERANCE = 1e-9
+# Допуск нахождения переменной на границе и знака приведенной стоимости
+FEASIBILITY_TOLERANCE = 1e-6
+# Диапазоны считаются по плотной матрице ограничений и обратной матрице базиса:
+# если ограничений * (переменных + ограничений) больше этого значения, диапазоны не считаются
+RANGING_MAX_SIZE = int(os.getenv("RANGING_MAX_SIZE", 5_000_000))
+CONSTRAINT_NAME = "Ограничение "
+
+
+def json_array(values):
+    """Массив для JSON: бесконечности и NaN (нет значения) записываются как null, -0.0 - как 0.0."""
+    values = np.asarray(values, dtype=np.float64) + 0.0
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def from_json_array(values):
+    """Массив из JSON: null становится NaN."""
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def row_bounds(problem):
+    """Нижние и верхние границы левых частей ограничений."""
+    senses = np.array(problem.row_senses, dtype=object)
+    lower = np.where((senses == '>=') | (senses == '='), problem.rhs, -np.inf)
+    upper = np.where((senses == '<=') | (senses == '='), problem.rhs, np.inf)
+    return lower, upper
+
+
+def reduced_costs(problem, duals):
+    """Приведенные стоимости переменных c - A^T y по двойственным оценкам ограничений."""
+    entry_rows = np.repeat(np.arange(problem.num_constraints), np.diff(problem.indptr))
+    return problem.objective - np.bincount(problem.indices, weights=problem.data * duals[entry_rows], minlength=problem.num_variables)
+
+
+def solution_arrays(problem, values, duals=None, costs=None, ranges=False):
+    """
+    Поля решения по значениям переменных, двойственным оценкам ограничений (если есть)
+    и приведенным стоимостям (если решатель их не вернул, они считаются по двойственным
+    оценкам). При ranges=True добавляются диапазоны (см. ranging).
+    Возвращает {'variable_values': [...], 'sensitivity': {'constraints': {...}, 'variables': {...}}}.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    activity = row_activity(problem, np.nan_to_num(values))
+    lower, upper = row_bounds(problem)
+    constraints = {'activity': activity, 'lslack': activity - lower, 'uslack': upper - activity}
+    variables = {}
+    if duals is not None:
+        constraints['dual'] = duals
+        if costs is None:
+            costs = reduced_costs(problem, np.nan_to_num(duals))
+    if costs is not None:
+        variables['reduced_cost'] = costs
+    if ranges:
+        bounds = ranging(problem, values, duals)
+        if bounds is not None:
+            constraints['rhs_lower'], constraints['rhs_upper'], variables['cost_lower'], variables['cost_upper'] = bounds
+    return {
+        'variable_values': json_array(values),
+        'sensitivity': {
+            'constraints': {name: json_array(array) for name, array in constraints.items()},
+            'variables': {name: json_array(array) for name, array in variables.items()},
+        },
+    }
+
+
+def _basis(columns, z, lower, upper, tolerance, priority):
+    """
+    Индексы базисных столбцов для вершины z: все столбцы строго между границами
+    (дальше tolerance) и, если их меньше числа строк (вырожденное решение), столбцы
+    на границах в порядке priority, линейно независимые с уже выбранными.
+    None, если z - не вершина.
+    """
+    m = columns.shape[0]
+    at_lower = np.isfinite(lower) & (np.abs(z - lower) <= tolerance)
+    at_upper = np.isfinite(upper) & (np.abs(z - upper) <= tolerance)
+    # Свободная небазисная переменная находится в нуле
+    free_zero = ~np.isfinite(lower) & ~np.isfinite(upper) & (np.abs(z) <= tolerance)
+    basis = np.flatnonzero(~at_lower & ~at_upper & ~free_zero).tolist()
+    if len(basis) > m:
+        return None
+    # Ортонормированный базис линейной оболочки выбранных столбцов (строки q): столбцы
+    # строго между границами должны быть линейно независимы, что проверяется одним QR
+    q = np.zeros((m, m))
+    rank = len(basis)
+    if rank:
+        orthonormal, triangular = np.linalg.qr(columns[:, basis])
+        if (np.abs(np.diag(triangular)) <= TOLERANCE ** 0.5 * (1 + np.linalg.norm(columns[:, basis], axis=0))).any():
+            return None
+        q[:rank] = orthonormal.T
+    chosen = set(basis)
+    for j in priority:
+        if rank == m:
+            break
+        if j not in chosen and _extend(q, rank, columns[:, j]):
+            basis.append(j)
+            rank += 1
+    return basis if rank == m else None
+
+
+def _extend(q, rank, column):
+    """
+    Записывает в строку rank матрицы q нормированную часть column, ортогональную
+    первым rank строкам q (Грам - Шмидт). False, если column линейно зависим от них.
+    """
+    basis = q[:rank]
+    residual = column - basis.T @ (basis @ column)
+    residual -= basis.T @ (basis @ residual)
+    norm = np.linalg.norm(residual)
+    if norm <= TOLERANCE ** 0.5 * (1 + np.linalg.norm(column)):
+        return False
+    q[rank] = residual / norm
+    return True
+
+
+def _ratio_bounds(numerators, pivots):
+    """
+    Границы шага δ, при которых numerators + δ * pivots остаются в допустимых
+    пределах, заданных по столбцам: (минимум положительных отношений, максимум отрицательных).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = numerators / pivots
+    up = np.where(pivots > TOLERANCE, ratios, np.inf).min(axis=-1, initial=np.inf)
+    down = np.where(pivots < -TOLERANCE, ratios, -np.inf).max(axis=-1, initial=-np.inf)
+    return np.maximum(up, 0.0), np.minimum(down, 0.0)
+
+
+def ranging(problem, values, duals=None):
+    """
+    Диапазоны устойчивости оптимального базиса ЛП: в каких пределах может меняться
+    правая часть каждого ограничения, чтобы базис оставался допустимым (двойственные
+    оценки не меняются), и коэффициент целевой функции каждой переменной, чтобы базис
+    оставался оптимальным (решение не меняется).
+
+    Решатели не возвращают базис в файле решения, поэтому он восстанавливается по
+    значениям переменных: ограничения записываются как A x + s = b с переменными запаса s,
+    базисными считаются переменные строго между границами, а при вырожденности базис
+    дополняется переменными на границах (сначала с наименьшими по модулю приведенными
+    стоимостями по двойственным оценкам решателя duals, если они есть). Диапазоны считаются только если полученный
+    базис подтверждает оптимальность решения (знаки приведенных стоимостей).
+
+    Возвращает (rhs_lower, rhs_upper, cost_lower, cost_upper) или None: для задач
+    с целочисленными переменными, слишком больших задач (RANGING_MAX_SIZE) и решений,
+    по которым не удалось восстановить оптимальный базис. Бесконечная граница - без ограничения.
+    """
+    m, n = problem.num_constraints, problem.num_variables
+    if m == 0 or m * (n + m) > RANGING_MAX_SIZE or np.isnan(values).any():
+        return None
+    if any(domain in INTEGER_DOMAINS for domain in problem.domains):
+        return None
+
+    entry_rows = np.repeat(np.arange(m), np.diff(problem.indptr))
+    columns = np.zeros((m, n + m))
+    np.add.at(columns, (entry_rows, problem.indices), problem.data)
+    columns[:, n:] = np.eye(m)
+    row_lower, row_upper = row_bounds(problem)
+    # Запас s = b - A x: для <= s >= 0, для >= s <= 0, для = s = 0
+    slack = problem.rhs - columns[:, :n] @ values
+    z = np.concatenate([values, slack])
+    lower = np.concatenate([problem.lb, np.where(np.isfinite(row_upper), 0.0, -np.inf)])
+    upper = np.concatenate([problem.ub, np.where(np.isfinite(row_lower), 0.0, np.inf)])
+    # Задача приводится к минимизации
+    direction = 1.0 if problem.sense == 'minimize' else -1.0
+    cost = np.concatenate([direction * problem.objective, np.zeros(m)])
+    # Решатели записывают значения с ограниченной точностью, поэтому допуск запаса
+    # ограничения растет с величиной слагаемых его левой части
+    tolerance = FEASIBILITY_TOLERANCE * (1 + np.concatenate([np.abs(values), np.abs(columns[:, :n]) @ np.abs(values) + np.abs(problem.rhs)]))
+
+    # Вырожденный базис дополняется переменными, которые могут быть базисными в оптимуме:
+    # с нулевой приведенной стоимостью, без оценок решателя - сначала запасами
+    if duals is not None and not np.isnan(duals).any():
+        priority = np.argsort(np.abs(np.concatenate([reduced_costs(problem, duals), duals])), kind='stable').tolist()
+    else:
+        priority = sorted(range(n + m), key=lambda j: (j < n, abs(cost[j]) > TOLERANCE))
+    basis = _basis(columns, z, lower, upper, tolerance, priority)
+    if basis is None:
+        return None
+    try:
+        basis_inverse = np.linalg.inv(columns[:, basis])
+    except np.linalg.LinAlgError:
+        return None
+
+    costs = cost - columns.T @ (basis_inverse.T @ cost[basis])
+    nonbasic = np.setdiff1d(np.arange(n + m), basis)
+    fixed = lower[nonbasic] == upper[nonbasic]
+    at_upper = np.isfinite(upper[nonbasic]) & (np.abs(z[nonbasic] - upper[nonbasic]) <= tolerance[nonbasic])
+    at_lower = np.isfinite(lower[nonbasic]) & ~at_upper
+    free = ~fixed & ~at_lower & ~at_upper
+    # Знак условия оптимальности: на нижней границе d >= 0, на верхней d <= 0
+    sign = np.where(at_upper, -1.0, 1.0)
+    scale = FEASIBILITY_TOLERANCE * (1 + np.abs(cost).max())
+    d = costs[nonbasic]
+    if (sign * d < -scale)[~fixed & ~free].any() or (np.abs(d[free]) > scale).any():
+        return None
+
+    # Правые части: при b_i + δ базисные переменные меняются на δ * B^-1 e_i.
+    # Базисные значения пересчитываются по небазисным, стоящим точно на границах
+    z_nonbasic = np.where(fixed | at_lower, lower[nonbasic], np.where(at_upper, upper[nonbasic], 0.0))
+    x_basis = basis_inverse @ (problem.rhs - columns[:, nonbasic] @ z_nonbasic)
+    lower_basis, upper_basis = lower[basis], upper[basis]
+    to_upper = (upper_basis - x_basis)[:, None]
+    to_lower = (lower_basis - x_basis)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        up = np.where(basis_inverse > TOLERANCE, to_upper / basis_inverse, np.where(basis_inverse < -TOLERANCE, to_lower / basis_inverse, np.inf))
+        down = np.where(basis_inverse > TOLERANCE, to_lower / basis_inverse, np.where(basis_inverse < -TOLERANCE, to_upper / basis_inverse, -np.inf))
+    rhs_upper = problem.rhs + np.maximum(up.min(axis=0), 0.0)
+    rhs_lower = problem.rhs + np.minimum(down.max(axis=0), 0.0)
+
+    # Коэффициенты целевой функции небазисных переменных: пока d сохраняет знак
+    cost_lower = np.full(n + m, -np.inf)
+    cost_upper = np.full(n + m, np.inf)
+    bound = cost[nonbasic] - d
+    cost_lower[nonbasic] = np.where(fixed | at_upper, -np.inf, bound)
+    cost_upper[nonbasic] = np.where(fixed | at_lower, np.inf, bound)
+    # Базисных: при c_k + δ приведенные стоимости меняются на -δ * (B^-1 A_N)[k]
+    active = ~fixed
+    tableau = basis_inverse @ columns[:, nonbasic[active]]
+    signed_costs = (sign * d)[active]
+    signed_tableau = tableau * sign[active]
+    step_up, step_down = _ratio_bounds(signed_costs, signed_tableau)
+    if free.any():
+        # Свободная небазисная переменная допускает только нулевое изменение вдоль ее столбца
+        blocked = (np.abs(tableau[:, free[active]]) > TOLERANCE).any(axis=1)
+        step_up[blocked] = 0.0
+        step_down[blocked] = 0.0
+    cost_lower[basis] = cost[basis] + step_down
+    cost_upper[basis] = cost[basis] + step_up
+
+    cost_lower, cost_upper = cost_lower[:n], cost_upper[:n]
+    if direction < 0:
+        cost_lower, cost_upper = -cost_upper, -cost_lower
+    return rhs_lower, rhs_upper, cost_lower, cost_upper
+
+
+def compact_solution(solution):
+    """
+    Решение в формате массивов. Решения, сохраненные до перехода на массивы
+    ({индекс: значение} и список строк анализа чувствительности со строками чисел),
+    переводятся в новый формат.
+    """
+    if not solution:
+        return solution
+    values = solution.get('variable_values')
+    sensitivity = solution.get('sensitivity')
+    if not isinstance(values, dict) and not isinstance(sensitivity, list):
+        return solution
+    solution = dict(solution)
+    if isinstance(values, dict):
+        order = sorted(values, key=int)
+        solution['variable_values'] = [values[j] for j in order]
+    if isinstance(sensitivity, list):
+        rows = sorted(sensitivity, key=lambda row: int(row['name'][len(CONSTRAINT_NAME):]))
+        constraints = {}
+        for field, legacy in (('activity', 'value'), ('lslack', 'lslack'), ('uslack', 'uslack'), ('dual', 'dual')):
+            if rows and all(legacy in row for row in rows):
+                constraints[field] = json_array([float(row[legacy]) for row in rows])
+        solution['sensitivity'] = {'constraints': constraints, 'variables': {}} if constraints else None
+    return solution
+
+
+def solution_page(solution, part='variables', offset=0, limit=None, top=None, by=None):
+    """
+    Часть решения для интерфейса: переменные (part="variables") или ограничения
+    (part="constraints") с offset по limit штук, либо top штук с наибольшим модулем поля by.
+    Возвращает {'part', 'total', 'indices', поле: [...]}.
+    """
+    solution = compact_solution(solution)
+    sensitivity = solution.get('sensitivity') or {}
+    if part == 'variables':
+        fields = dict(sensitivity.get('variables') or {})
+        if solution.get('variable_values') is not None:
+            fields = dict(value=solution['variable_values'], **fields)
+        default_by = 'value'
+    elif part == 'constraints':
+        fields = dict(sensitivity.get('constraints') or {})
+        default_by = 'dual' if 'dual' in fields else 'activity'
+    else:
+        raise ValueError(f"Неизвестная часть решения: {part}")
+    total = max((len(values) for values in fields.values()), default=0)
+
+    if top is not None:
+        by = by or default_by
+        if by not in fields:
+            raise ValueError(f"Нет поля {by} для части решения {part}")
+        magnitude = np.abs(from_json_array(fields[by]))
+        # Значения null (нет значения или бесконечность) идут после остальных
+        magnitude = np.where(np.isnan(magnitude), -1.0, magnitude)
+        indices = np.argsort(-magnitude, kind='stable')[:top]
+    else:
+        end = total if limit is None else min(total, offset + limit)
+        indices = np.arange(offset, end)
+    indices = indices.tolist()
+    page = {'part': part, 'total': total, 'indices': indices}
+    for name, values in fields.items():
+        page[name] = [values[k] for k in indices]
+    return page
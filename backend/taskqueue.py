@@ -0,0 +1,196 @@
+import os
+from datetime import timedelta
+
+from metrics import utcnow
+from scheduler import QueueFullError
+from sqlalchemy import func, or_, select, update
+
+# Статусы задачи в очереди БД
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+# Канал шины событий, в который публикуется событие о новой задаче в очереди
+QUEUE_CHANNEL = 'task_queue'
+
+
+class DatabaseTaskQueue:
+    """
+    Очередь задач в таблице tasks для отдельных рабочих узлов (python -m worker).
+    Веб-приложение только ставит задачу в очередь (status = queued), рабочие узлы
+    забирают задачи запросом SELECT ... FOR UPDATE SKIP LOCKED, поэтому два узла
+    не получат одну задачу. Пока задача решается, узел обновляет heartbeat_time;
+    задачи узлов, переставших обновлять heartbeat_time, возвращаются в очередь.
+    Задачи упорядочены так же, как в SolverScheduler: сначала меньшие по priority,
+    при равном приоритете - в порядке поступления.
+    """
+
+    def __init__(self, session_factory, model, max_queue):
+        self.session_factory = session_factory
+        self.model = model
+        self.max_queue = max_queue
+
+    def enqueue(self, task_id, priority=0, **values):
+        """
+        Ставит записанную в БД задачу в очередь и возвращает ее позицию (с единицы).
+        values - столбцы задачи, которые обновляются вместе с постановкой в очередь.
+        Если очередь заполнена, выбрасывает QueueFullError.
+        """
+        Task = self.model
+        with self.session_factory() as db:
+            if self._count(db, QUEUED) >= self.max_queue:
+                raise QueueFullError("Очередь задач заполнена, попробуйте позже")
+            db.execute(
+                update(Task)
+                .where(Task.task_id == task_id)
+                .values(status=QUEUED, priority=priority, worker_id=None, attempts=0, **values)
+            )
+            db.commit()
+            return self._position(db, task_id)
+
+    def position(self, task_id):
+        """Позиция задачи в очереди (с единицы), 0 - если задача решается, None - если ее нет в очереди."""
+        with self.session_factory() as db:
+            return self._position(db, task_id)
+
+    def _position(self, db, task_id):
+        Task = self.model
+        task = db.execute(select(Task.id, Task.status, Task.priority).where(Task.task_id == task_id)).first()
+        if task is None or task.status not in (QUEUED, RUNNING):
+            return None
+        if task.status == RUNNING:
+            return 0
+        ahead = db.scalar(
+            select(func.count()).select_from(Task).where(
+                Task.status == QUEUED,
+                Task.canceled.isnot(True),
+                or_(Task.priority < task.priority, (Task.priority == task.priority) & (Task.id < task.id)),
+            )
+        )
+        return ahead + 1
+
+    def _count(self, db, status):
+        Task = self.model
+        return db.scalar(select(func.count()).select_from(Task).where(Task.status == status, Task.canceled.isnot(True)))
+
+    @property
+    def queue_depth(self):
+        with self.session_factory() as db:
+            return self._count(db, QUEUED)
+
+    @property
+    def active_count(self):
+        with self.session_factory() as db:
+            return self._count(db, RUNNING)
+
+    def claim(self, worker_id, limit):
+        """
+        Забирает до limit задач из очереди для рабочего узла worker_id.
+        Строки, заблокированные другим узлом, пропускаются (SKIP LOCKED).
+        Возвращает список task_id.
+        """
+        Task = self.model
+        if limit <= 0:
+            return []
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(Task.id)
+                .where(Task.status == QUEUED, Task.canceled.isnot(True))
+                .order_by(Task.priority, Task.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not rows:
+                db.commit()
+                return []
+            # Условие на статус защищает от двойного захвата в БД без блокировок строк (SQLite)
+            now = utcnow()
+            db.execute(
+                update(Task)
+                .where(Task.id.in_(rows), Task.status == QUEUED)
+                .values(status=RUNNING, worker_id=worker_id, claim_time=now, heartbeat_time=now, attempts=Task.attempts + 1)
+            )
+            task_ids = db.execute(
+                select(Task.task_id)
+                .where(Task.id.in_(rows), Task.worker_id == worker_id, Task.status == RUNNING)
+                .order_by(Task.priority, Task.id)
+            ).scalars().all()
+            db.commit()
+            return task_ids
+
+    def heartbeat(self, worker_id, task_ids):
+        """
+        Обновляет heartbeat_time задач, которые решает узел worker_id.
+        Возвращает task_id задач, которые узлу нужно остановить: отмененных пользователем
+        и уже не закрепленных за ним (возвращены в очередь и забраны другим узлом).
+        """
+        Task = self.model
+        if not task_ids:
+            return []
+        with self.session_factory() as db:
+            db.execute(
+                update(Task)
+                .where(Task.task_id.in_(task_ids), Task.worker_id == worker_id, Task.status == RUNNING)
+                .values(heartbeat_time=utcnow())
+            )
+            owned = db.execute(
+                select(Task.task_id, Task.canceled)
+                .where(Task.task_id.in_(task_ids), Task.worker_id == worker_id, Task.status == RUNNING)
+            ).all()
+            db.commit()
+        active = {row.task_id for row in owned if not row.canceled}
+        return [task_id for task_id in task_ids if task_id not in active]
+
+    def requeue_stale(self, timeout, max_attempts):
+        """
+        Возвращает в очередь задачи, heartbeat_time которых старше timeout секунд
+        (рабочий узел завершился аварийно или потерял связь с БД). Задачи, которые
+        уже max_attempts раз забирались на решение, в очередь не возвращаются,
+        отмененные пользователем задачи просто завершаются.
+        Возвращает пару списков task_id: возвращенные в очередь и исчерпавшие попытки.
+        """
+        Task = self.model
+        deadline = utcnow() - timedelta(seconds=timeout)
+        with self.session_factory() as db:
+            stale = db.execute(
+                select(Task.id, Task.task_id, Task.attempts, Task.canceled)
+                .where(Task.status == RUNNING, Task.heartbeat_time < deadline)
+                .with_for_update(skip_locked=True)
+            ).all()
+            canceled = [row for row in stale if row.canceled]
+            requeued = [row for row in stale if not row.canceled and (row.attempts or 0) < max_attempts]
+            failed = [row for row in stale if not row.canceled and (row.attempts or 0) >= max_attempts]
+            for rows, status in ((canceled, DONE), (requeued, QUEUED)):
+                if rows:
+                    db.execute(
+                        update(Task)
+                        .where(Task.id.in_([row.id for row in rows]))
+                        .values(status=status, worker_id=None)
+                    )
+            db.commit()
+        return [row.task_id for row in requeued], [row.task_id for row in failed]
+
+    def release(self, worker_id):
+        """Возвращает в очередь все задачи узла worker_id (при штатной остановке узла)."""
+        Task = self.model
+        with self.session_factory() as db:
+            task_ids = db.execute(
+                select(Task.task_id).where(Task.worker_id == worker_id, Task.status == RUNNING)
+            ).scalars().all()
+            db.execute(
+                update(Task)
+                .where(Task.worker_id == worker_id, Task.status == RUNNING)
+                .values(status=QUEUED, worker_id=None, attempts=Task.attempts - 1)
+            )
+            db.commit()
+        return task_ids
+
+
+def create_task_queue(session_factory, model):
+    """
+    Создает очередь задач в БД при TASK_QUEUE=database; иначе None, и задачи
+    решаются планировщиком внутри веб-приложения.
+    """
+    if os.getenv("TASK_QUEUE", "memory") != "database":
+        return None
+    max_queue = int(os.getenv("SOLVER_QUEUE_SIZE", 100))
+    return DatabaseTaskQueue(session_factory, model, max_queue)
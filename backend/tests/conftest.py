@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули бэкенда импортируются без пакета, как при запуске из директории backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
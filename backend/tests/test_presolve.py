@@ -0,0 +1,120 @@
+"""
+Решение задач с упрощением (presolve) и без него дает одинаковый результат:
+значение целевой функции, значения переменных и двойственные оценки.
+В задачах есть пустое, повторяющееся (пропорциональное) ограничение, ограничение
+с одной переменной и фиксированная переменная.
+"""
+import numpy as np
+import pytest
+from model import solve_problem
+from portfolio import available_solvers
+from presolve import presolve
+from problem import from_conditions
+
+SOLVERS = [solver for solver in available_solvers() if solver in ('glpk', 'cbc')]
+BACKENDS = ['pyomo', 'direct']
+TOLERANCE = 1e-6
+
+pytestmark = pytest.mark.skipif(not SOLVERS, reason="не найден решатель glpk или cbc")
+
+# Ограничения: 0 - основное, 1 - повторяет 0 с множителем 2, 2 - одна переменная x0,
+# 3 - пустое, 4 - основное, 5 - фиксирует x3
+CONSTRAINTS = [
+    {"coefficients": [1, 1, 1, 0], "rhs": 10, "sense": "<="},
+    {"coefficients": [2, 2, 2, 0], "rhs": 20, "sense": "<="},
+    {"coefficients": [1, 0, 0, 0], "rhs": 4, "sense": "<="},
+    {"coefficients": [0, 0, 0, 0], "rhs": 5, "sense": "<="},
+    {"coefficients": [0, 1, -1, 0], "rhs": 5, "sense": "<="},
+    {"coefficients": [0, 0, 0, 1], "rhs": 2, "sense": "="},
+]
+DUPLICATE_ROWS = (0, 1)
+
+
+def lp_conditions():
+    # Единственное оптимальное решение x = (4, 5.5, 0.5, 2), значение 24.5
+    return {
+        "objective": {"coefficients": [3, 2, 1, 0.5], "sense": "maximize"},
+        "variable_domains": ["NonNegativeReals"] * 4,
+        "constraints": CONSTRAINTS,
+    }
+
+
+def mip_conditions():
+    # Единственное оптимальное решение x = (4, 5, 1, 2), значение 24
+    constraints = [dict(constraint) for constraint in CONSTRAINTS]
+    # Граница целочисленной переменной округляется при упрощении
+    constraints[2]["rhs"] = 4.5
+    return {
+        "objective": {"coefficients": [3, 2, 1, 0.5], "sense": "maximize"},
+        "variable_domains": ["NonNegativeIntegers", "NonNegativeIntegers", "NonNegativeReals", "NonNegativeReals"],
+        "constraints": constraints,
+    }
+
+
+def solve_both(conditions, solver, backend):
+    problem = from_conditions(conditions)
+    plain = solve_problem(problem, solver, backend, presolve=False)
+    reduced = solve_problem(problem, solver, backend, presolve=True)
+    assert plain['termination_condition'] == 'optimal'
+    assert reduced['termination_condition'] == 'optimal'
+    return problem, plain, reduced
+
+
+def duals(solution):
+    return np.array(solution['sensitivity']['constraints']['dual'], dtype=np.float64)
+
+
+def test_presolve_removes_rows_and_columns():
+    result = presolve(from_conditions(lp_conditions()))
+    assert not result.infeasible
+    # Остаются ограничения 0 и 4 и переменные x0, x1, x2 (x3 фиксирована)
+    assert sorted(result.rows.tolist()) == [0, 4]
+    assert sorted(result.columns.tolist()) == [0, 1, 2]
+    assert result.fixed_values[3] == pytest.approx(2)
+    assert result.ub[0] == pytest.approx(4)
+
+
+def test_presolve_rounds_integer_bounds():
+    result = presolve(from_conditions(mip_conditions()))
+    assert result.ub[0] == pytest.approx(4)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('solver', SOLVERS)
+def test_lp_matches_without_presolve(solver, backend):
+    problem, plain, reduced = solve_both(lp_conditions(), solver, backend)
+    assert reduced['objective'] == pytest.approx(plain['objective'], abs=TOLERANCE)
+    assert reduced['objective'] == pytest.approx(24.5, abs=TOLERANCE)
+    np.testing.assert_allclose(reduced['variable_values'], plain['variable_values'], atol=TOLERANCE)
+    np.testing.assert_allclose(reduced['variable_values'], [4, 5.5, 0.5, 2], atol=TOLERANCE)
+
+    plain_duals, reduced_duals = duals(plain), duals(reduced)
+    # Оценка повторяющихся ограничений делится между ними произвольно, совпадает только сумма
+    # с учетом множителя; оценки остальных ограничений единственны
+    single = [i for i in range(problem.num_constraints) if i not in DUPLICATE_ROWS]
+    np.testing.assert_allclose(reduced_duals[single], plain_duals[single], atol=TOLERANCE)
+    combined = lambda y: y[0] + 2 * y[1]
+    assert combined(reduced_duals) == pytest.approx(combined(plain_duals), abs=TOLERANCE)
+    # Сильная двойственность: b @ y совпадает со значением целевой функции (границы переменных не достигаются)
+    for y in (plain_duals, reduced_duals):
+        assert problem.rhs @ y == pytest.approx(plain['objective'], abs=TOLERANCE)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('solver', SOLVERS)
+def test_mip_matches_without_presolve(solver, backend):
+    _, plain, reduced = solve_both(mip_conditions(), solver, backend)
+    assert reduced['objective'] == pytest.approx(plain['objective'], abs=TOLERANCE)
+    assert reduced['objective'] == pytest.approx(24, abs=TOLERANCE)
+    np.testing.assert_allclose(reduced['variable_values'], plain['variable_values'], atol=TOLERANCE)
+    np.testing.assert_allclose(reduced['variable_values'], [4, 5, 1, 2], atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('solver', SOLVERS)
+def test_infeasible_singleton_rows(solver):
+    conditions = lp_conditions()
+    conditions["constraints"] = CONSTRAINTS + [{"coefficients": [1, 0, 0, 0], "rhs": 5, "sense": ">="}]
+    problem = from_conditions(conditions)
+    assert presolve(problem).infeasible
+    assert solve_problem(problem, solver, presolve=True)['termination_condition'] == 'infeasible'
+    assert solve_problem(problem, solver, presolve=False)['termination_condition'] == 'infeasible'
@@ -0,0 +1,166 @@
+"""
+Рабочий узел очереди задач в БД: забирает задачи из таблицы tasks и решает их
+в своем пуле процессов (SolverScheduler, SOLVER_WORKERS процессов). Узлов может
+быть сколько угодно на любых серверах с доступом к одной базе данных. Веб-приложение
+при этом запускается с TASK_QUEUE=database и только ставит задачи в очередь.
+
+Запуск из директории backend:
+    TASK_QUEUE=database EVENT_BUS=postgres python -m worker
+"""
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+import app
+from cache import canonical_key, restore_solution
+from model import solve_problem
+from taskqueue import QUEUE_CHANNEL, DatabaseTaskQueue
+
+# Период обновления heartbeat_time решаемых задач в секундах
+HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", 5))
+# Задача возвращается в очередь, если heartbeat_time не обновлялся дольше этого времени
+HEARTBEAT_TIMEOUT = float(os.getenv("WORKER_HEARTBEAT_TIMEOUT", 30))
+# Сколько раз задачу можно забрать на решение, прежде чем она завершится с ошибкой
+MAX_ATTEMPTS = int(os.getenv("WORKER_MAX_ATTEMPTS", 3))
+
+
+class Worker:
+    """
+    Цикл рабочего узла: забирает из очереди столько задач, сколько свободных
+    процессов в пуле, обновляет heartbeat_time решаемых задач, останавливает
+    отмененные и возвращает в очередь задачи узлов, которые перестали отвечать.
+    """
+
+    def __init__(self, task_queue, scheduler, event_bus):
+        self.task_queue = task_queue
+        self.scheduler = scheduler
+        self.event_bus = event_bus
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        # Событие о новой задаче в очереди будит узел сразу, без него очередь опрашивается
+        # раз в HEARTBEAT_INTERVAL
+        subscription = self.event_bus.subscribe(QUEUE_CHANNEL)
+        threading.Thread(target=self._forward_wakeups, args=(subscription,), daemon=True).start()
+        print(f"Рабочий узел {self.worker_id}: {self.scheduler.num_workers} процессов")
+        next_heartbeat = 0
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self._claim()
+                    if time.monotonic() >= next_heartbeat:
+                        self._heartbeat()
+                        next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+                except Exception:
+                    # БД недоступна: решаемые задачи продолжают решаться, узел повторит попытку
+                    traceback.print_exc()
+                self._wakeup.wait(HEARTBEAT_INTERVAL)
+                self._wakeup.clear()
+        finally:
+            subscription.close()
+            released = self.task_queue.release(self.worker_id)
+            if released:
+                print(f"Задачи возвращены в очередь: {', '.join(released)}")
+            self.scheduler.shutdown()
+
+    def stop(self, *args):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _forward_wakeups(self, subscription):
+        while not self._stopped.is_set():
+            if subscription.get(timeout=HEARTBEAT_INTERVAL) is not None:
+                self._wakeup.set()
+
+    def _claim(self):
+        with self._lock:
+            free = self.scheduler.num_workers - len(self._running)
+        for task_id in self.task_queue.claim(self.worker_id, free):
+            try:
+                self._start(task_id)
+            except Exception as ex:
+                traceback.print_exc()
+                self._finish(task_id, None, f"Не удалось начать решение задачи: {ex}", {})
+
+    def _start(self, task_id):
+        task_record = app.load_task(task_id)
+        problem = app.task_problem(task_record)
+        limits = {'time_limit': task_record.time_limit, 'mip_gap': task_record.mip_gap}
+        _, row_order = canonical_key(problem, task_record.solver, task_record.mip_gap)
+        key = task_record.conditions_hash
+        # Ожидание в очереди БД: от загрузки задачи до того, как узел ее забрал
+        waited = (task_record.claim_time - task_record.upload_time).total_seconds()
+        with self._lock:
+            self._running.add(task_id)
+        self.event_bus.publish(task_id, {"type": "started"})
+
+        cached = app.find_cached_solution(key)
+        if cached is not None:
+            self._finish(task_id, restore_solution(cached, row_order), None, {'queue': waited})
+            return
+
+        warm_start = task_record.warm_start
+        if warm_start:
+            # Ключи JSON - строки, решателю нужны индексы переменных
+            warm_start = {int(j): value for j, value in warm_start.items()}
+        profile_path = app.profile_path(task_id) if task_record.profile and app.PROFILE_DIR else None
+
+        def on_done(solution, error, stages):
+            stages = dict(stages, queue=round(stages.get('queue', 0) + waited, 6))
+            self._finish(task_id, solution, error, stages, key, row_order, task_record.solver)
+
+        self.scheduler.submit(
+            task_id,
+            solve_problem,
+            (problem, task_record.solver, task_record.backend, limits['time_limit'], limits['mip_gap'], warm_start, task_record.presolve),
+            priority=problem.size_estimate,
+            on_done=on_done,
+            on_progress=lambda event: self.event_bus.publish(task_id, event),
+            time_limit=limits['time_limit'],
+            profile_path=profile_path,
+        )
+
+    def _finish(self, task_id, solution, error, stages, key=None, row_order=None, solver=None):
+        try:
+            if key is None:
+                app.process_task(task_id, solution, error, stages=stages, worker_id=self.worker_id)
+            else:
+                app.complete_task(task_id, solution, error, key, row_order, solver, stages, self.worker_id)
+        finally:
+            with self._lock:
+                self._running.discard(task_id)
+            self._wakeup.set()
+
+    def _heartbeat(self):
+        with self._lock:
+            running = list(self._running)
+        # Отмененные пользователем и переданные другому узлу задачи останавливаются
+        for task_id in self.task_queue.heartbeat(self.worker_id, running):
+            self.scheduler.cancel(task_id)
+        requeued, failed = self.task_queue.requeue_stale(HEARTBEAT_TIMEOUT, MAX_ATTEMPTS)
+        if requeued:
+            print(f"Задачи остановившихся узлов возвращены в очередь: {', '.join(requeued)}")
+            self.event_bus.publish(QUEUE_CHANNEL, {"type": "queued"})
+        for task_id in failed:
+            app.process_task(task_id, None, f"Задача не решена за {MAX_ATTEMPTS} попыток: рабочие узлы остановились")
+
+
+def main():
+    if not isinstance(app.task_queue, DatabaseTaskQueue):
+        raise SystemExit("Рабочий узел работает только с очередью задач в БД: задайте TASK_QUEUE=database")
+    worker = Worker(app.task_queue, app.scheduler, app.event_bus)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
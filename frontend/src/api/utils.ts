@@ -7,7 +7,10 @@ import {
 import { excelUploaderActions } from "@/widgets/ExcelUploader";
 import { taskCreatorActions } from "@/widgets/TaskCreator";
 import { taskSolutionActions } from "@/widgets/TaskSolution";
-import { SolutionResponse } from "@/widgets/TaskSolution/types";
+import {
+  SolutionResponse,
+  SolveProgress,
+} from "@/widgets/TaskSolution/types";
 import { BASE_URL } from "./consts";
 
 let currentSSEConnection: EventSource;
@@ -20,6 +23,7 @@ export const closeCurrentSSEConnection = () => {
 
 export const openSSEConnection = (taskId: string, dispatch: AppDispatch) => {
   currentSSEConnection = new EventSource(`${BASE_URL}/task_progress/${taskId}`);
+  dispatch(taskSolutionActions.setProgress(null));
   dispatch(taskCreatorActions.setDisableUploadButton(true));
   dispatch(excelUploaderActions.setDisableUploadButton(true));
   currentSSEConnection.onmessage = (event) => {
@@ -30,26 +34,11 @@ export const openSSEConnection = (taskId: string, dispatch: AppDispatch) => {
     try {
       // Попытка распарсить сообщение как JSON – если получится, то это финальный результат.
       const payload = JSON.parse(message) as SolutionResponse;
-      // Извлекаем решение и base64 строку Excel-файла с условиями.
+      // Извлекаем решение. Excel-файл с условиями скачивается отдельным запросом по ссылке.
       const solution = payload.solution;
-      const base64Excel = payload.conditions_excel;
       const solver = payload.solver;
       const solveDuration = payload.solve_duration;
-
-      // Декодируем base64 в бинарные данные и создаём Blob. Тип для .xlsx:
-      // 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-      const binaryString = atob(base64Excel);
-      const len = binaryString.length;
-      const bytes = new Uint8Array(len);
-      for (let i = 0; i < len; i++) {
-        bytes[i] = binaryString.charCodeAt(i);
-      }
-      const blob = new Blob([bytes], {
-        type: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-      });
-
-      // Генерируем URL для скачивания или отображения файла
-      const excelUrl = URL.createObjectURL(blob);
+      const excelUrl = `${BASE_URL}/conditions_excel/${taskId}`;
       dispatch(taskSolutionActions.setSolution(solution));
       dispatch(taskSolutionActions.setCondition(excelUrl));
       dispatch(taskSolutionActions.setSolver(solver));
@@ -84,6 +73,11 @@ export const openSSEConnection = (taskId: string, dispatch: AppDispatch) => {
       }
     }
   };
+  // Ход решения приходит отдельным типом события "progress"
+  currentSSEConnection.addEventListener("progress", (event) => {
+    const progress = JSON.parse((event as MessageEvent).data) as SolveProgress;
+    dispatch(taskSolutionActions.setProgress(progress));
+  });
   currentSSEConnection.onerror = () => {
     toaster.add({
       name: "SseError",
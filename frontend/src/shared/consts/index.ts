@@ -51,10 +51,14 @@ export const SELECT_SOLVER_OPTIONS: Array<{
   { value: SolverEnum.GLPK, content: "glpk" },
   { value: SolverEnum.CBC, content: "coin-or" },
   { value: SolverEnum.SCIP, content: "scip" },
+  { value: SolverEnum.PORTFOLIO, content: "portfolio" },
+  { value: SolverEnum.AUTO, content: "auto" },
 ];
 
 export const MAP_SOLVER_OPTIONS: Record<SolverEnum, string> = {
   [SolverEnum.GLPK]: "glpk",
   [SolverEnum.CBC]: "coin-or",
   [SolverEnum.SCIP]: "scip",
+  [SolverEnum.PORTFOLIO]: "portfolio",
+  [SolverEnum.AUTO]: "auto",
 };
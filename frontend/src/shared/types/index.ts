@@ -21,4 +21,8 @@ export enum SolverEnum {
   GLPK = "glpk",
   CBC = "cbc",
   SCIP = "scip",
+  /* Все доступные решатели одновременно, результат первого доказанного решения */
+  PORTFOLIO = "portfolio",
+  /* Решатель, который быстрее всех решал похожие задачи */
+  AUTO = "auto",
 }
@@ -1,61 +1,56 @@
 import { CircleQuestion } from "@gravity-ui/icons";
 import { Flex, Icon, Table, Tooltip } from "@gravity-ui/uikit";
-import { getTemplateColumn } from "../../helpers";
+import { getTableRows, getTemplateColumn } from "../../helpers";
 import { Sensitivity } from "../../types";
 import styles from "./styles.module.css";
 
 type SensitivityTableProps = {
-  sensitivity: Sensitivity;
+  constraints: Sensitivity["constraints"];
   maximumFractionDigits: number;
 };
 
 const ICON_SIZE = 16;
 
+export const getColumnName = (title: string, tooltip: string) => () =>
+  (
+    <Flex alignItems="center" gap={1}>
+      {title}
+      <Tooltip content={tooltip}>
+        <Icon className={styles.icon} data={CircleQuestion} size={ICON_SIZE} />
+      </Tooltip>
+    </Flex>
+  );
+
 export const SensitivityTable = ({
-  sensitivity,
+  constraints,
   maximumFractionDigits,
 }: SensitivityTableProps) => {
+  const data = getTableRows(constraints, (index) => `Ограничение ${index + 1}`);
   const columns: Array<{
-    id: keyof Sensitivity[0];
+    id: string;
     name: string | (() => JSX.Element);
     template?: (
-      item: Record<keyof Sensitivity[0], string>,
+      item: Record<string, number | null | string>,
       index: number
     ) => React.ReactNode;
   }> = [
     { id: "name", name: "Название" },
     {
-      id: "value",
-      name: () => (
-        <Flex alignItems="center" gap={1}>
-          Значение
-          <Tooltip content="Значение ограничения при оптимальных значениях">
-            <Icon
-              className={styles.icon}
-              data={CircleQuestion}
-              size={ICON_SIZE}
-            />
-          </Tooltip>
-        </Flex>
+      id: "activity",
+      name: getColumnName(
+        "Значение",
+        "Значение ограничения при оптимальных значениях"
       ),
       template: getTemplateColumn({
-        columnName: "value",
+        columnName: "activity",
         maximumFractionDigits,
       }),
     },
     {
       id: "lslack",
-      name: () => (
-        <Flex alignItems="center" gap={1}>
-          lslack
-          <Tooltip content="Если ограничение записано, например, в виде f(x) ≥ L, то lslack показывает, насколько f(x) больше L.">
-            <Icon
-              className={styles.icon}
-              data={CircleQuestion}
-              size={ICON_SIZE}
-            />
-          </Tooltip>
-        </Flex>
+      name: getColumnName(
+        "lslack",
+        "Если ограничение записано, например, в виде f(x) ≥ L, то lslack показывает, насколько f(x) больше L."
       ),
       template: getTemplateColumn({
         columnName: "lslack",
@@ -64,43 +59,56 @@ export const SensitivityTable = ({
     },
     {
       id: "uslack",
-      name: () => (
-        <Flex alignItems="center" gap={1}>
-          uslack
-          <Tooltip content="Если ограничение записано, например, в виде f(x) ≤ L, то uslack показывает, насколько f(x) меньше L.">
-            <Icon
-              className={styles.icon}
-              data={CircleQuestion}
-              size={ICON_SIZE}
-            />
-          </Tooltip>
-        </Flex>
+      name: getColumnName(
+        "uslack",
+        "Если ограничение записано, например, в виде f(x) ≤ L, то uslack показывает, насколько f(x) меньше L."
       ),
       template: getTemplateColumn({
         columnName: "uslack",
         maximumFractionDigits,
       }),
     },
-    {
+  ];
+  if (constraints.dual) {
+    columns.push({
       id: "dual",
-      name: () => (
-        <Flex alignItems="center" gap={1}>
-          dual
-          <Tooltip content="На сколько изменится значение искомой функции, если изменить значение ограничения на единицу">
-            <Icon
-              className={styles.icon}
-              data={CircleQuestion}
-              size={ICON_SIZE}
-            />
-          </Tooltip>
-        </Flex>
+      name: getColumnName(
+        "dual",
+        "На сколько изменится значение искомой функции, если изменить значение ограничения на единицу"
       ),
       template: getTemplateColumn({
         columnName: "dual",
         maximumFractionDigits,
       }),
-    },
-  ];
+    });
+  }
+  if (constraints.rhs_lower && constraints.rhs_upper) {
+    columns.push(
+      {
+        id: "rhs_lower",
+        name: getColumnName(
+          "Правая часть от",
+          "Нижняя граница правой части ограничения, до которой двойственные оценки не меняются"
+        ),
+        template: getTemplateColumn({
+          columnName: "rhs_lower",
+          maximumFractionDigits,
+          infinity: "-∞",
+        }),
+      },
+      {
+        id: "rhs_upper",
+        name: getColumnName(
+          "Правая часть до",
+          "Верхняя граница правой части ограничения, до которой двойственные оценки не меняются"
+        ),
+        template: getTemplateColumn({
+          columnName: "rhs_upper",
+          maximumFractionDigits,
+        }),
+      }
+    );
+  }
 
-  return <Table data={sensitivity} columns={columns} />;
+  return <Table data={data} columns={columns} />;
 };
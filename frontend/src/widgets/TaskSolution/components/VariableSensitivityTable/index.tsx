@@ -0,0 +1,68 @@
+import { Table } from "@gravity-ui/uikit";
+import { getTableRows, getTemplateColumn } from "../../helpers";
+import { Sensitivity } from "../../types";
+import { getColumnName } from "../SensitivityTable";
+
+type VariableSensitivityTableProps = {
+  variables: Sensitivity["variables"];
+  getVariableName: (index: number) => string;
+  maximumFractionDigits: number;
+};
+
+export const VariableSensitivityTable = ({
+  variables,
+  getVariableName,
+  maximumFractionDigits,
+}: VariableSensitivityTableProps) => {
+  const data = getTableRows(variables, getVariableName);
+  const columns: Array<{
+    id: string;
+    name: string | (() => JSX.Element);
+    template?: (
+      item: Record<string, number | null | string>,
+      index: number
+    ) => React.ReactNode;
+  }> = [{ id: "name", name: "Переменная" }];
+  if (variables.reduced_cost) {
+    columns.push({
+      id: "reduced_cost",
+      name: getColumnName(
+        "Приведенная стоимость",
+        "На сколько изменится значение искомой функции, если увеличить значение переменной на единицу"
+      ),
+      template: getTemplateColumn({
+        columnName: "reduced_cost",
+        maximumFractionDigits,
+      }),
+    });
+  }
+  if (variables.cost_lower && variables.cost_upper) {
+    columns.push(
+      {
+        id: "cost_lower",
+        name: getColumnName(
+          "Коэффициент от",
+          "Нижняя граница коэффициента искомой функции, до которой решение не меняется"
+        ),
+        template: getTemplateColumn({
+          columnName: "cost_lower",
+          maximumFractionDigits,
+          infinity: "-∞",
+        }),
+      },
+      {
+        id: "cost_upper",
+        name: getColumnName(
+          "Коэффициент до",
+          "Верхняя граница коэффициента искомой функции, до которой решение не меняется"
+        ),
+        template: getTemplateColumn({
+          columnName: "cost_upper",
+          maximumFractionDigits,
+        }),
+      }
+    );
+  }
+
+  return <Table data={data} columns={columns} />;
+};
@@ -1,23 +1,56 @@
-import { Sensitivity } from "../types";
+import { NumberArray, SolveProgress } from "../types";
 
 type GetTemplateColumnProps = {
-  columnName: keyof Sensitivity[0];
+  columnName: string;
   maximumFractionDigits: number;
+  /* Как показывать null: бесконечность со знаком границы */
+  infinity?: string;
 };
 
+export const formatNumber = (
+  value: number | null | undefined,
+  maximumFractionDigits: number,
+  infinity = "∞"
+) =>
+  value === null || value === undefined
+    ? infinity
+    : value.toLocaleString(undefined, {
+        maximumFractionDigits: Number(maximumFractionDigits),
+      });
+
 export const getTemplateColumn =
-  ({ columnName, maximumFractionDigits }: GetTemplateColumnProps) =>
-  (item: Record<keyof Sensitivity[0], string>) =>
+  ({ columnName, maximumFractionDigits, infinity }: GetTemplateColumnProps) =>
+  (item: Record<string, number | null | string>) =>
     (
       <>
-        {parseFloat(item[columnName])
-          ? parseFloat(item[columnName]).toLocaleString(undefined, {
-              maximumFractionDigits: Number(maximumFractionDigits),
-            })
-          : item[columnName]}
+        {formatNumber(
+          item[columnName] as number | null,
+          maximumFractionDigits,
+          infinity
+        )}
       </>
     );
 
+/* Строки таблицы из массивов решения: k-я строка содержит k-е значения всех массивов */
+export const getTableRows = (
+  arrays: Record<string, NumberArray | undefined>,
+  getName: (index: number) => string
+) => {
+  const length = Math.max(
+    0,
+    ...Object.values(arrays).map((values) => values?.length ?? 0)
+  );
+  return Array.from({ length }, (_, index) => {
+    const row: Record<string, number | null | string> = { name: getName(index) };
+    Object.entries(arrays).forEach(([key, values]) => {
+      if (values) {
+        row[key] = values[index] ?? null;
+      }
+    });
+    return row;
+  });
+};
+
 export const getFormattedSolveDuration = (solveDuration: number) => {
   console.log(solveDuration);
   const date = new Date(solveDuration);
@@ -28,3 +61,20 @@ export const getFormattedSolveDuration = (solveDuration: number) => {
 
   return `${hours}:${minutes}:${seconds}.${milliseconds}`;
 };
+
+export const getFormattedProgress = (progress: SolveProgress) => {
+  const parts = [`${progress.elapsed.toFixed(1)} с`];
+  if (progress.incumbent !== null) {
+    parts.push(`решение ${progress.incumbent.toLocaleString()}`);
+  }
+  if (progress.bound !== null) {
+    parts.push(`граница ${progress.bound.toLocaleString()}`);
+  }
+  if (progress.gap !== null) {
+    parts.push(`разрыв ${progress.gap.toFixed(2)}%`);
+  }
+  if (progress.nodes !== null) {
+    parts.push(`узлов ${progress.nodes}`);
+  }
+  return parts.join(", ");
+};
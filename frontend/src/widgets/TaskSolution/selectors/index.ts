@@ -10,3 +10,5 @@ export const selectSolutionSolveDuration = (state: RootState) =>
   state.taskSolution.solveDuration;
 export const selectSolutionIsLoading = (state: RootState) =>
   state.taskSolution.isLoading;
+export const selectSolutionProgress = (state: RootState) =>
+  state.taskSolution.progress;
@@ -1,7 +1,7 @@
 import { SolverEnum } from "@/shared/types";
 import type { PayloadAction } from "@reduxjs/toolkit";
 import { createSlice } from "@reduxjs/toolkit";
-import { Solution } from "../types";
+import { Solution, SolveProgress } from "../types";
 
 export interface TaskSolutionState {
   solution: Solution | null;
@@ -9,6 +9,7 @@ export interface TaskSolutionState {
   solver: SolverEnum | null;
   solveDuration: number | null;
   isLoading: boolean | null;
+  progress: SolveProgress | null;
 }
 
 const initialState: TaskSolutionState = {
@@ -17,6 +18,7 @@ const initialState: TaskSolutionState = {
   solver: null,
   solveDuration: null,
   isLoading: null,
+  progress: null,
 };
 
 export const taskSolutionSlice = createSlice({
@@ -38,6 +40,9 @@ export const taskSolutionSlice = createSlice({
     setIsLoading: (state, action: PayloadAction<boolean>) => {
       state.isLoading = action.payload;
     },
+    setProgress: (state, action: PayloadAction<SolveProgress | null>) => {
+      state.progress = action.payload;
+    },
     setInitialState: () => initialState,
   },
 });
@@ -1,12 +1,31 @@
 import { SolverEnum } from "@/shared/types";
 
+/* Числовой массив решения: null - бесконечность (без ограничения) или нет значения */
+export type NumberArray = (number | null)[];
+
 export type Sensitivity = {
-  name: string;
-  value: string;
-  lslack: string;
-  uslack: string;
-  dual: string;
-}[];
+  /* По ограничениям, индекс - номер ограничения с нуля */
+  constraints: {
+    /* Значение левой части ограничения */
+    activity: NumberArray;
+    /* Запасы до нижней и верхней границы ограничения */
+    lslack: NumberArray;
+    uslack: NumberArray;
+    /* Двойственная оценка */
+    dual?: NumberArray;
+    /* Диапазон правой части, в котором двойственные оценки не меняются (только для ЛП) */
+    rhs_lower?: NumberArray;
+    rhs_upper?: NumberArray;
+  };
+  /* По переменным, индекс - номер переменной с нуля */
+  variables: {
+    /* Приведенная стоимость */
+    reduced_cost?: NumberArray;
+    /* Диапазон коэффициента целевой функции, в котором решение не меняется (только для ЛП) */
+    cost_lower?: NumberArray;
+    cost_upper?: NumberArray;
+  };
+};
 
 export type Solution = {
   /* Тип полученного решения optimal, infeasible, unbounded и др.  */
@@ -15,19 +34,64 @@ export type Solution = {
   message: string;
   /* Значение целевой функции */
   objective?: number;
-  /* Значения переменных, где ключ - это индекс переменной в строковом формате */
-  variable_values?: Record<string, number>;
+  /* Значения переменных, индекс - номер переменной с нуля */
+  variable_values?: NumberArray;
   /* Анализ чувствительности к изменению параметров */
-  sensitivity?: Sensitivity;
+  sensitivity?: Sensitivity | null;
+  /* Статистика упрощения задачи перед решением, если оно выполнялось */
+  presolve?: PresolveStats;
+  /* Результат гонки решателей в режиме portfolio */
+  portfolio?: PortfolioResult;
+};
+
+export type PortfolioResult = {
+  /* Решатель, чье решение возвращено */
+  winner: SolverEnum;
+  /* Время с начала гонки (секунды) и статус каждого решателя */
+  timings: Record<string, { time: number; status: string; error?: string }>;
+};
+
+export type PresolveStats = {
+  /* Количество ограничений и переменных исходной задачи */
+  rows: number;
+  columns: number;
+  /* Количество удаленных ограничений и переменных */
+  removed_rows: number;
+  removed_columns: number;
+  /* Удалено пустых, повторяющихся ограничений и ограничений с одной переменной */
+  empty_rows: number;
+  duplicate_rows: number;
+  singleton_rows: number;
+  /* Удалено фиксированных переменных и переменных вне ограничений */
+  fixed_columns: number;
+  empty_columns: number;
+  /* Количество суженных границ целочисленных переменных */
+  tightened_bounds: number;
+  /* Количество проходов и время упрощения, секунды */
+  passes: number;
+  time: number;
 };
 
 export type SolutionResponse = {
   /* Решение задачи */
   solution: Solution;
-  /* Base64 строка, которая хранит условия задачи в excel формате */
-  conditions_excel: string;
   /* Решатель, который выбрал пользователь */
   solver: SolverEnum;
   /* Продолжительность решения. milliseconds */
   solve_duration: number;
+  /* Длительности этапов обработки задачи, секунды: parse, validate, persist, queue, solve и др. */
+  stage_timings?: Record<string, number> | null;
+};
+
+export type SolveProgress = {
+  /* Лучшее найденное значение целевой функции */
+  incumbent: number | null;
+  /* Лучшая граница целевой функции */
+  bound: number | null;
+  /* Относительный разрыв между значением и границей, % */
+  gap: number | null;
+  /* Количество просмотренных узлов дерева ветвлений */
+  nodes: number | null;
+  /* Время с начала решения, секунды */
+  elapsed: number;
 };
@@ -8,17 +8,23 @@ import cn from "classnames";
 import { useEffect, useState } from "react";
 import { MAP_VAR_NUMBER_TO_NAME } from "../TaskCreator/consts";
 import { SensitivityTable } from "./components/SensitivityTable";
+import { VariableSensitivityTable } from "./components/VariableSensitivityTable";
 import {
   FRACTION_DIGITS_DEFAULT_VALUE,
   FRACTION_DIGITS_OPTIONS,
   OVERFLOW_VARS_NUMBER,
   PROGRESS_BAR_VALUE,
 } from "./consts";
-import { getFormattedSolveDuration } from "./helpers";
+import {
+  formatNumber,
+  getFormattedProgress,
+  getFormattedSolveDuration,
+} from "./helpers";
 import {
   selectSolutionConditions,
   selectSolutionData,
   selectSolutionIsLoading,
+  selectSolutionProgress,
   selectSolutionSolveDuration,
   selectSolutionSolver,
 } from "./selectors";
@@ -36,11 +42,16 @@ export const TaskSolution = () => {
   const solver = useAppSelector(selectSolutionSolver);
   const solveDuration = useAppSelector(selectSolutionSolveDuration);
   const isLoading = useAppSelector(selectSolutionIsLoading);
+  const progress = useAppSelector(selectSolutionProgress);
   const { setIsLoading } = taskSolutionActions;
   const [cancelTask] = useCancelTaskMutation();
-  const shouldHideVars =
-    Object.entries(solution?.variable_values ?? {}).length >
-    OVERFLOW_VARS_NUMBER;
+  const variableValues = solution?.variable_values ?? [];
+  const shouldHideVars = variableValues.length > OVERFLOW_VARS_NUMBER;
+  const getVariableName = (index: number) =>
+    variableValues.length > Object.entries(MAP_VAR_NUMBER_TO_NAME).length
+      ? String(index)
+      : MAP_VAR_NUMBER_TO_NAME[index];
+  const sensitivity = solution?.sensitivity;
 
   useEffect(() => {
     const taskId = localStorage.getItem(TASK_ID_LOCAL_STORAGE_KEY);
@@ -67,7 +78,11 @@ export const TaskSolution = () => {
         <Flex gap={5} justifyContent="center" alignItems="center">
           <Progress
             className={styles.progress}
-            text="Задача решается..."
+            text={
+              progress
+                ? `Задача решается: ${getFormattedProgress(progress)}`
+                : "Задача решается..."
+            }
             theme="info"
             value={PROGRESS_BAR_VALUE}
             loading={true}
@@ -140,20 +155,12 @@ export const TaskSolution = () => {
                 [styles.hide]: !showMore && shouldHideVars,
               })}
             >
-              {Object.entries(solution.variable_values).map(
-                ([index, value], _, varsArray) => (
-                  <Text variant="header-1" key={`variable_values_${index}`}>
-                    {varsArray.length >
-                    Object.entries(MAP_VAR_NUMBER_TO_NAME).length
-                      ? index
-                      : MAP_VAR_NUMBER_TO_NAME[index]}
-                    :{" "}
-                    {value.toLocaleString(undefined, {
-                      maximumFractionDigits: Number(maximumFractionDigits),
-                    })}
-                  </Text>
-                )
-              )}
+              {variableValues.map((value, index) => (
+                <Text variant="header-1" key={`variable_values_${index}`}>
+                  {getVariableName(index)}:{" "}
+                  {formatNumber(value, Number(maximumFractionDigits), "—")}
+                </Text>
+              ))}
               {shouldHideVars &&
                 (!showMore ? (
                   <Button
@@ -175,9 +182,9 @@ export const TaskSolution = () => {
             </Flex>
           </Flex>
         )}
-        {!!solution.sensitivity && !!solution.sensitivity.length ? (
+        {!!sensitivity && !!sensitivity.constraints.activity?.length ? (
           <SensitivityTable
-            sensitivity={solution.sensitivity}
+            constraints={sensitivity.constraints}
             maximumFractionDigits={Number(maximumFractionDigits)}
           />
         ) : (
@@ -185,6 +192,13 @@ export const TaskSolution = () => {
             Нет данных о чуствительности решения к изменению параметров
           </Text>
         )}
+        {!!sensitivity && !!sensitivity.variables.reduced_cost?.length && (
+          <VariableSensitivityTable
+            variables={sensitivity.variables}
+            getVariableName={getVariableName}
+            maximumFractionDigits={Number(maximumFractionDigits)}
+          />
+        )}
       </Flex>
     );
   };